@@ -1,23 +1,46 @@
+import time
+STARTUP_BEGIN = time.perf_counter()  # Taken before the heavy imports so they count towards startup
+
 import os
 import cv2
-import time
+import datetime
 import json
 import csv
 import argparse
 import numpy as np
 import platform
+import signal
 import sys
 from dotenv import load_dotenv
-from PIL import ImageFont, ImageDraw, Image
-from insightface.app import FaceAnalysis
-from utils import get_name, get_current_time, play_sound, normalize, check_and_log_day_end
-from track import add_to_dictionary
+from utils import get_name, get_roster, get_current_time, check_and_log_day_end, set_clock
+from track import add_to_dictionary, SessionStore
+from journal import AttendanceJournal, replay_sessions, session_day
+from recognize import build_row_uids, recognize_faces, stack_embeddings
+from metadata_store import CompactMetadata, compact_prefix, compact_exists
+from index_spec import load_params, apply_search_params, describe_index
+from prototypes import load_prototype_searcher, prototypes_exist, vectors_by_label, group_by_uid
+from pipeline import Pipeline
+from tracker import FaceTracker, DetectionScheduler
+from identity_cache import IdentityCache
+from faces import detect_faces, embed_faces, load_face_class
+from arcface import GRAPH_OPT_LEVELS, enable_batch_recognition
+from profiles import PROFILES, DEFAULT_PROFILE, describe_profile, load_face_model as load_profile_model
+from motion import MotionGate
+from quality import QualityGate, REASONS
+from multicam import CameraContext, MultiCapture, parse_sources
+from sources import open_source, ReplayClock, ClockedSource, parse_start_time
+from audio import AudioWorker, ElevenLabsTTS, StubTTS
+from metrics import Metrics, MetricsServer, MetricsFileWriter, ProfileWindow
+from startup import StartupProfile
 import faiss
 
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="onnxruntime")
 warnings.filterwarnings("ignore", category=FutureWarning, module="insightface")
 
+startup = StartupProfile(STARTUP_BEGIN)
+startup.mark("imports")
+
 # --- Platform-specific keypress handler ---
 if platform.system() == 'Windows':
     import msvcrt
@@ -43,6 +66,58 @@ else:
 parser = argparse.ArgumentParser(description="Face Recognition Attendance System")
 parser.add_argument("--headless", action="store_true", help="Run without displaying the webcam feed")
 parser.add_argument("--faissgpu", action="store_true", help="Enable FAISS GPU acceleration if available")
+parser.add_argument("--sequential", action="store_true", help="Run capture, inference and rendering on one thread (no pipelining)")
+parser.add_argument("--queue-size", type=int, default=1, help="Capacity of each pipeline queue; older frames are dropped when full")
+parser.add_argument("--track", action="store_true", help="Detect every N frames and track boxes in between")
+parser.add_argument("--detect-every", type=int, default=5, help="Frames between full detections in --track mode")
+parser.add_argument("--adaptive", action="store_true", help="Adapt --detect-every to the measured frame time")
+parser.add_argument("--target-fps", type=float, default=15.0, help="Frame rate the adaptive scheduler aims for")
+parser.add_argument("--identity-cache", action="store_true", help="Reuse confirmed identities per track instead of re-embedding every detection")
+parser.add_argument("--nprobe", type=int, default=None, help="IVF lists probed per query (overrides the saved value)")
+parser.add_argument("--ef-search", type=int, default=None, help="HNSW search depth (overrides the saved value)")
+parser.add_argument("--prototypes", action="store_true", help="Search the per-identity prototype index instead of every vector")
+parser.add_argument("--rerank", action="store_true", help="With --prototypes, rescore the best candidate uids against their full vector set")
+parser.add_argument("--motion-gate", action="store_true", help="Skip detection on frames without motion")
+parser.add_argument("--motion-threshold", type=float, default=0.01, help="Fraction of changed pixels that counts as motion")
+parser.add_argument("--idle-detect-interval", type=float, default=2.0, help="Maximum seconds between detections when nothing moves")
+parser.add_argument("--quality-gate", action="store_true", help="Skip embedding and search for small, low-score, blurred or turned faces")
+parser.add_argument("--min-face-size", type=int, default=40, help="Quality gate: minimum shorter box side in pixels")
+parser.add_argument("--min-det-score", type=float, default=0.6, help="Quality gate: minimum detector score")
+parser.add_argument("--min-sharpness", type=float, default=40.0, help="Quality gate: minimum Laplacian variance of the face crop")
+parser.add_argument("--max-yaw", type=float, default=0.5, help="Quality gate: largest yaw ratio from landmarks (0.5 is about half profile)")
+parser.add_argument("--max-pitch", type=float, default=0.25, help="Quality gate: largest pitch ratio from landmarks")
+parser.add_argument("--tts", choices=["elevenlabs", "stub"], default="elevenlabs", help="Text-to-speech backend for greetings")
+parser.add_argument("--no-prewarm", action="store_true", help="Do not pre-generate every roster member's greetings at startup")
+parser.add_argument("--cache-ttl", type=float, default=10.0, help="Seconds a cached identity stays valid")
+parser.add_argument("--source", default="0", help="Frame source: webcam index, video file, image directory or stream URL")
+parser.add_argument("--replay", choices=["fast", "realtime"], default=None,
+                    help="Replay file sources without dropping frames, as fast as possible or at the recorded rate, on a frame-driven clock")
+parser.add_argument("--replay-start", default=None, help="Clock time of the first replayed frame, 'YYYY-mm-dd HH:MM:SS' or 'HH:MM:SS'")
+parser.add_argument("--source-fps", type=float, default=None, help="Frame rate of image directories (and replay clock override)")
+parser.add_argument("--loop", action="store_true", help="Restart file and directory sources at the end")
+parser.add_argument("--readahead", type=int, default=8, help="Frames decoded ahead for file and directory sources")
+parser.add_argument("--cameras", nargs="+", default=None, metavar="SOURCE",
+                    help="Several capture sources as [name=]index|url|path, sharing one model and index")
+parser.add_argument("--journal", default=None,
+                    help="Attendance event journal (default ./log/attendance_journal.jsonl, or .db with --journal-backend sqlite)")
+parser.add_argument("--journal-backend", choices=["jsonl", "sqlite"], default=None, help="Journal storage (default: from the file extension)")
+parser.add_argument("--journal-fsync", type=float, default=5.0, help="Seconds between fsyncs of the attendance journal")
+parser.add_argument("--journal-seen-interval", type=float, default=30.0, help="Minimum seconds between last-seen events per person")
+parser.add_argument("--no-journal", action="store_true", help="Keep attendance in memory only and dump it to the CSV at day end")
+parser.add_argument("--metrics", action="store_true", help="Record per-stage latencies, counters and queue gauges")
+parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics (implies --metrics)")
+parser.add_argument("--metrics-file", default=None, help="Rewrite Prometheus metrics to this file periodically (implies --metrics)")
+parser.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between metrics file flushes")
+parser.add_argument("--model-profile", choices=list(PROFILES), default=DEFAULT_PROFILE,
+                    help="Face model modules, detector size and frame downscale (see app/profiles.py)")
+parser.add_argument("--model-pack", default="buffalo_l",
+                    help="InsightFace model pack, e.g. buffalo_l_int8 built by prep/quantize.py")
+parser.add_argument("--batch-embed", action="store_true", help="Embed all faces of a frame in one batched ArcFace call")
+parser.add_argument("--ort-intra-threads", type=int, default=0, help="ONNX Runtime intra-op threads for --batch-embed (0 = default)")
+parser.add_argument("--ort-inter-threads", type=int, default=0, help="ONNX Runtime inter-op threads for --batch-embed (0 = default)")
+parser.add_argument("--ort-opt-level", choices=list(GRAPH_OPT_LEVELS), default="all",
+                    help="ONNX Runtime graph optimization level for --batch-embed")
+parser.add_argument("--profile-dir", default="./log/profiles", help="Where on-demand cProfile windows are written")
 args = parser.parse_args()
 
 # Terminal setup for Unix-like systems
@@ -53,140 +128,578 @@ if not platform.system() == 'Windows' and args.headless:
 load_dotenv()
 
 # --- Configuration ---
+INDEX_DIR = "./faissIndex"
 INDEX_PATH = "./faissIndex/face_index_cosine.faiss"
 METADATA_PATH = "./faissIndex/face_metadata.json"
 CAMBRIA_FONT_PATH = "./helper/cambria.ttc"
 LOG_FILE = "./log/attendance_log.csv"
+AUDIO_DIR = "./temp"
 
 TOP_K = 1
 SIMILARITY_THRESHOLD = 0.5
 USE_GPU = 0  # InsightFace: use -1 for CPU, 0 for GPU
+PIPELINE_STATS_INTERVAL = 30  # Seconds between pipeline stats reports
+
+METRICS_ENABLED = args.metrics or args.metrics_port is not None or args.metrics_file is not None
 
-welcome_dictionary = {}
-goodbye_dictionary = {}
+welcome_dictionary = SessionStore()
+goodbye_dictionary = SessionStore()
 day_end_logged = False
+sessions_day = None  # Date whose sessions the dictionaries hold (see journal.session_day)
 
-# --- Font Setup ---
-if not os.path.exists(CAMBRIA_FONT_PATH):
-    raise FileNotFoundError(f"[ERROR] Cambria font file not found: {CAMBRIA_FONT_PATH}")
-font = ImageFont.truetype(CAMBRIA_FONT_PATH, 24)
+# --- Metrics Setup ---
+metrics = Metrics(enabled=METRICS_ENABLED)
+profiler = ProfileWindow(args.profile_dir) if METRICS_ENABLED else None
+metrics_server = None
+metrics_writer = None
+if METRICS_ENABLED:
+    if args.metrics_port is not None:
+        metrics_server = MetricsServer(metrics, port=args.metrics_port, profiler=profiler).start()
+        print(f"[INFO] Metrics on http://127.0.0.1:{args.metrics_port}/metrics "
+              f"(profile with /profile?seconds=10).")
+    if args.metrics_file is not None:
+        metrics_writer = MetricsFileWriter(metrics, args.metrics_file, args.metrics_interval).start()
+        print(f"[INFO] Metrics written to {args.metrics_file} every {args.metrics_interval}s.")
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.request(10.0))
+        print(f"[INFO] PID {os.getpid()}: send SIGUSR1 to profile the inference thread for 10s.")
+
+# --- Audio Setup ---
+tts = StubTTS() if args.tts == "stub" else ElevenLabsTTS()
+audio = AudioWorker(tts, name_lookup=get_name, temp_dir=AUDIO_DIR).start()
+if not args.no_prewarm:
+    audio.prewarm(get_roster())
 
-# --- Load FAISS + Metadata ---
-if not os.path.exists(INDEX_PATH) or not os.path.exists(METADATA_PATH):
+# --- Loading ---
+# The model, index, metadata, cameras and overlay font do not depend on each other, so
+# they load concurrently; insightface/onnxruntime and PIL are only imported by the steps
+# that need them (PIL not at all when headless).
+if not args.headless and not os.path.exists(CAMBRIA_FONT_PATH):
+    raise FileNotFoundError(f"[ERROR] Cambria font file not found: {CAMBRIA_FONT_PATH}")
+metadata_prefix = compact_prefix(METADATA_PATH)
+if not os.path.exists(INDEX_PATH) or not (os.path.exists(METADATA_PATH) or compact_exists(metadata_prefix)):
     raise FileNotFoundError("[ERROR] FAISS index or metadata file not found.")
+if args.prototypes and not prototypes_exist(INDEX_DIR):
+    raise FileNotFoundError("[ERROR] Prototype index not found; build it with: python app/prototypes.py")
+sources = parse_sources(args.cameras) if args.cameras else [("cam0", args.source)]
+primary_camera = sources[0][0]
 
-print("[INFO] Loading FAISS index and metadata.")
-faiss_index = faiss.read_index(INDEX_PATH)
+def load_renderer():
+    from overlay import OverlayRenderer
+    return OverlayRenderer(CAMBRIA_FONT_PATH, font_size=24)
 
-if args.faissgpu:
-    try:
-        res = faiss.StandardGpuResources()
-        faiss_index = faiss.index_cpu_to_gpu(res, 0, faiss_index)
-        print("[INFO] FAISS GPU enabled.")
-    except Exception as e:
-        print(f"[WARNING] FAISS GPU not available or failed to initialize. Falling back to CPU. Error: {e}")
-
-with open(METADATA_PATH, "r") as f:
-    metadata = json.load(f)
-vector_ids = list(metadata.keys())
+def load_index():
+    print("[INFO] Loading FAISS index.")
+    faiss_index = faiss.read_index(INDEX_PATH)
+    index_params = load_params(INDEX_PATH)
+    if args.nprobe is not None:
+        index_params["nprobe"] = args.nprobe
+    if args.ef_search is not None:
+        index_params["efSearch"] = args.ef_search
+    print(f"[INFO] Index: {describe_index(faiss_index)}, search parameters: {apply_search_params(faiss_index, index_params)}")
+
+    if args.faissgpu:
+        try:
+            res = faiss.StandardGpuResources()
+            faiss_index = faiss.index_cpu_to_gpu(res, 0, faiss_index)
+            print("[INFO] FAISS GPU enabled.")
+        except Exception as e:
+            print(f"[WARNING] FAISS GPU not available or failed to initialize. Falling back to CPU. Error: {e}")
+    return faiss_index
+
+def load_metadata():
+    if compact_exists(metadata_prefix):
+        return CompactMetadata(metadata_prefix)
+    print("[WARNING] Compact metadata not found, loading JSON. Convert it with: python app/metadata_store.py")
+    with open(METADATA_PATH, "r") as f:
+        metadata = json.load(f)
+    return build_row_uids(metadata)
+
+def load_face_model():
+    print(f"[INFO] Loading face embedding model {args.model_pack}: {describe_profile(args.model_profile)}.")
+    facemodel = load_profile_model(args.model_profile, ctx_id=USE_GPU, name=args.model_pack)
+    if args.batch_embed:
+        enable_batch_recognition(facemodel, args.ort_intra_threads, args.ort_inter_threads, args.ort_opt_level)
+    print("[INFO] Model loaded.")
+    return facemodel
+
+def open_capture(camera_id, source):
+    capture = open_source(source, realtime=args.replay == "realtime", loop=args.loop,
+                          readahead=args.readahead, fps=args.source_fps)
+    if not capture.isOpened():
+        raise IOError(f"[ERROR] Cannot open camera {camera_id} ({source}).")
+    return capture
+
+# insightface's Face class is imported here too, so the first detection does not pay for the import
+tasks = {"model": load_face_model, "face class": load_face_class, "index": load_index, "metadata": load_metadata}
+tasks.update({f"camera {camera_id}": (lambda c=camera_id, s=source: open_capture(c, s)) for camera_id, source in sources})
+if not args.headless:
+    tasks["overlay"] = load_renderer
+loaded = startup.run_parallel(tasks, workers=len(tasks))
+facemodel = loaded["model"]
+faiss_index = loaded["index"]
+row_uids = loaded["metadata"]
+captures = {camera_id: loaded[f"camera {camera_id}"] for camera_id, _ in sources}
+renderer = loaded.get("overlay")
+
+prototype_searcher = None
+if args.prototypes:
+    def load_prototypes():
+        # Full vector sets are only needed for reranking; read them from the CPU index
+        full_groups = group_by_uid(*vectors_by_label(faiss.read_index(INDEX_PATH)), row_uids) if args.rerank else None
+        return load_prototype_searcher(INDEX_DIR, full_groups, row_uids=row_uids, index_path=INDEX_PATH)
+    prototype_searcher = startup.step("prototypes", load_prototypes)
+    print(f"[INFO] Prototype index loaded ({prototype_searcher.prototype_index.ntotal} prototypes"
+          f"{', rerank enabled' if args.rerank else ''}).")
 print("[INFO] FAISS and metadata loaded.")
 
-# --- Load Face Detection Model ---
-print("[INFO] Loading face embedding model.")
-facemodel = FaceAnalysis(name='buffalo_l')
-facemodel.prepare(ctx_id=USE_GPU)
-print("[INFO] Model loaded.")
+metrics.gauge_fn("audio_pending", audio.pending)
 
-# --- Webcam Setup ---
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    raise IOError("[ERROR] Cannot open webcam.")
-print("[INFO] Webcam feed started. Press 'q' or 'Esc' to quit.")
+# --- Camera Setup ---
+# Every camera gets its own tracker, scheduler, identity cache and motion gate; the model,
+# index and metadata above are shared by all of them.
+detect_every = args.detect_every if args.track else 1
+if args.track or args.identity_cache:
+    # The identity cache is keyed by track id, so it needs the tracker even when detecting every frame
+    print(f"[INFO] Tracking enabled: detecting every {detect_every} frames{' (adaptive)' if args.adaptive and args.track else ''}.")
+if args.identity_cache:
+    print(f"[INFO] Identity cache enabled (TTL {args.cache_ttl}s).")
+if args.motion_gate:
+    print(f"[INFO] Motion gate enabled (threshold {args.motion_threshold}, idle detection every {args.idle_detect_interval}s).")
 
-# --- Main Loop ---
-try:
-    while True:
-        date_str, time_str = get_current_time()
+# With --replay every component that reads the time follows a clock driven by the
+# primary source's frames, so time windows and TTLs behave the same on every run.
+replay_clock = None
+monotonic_clock = time.monotonic
+if args.replay:
+    start = parse_start_time(args.replay_start) if args.replay_start else datetime.datetime.now()
+    replay_clock = ReplayClock(start, args.source_fps or getattr(captures[primary_camera], "fps", 15.0))
+    captures[primary_camera] = ClockedSource(captures[primary_camera], replay_clock)
+    set_clock(replay_clock.now)
+    monotonic_clock = replay_clock.monotonic
+    print(f"[INFO] Replay ({args.replay}) from {start:%Y-%m-%d %H:%M:%S} at {replay_clock.fps:g} fps.")
 
-        if time_str == "06:00:00":
-            print("[INFO] Resetting tracking dictionaries at 06:00.")
-            welcome_dictionary.clear()
+# --- Attendance Journal ---
+# Sessions are journaled as they happen; after a restart today's sessions are rebuilt
+# from the journal, and finished days are compacted into LOG_FILE.
+sessions_day = session_day(*get_current_time())
+journal = None
+if not args.no_journal:
+    journal_path = args.journal or f"./log/attendance_journal.{'db' if args.journal_backend == 'sqlite' else 'jsonl'}"
+    journal = startup.step("journal", AttendanceJournal, journal_path, backend=args.journal_backend,
+                           fsync_interval=args.journal_fsync, seen_interval=args.journal_seen_interval)
+    restored = replay_sessions(journal.events(sessions_day), welcome_dictionary, goodbye_dictionary)
+    print(f"[INFO] Attendance journal {journal_path}: restored {len(welcome_dictionary)} welcome and "
+          f"{len(goodbye_dictionary)} goodbye sessions from {restored} events of {sessions_day}.")
+    metrics.gauge_fn("journal_pending", journal.pending)
+
+def make_camera(camera_id):
+    camera = CameraContext(camera_id)
+    if args.track or args.identity_cache:
+        camera.tracker = FaceTracker()
+        camera.scheduler = DetectionScheduler(every=detect_every, adaptive=args.adaptive and args.track,
+                                              target_frame_time=1.0 / args.target_fps)
+    if args.identity_cache:
+        camera.identity_cache = IdentityCache(ttl=args.cache_ttl, min_score=SIMILARITY_THRESHOLD + 0.1, clock=monotonic_clock)
+    if args.motion_gate:
+        camera.motion_gate = MotionGate(min_changed=args.motion_threshold, idle_interval=args.idle_detect_interval,
+                                        clock=monotonic_clock)
+    return camera
+
+cameras = {camera_id: make_camera(camera_id) for camera_id, _ in sources}
+
+quality_gate = None
+if args.quality_gate:
+    quality_gate = QualityGate(min_size=args.min_face_size, min_score=args.min_det_score, min_sharpness=args.min_sharpness,
+                               max_yaw=args.max_yaw, max_pitch=args.max_pitch)
+    print(f"[INFO] Quality gate enabled: {quality_gate}")
+    for reason in REASONS:
+        metrics.inc(f"faces_rejected_{reason}", 0)  # Export every reason from the start
+if args.identity_cache:
+    metrics.gauge_fn("identity_cache_hit_rate", lambda: float(np.mean(
+        [camera.identity_cache.stats()["hit_rate"] for camera in cameras.values()])))
+
+print(f"[INFO] {'Webcam feed' if len(sources) == 1 else f'{len(sources)} camera feeds'} started. Press 'q' or 'Esc' to quit.")
+
+# --- Frame Processing ---
+def update_day_state(date_str, time_str):
+    """
+    Day rollover, by comparison rather than exact-second matches, so a slow frame
+    cannot skip it: the day is logged from 01:00 the next day and the dictionaries are
+    reset from 06:00.
+    """
+    global day_end_logged, sessions_day
+
+    if journal is not None:
+        journal.compact_due(date_str, time_str, LOG_FILE)
+    elif not day_end_logged and date_str > sessions_day and time_str >= "01:00:00":
+        check_and_log_day_end(welcome_dictionary=welcome_dictionary,
+                              goodbye_dictionary=goodbye_dictionary,
+                              LOG_FILE=LOG_FILE)
+        day_end_logged = True
+
+    today = session_day(date_str, time_str)
+    if today != sessions_day:
+        print(f"[INFO] Resetting tracking dictionaries for {today}.")
+        welcome_dictionary.clear()
+        goodbye_dictionary.clear()
+        day_end_logged = False
+        sessions_day = today
+
+def match_faces(faces):
+    """Return one (uid, score) per face, from the prototype index when --prototypes is set."""
+    if prototype_searcher is not None:
+        return prototype_searcher.match(stack_embeddings(faces), SIMILARITY_THRESHOLD)
+    return recognize_faces(faces, faiss_index, row_uids, TOP_K, SIMILARITY_THRESHOLD)
+
+def detect_frame(camera, frame):
+    """
+    First half of recognition for one frame: detection, track association and
+    identity-cache lookups, the quality gate, then embedding of the faces that still
+    need a search.
+    returns:
+        dict: faces, tracks, matches (None where a search is pending), pending indexes
+        and rejected ({index: reason} for faces the quality gate turned away).
+    """
+    img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    with metrics.timer("detection"):
+        faces = detect_faces(facemodel, img_rgb)
+    metrics.inc("faces_detected", len(faces))
+    if camera.tracker is not None:
+        with metrics.timer("tracking"):
+            tracks = camera.tracker.update(frame, [face.bbox for face in faces])
+    else:
+        tracks = [None] * len(faces)
+
+    matches = [None] * len(faces)
+    if camera.identity_cache is not None:
+        matches = [camera.identity_cache.get(track.track_id, face.bbox) for face, track in zip(faces, tracks)]
+    pending = [i for i, match in enumerate(matches) if match is None]
+    rejected = {}
+    if quality_gate is not None and pending:
+        with metrics.timer("quality"):
+            # The BGR frame, as prep/train.py checks cv2.imread images: sharpness weighs channels by order
+            passed, rejected = quality_gate.split(frame, [faces[i] for i in pending])
+        rejected = {pending[j]: reason for j, reason in rejected.items()}
+        pending = [pending[j] for j in passed]
+        for i, reason in rejected.items():
+            matches[i] = ("Unknown", None)
+            metrics.inc(f"faces_rejected_{reason}")
+    with metrics.timer("embedding"):
+        pending_faces = embed_faces(facemodel, img_rgb, [faces[i] for i in pending])
+    metrics.inc("faces_embedded", len(pending_faces))
+    return {"faces": faces, "tracks": tracks, "matches": matches, "pending": pending, "pending_faces": pending_faces,
+            "rejected": rejected}
+
+def journal_sighting(phase, exists, uid, session_track, camera):
+    if journal is None:
+        return
+    store = welcome_dictionary if phase == "welcome" else goodbye_dictionary
+    record = store.get(uid)
+    journal.record("seen" if exists else phase, uid, record.name, record.date, record.last_seen,
+                   track=session_track, camera=camera.camera_id, phase=phase if exists else None)
+
+def record_attendance(camera, uid, track, time_str):
+    global welcome_dictionary, goodbye_dictionary
+
+    session_track = camera.session_key(track)
+    if "08:45:00" <= time_str < "17:45:00":
+        exists, welcome_dictionary = add_to_dictionary(welcome_dictionary, uid, session_track, camera.camera_id)
+        journal_sighting("welcome", exists, uid, session_track, camera)
+        if not exists:
+            name = get_name(uid)
+            with metrics.timer("audio_dispatch"):
+                audio.say(uid, welcome=True)
+            metrics.inc("welcomes")
+            print(f"[INFO] Welcome recorded for {name}{camera_suffix(camera)}")
             goodbye_dictionary.clear()
-            day_end_logged = False
+    elif "17:45:00" <= time_str < "23:59:59":
+        exists, goodbye_dictionary = add_to_dictionary(goodbye_dictionary, uid, session_track, camera.camera_id)
+        journal_sighting("goodbye", exists, uid, session_track, camera)
+        if not exists:
+            name = get_name(uid)
+            with metrics.timer("audio_dispatch"):
+                audio.say(uid, welcome=False)
+            metrics.inc("goodbyes")
+            print(f"[INFO] Goodbye recorded for {name}{camera_suffix(camera)}")
+            welcome_dictionary.clear()
+
+def camera_suffix(camera):
+    return f" at {camera.camera_id}" if len(cameras) > 1 else ""
+
+def finish_frame(camera, work, search_error, time_str):
+    """Second half of recognition: attendance tracking and the (bbox, label, score, color) list."""
+    detections = []
+    for i, (face, track, (uid, best_score)) in enumerate(zip(work["faces"], work["tracks"], work["matches"])):
+        bbox = face.bbox.astype(int)
+        if i in work["rejected"]:
+            detections.append((bbox, "Low quality", None, (128, 128, 128)))  # Not searched, so neither known nor unknown
+            if track is not None:
+                track.payload = detections[-1][1:]
+            continue
 
-        if time_str == "01:00:00" and not day_end_logged:
-            check_and_log_day_end(welcome_dictionary=welcome_dictionary,
-                                  goodbye_dictionary=goodbye_dictionary,
-                                  LOG_FILE=LOG_FILE)
-            day_end_logged = True
+        try:
+            if search_error is not None:
+                raise search_error
 
-        ret, frame = cap.read()
+            if uid != "Unknown":
+                label, score = uid, best_score
+                record_attendance(camera, uid, track, time_str)
+            else:
+                label, score = "Unknown", None
+                metrics.inc("faces_unknown")
+
+        except Exception as e:
+            label, score = f"Error: {str(e)}", None
+            print(f"[ERROR] FAISS query failed: {e}")
+
+        color = (0, 255, 0) if label != "Unknown" else (0, 0, 255)
+        detections.append((bbox, label, score, color))
+        if track is not None:
+            track.payload = (label, score, color)
+    return detections
+
+def recognize_frames(batch):
+    """
+    args:
+        batch (list): (CameraContext, frame) pairs, at most one frame per camera.
+    returns:
+        list: For every frame, (bbox, label, score, color) for each face in it.
+
+    Frames that barely differ from their camera's background (--motion-gate) reuse
+    the camera's previous results, and with --track only the frames picked by the
+    camera's scheduler (or with a lost track) run detection; the others propagate
+    boxes with the tracker. The faces of all frames that were detected are then
+    searched in a single batch, so several cameras share one FAISS call per round.
+    """
+    if profiler is not None:
+        profiler.tick()
+    date_str, time_str = get_current_time()
+    update_day_state(date_str, time_str)
+
+    results = [None] * len(batch)
+    work = []
+    with metrics.timer("inference"):
+        for slot, (camera, frame) in enumerate(batch):
+            metrics.inc("frames")
+            camera.frames += 1
+            if camera.motion_gate is not None and not camera.motion_gate.should_detect(frame):
+                metrics.inc("frames_motion_skipped")
+                results[slot] = camera.last_detections  # Nothing moved: the previous results still describe the scene
+                continue
+
+            start = time.perf_counter()
+            if camera.tracker is not None and not camera.scheduler.should_detect(force=camera.tracker.lost):
+                with metrics.timer("tracking"):
+                    tracks = camera.tracker.predict(frame)
+                results[slot] = camera.last_detections = [(track.bbox.astype(int), *track.payload) for track in tracks]
+                camera.scheduler.record(time.perf_counter() - start, detected=False)
+                continue
+
+            frame_work = detect_frame(camera, frame)
+            frame_work.update(slot=slot, camera=camera, elapsed=time.perf_counter() - start)
+            work.append(frame_work)
+            camera.detected_frames += 1
+            camera.faces += len(frame_work["faces"])
+
+        start = time.perf_counter()
+        try:
+            with metrics.timer("search"):
+                all_matches = match_faces([face for frame_work in work for face in frame_work["pending_faces"]])
+            all_matches = iter(all_matches)
+            for frame_work in work:
+                for i in frame_work["pending"]:
+                    match = next(all_matches)
+                    frame_work["matches"][i] = match
+                    if frame_work["camera"].identity_cache is not None:
+                        frame_work["camera"].identity_cache.put(frame_work["tracks"][i].track_id, match[0], match[1],
+                                                                frame_work["faces"][i].bbox)
+            search_error = None
+        except Exception as e:
+            for frame_work in work:
+                frame_work["matches"] = [("Unknown", 0.0)] * len(frame_work["faces"])
+            search_error = e
+        search_share = (time.perf_counter() - start) / len(work) if work else 0.0
+
+        for frame_work in work:
+            camera = frame_work["camera"]
+            start = time.perf_counter()
+            results[frame_work["slot"]] = camera.last_detections = finish_frame(camera, frame_work, search_error, time_str)
+            if camera.scheduler is not None:
+                camera.scheduler.record(frame_work["elapsed"] + search_share + time.perf_counter() - start, detected=True)
+    if startup.ready():
+        print(startup.report())
+    return results
+
+def recognize_frame(frame):
+    """Recognize a single frame from the primary camera; see recognize_frames."""
+    return recognize_frames([(cameras[primary_camera], frame)])[0]
+
+def draw_detections(frame, detections):
+    if args.headless:
+        return frame
+    with metrics.timer("render"):
+        return renderer.draw(frame, detections)
+
+def timed_reader(cap):
+    def read_frame():
+        with metrics.timer("capture"):
+            return cap.read()
+    return read_frame
+
+def exit_requested(frame=None, window="Webcam Face Recognition (Local)"):
+    """Show the frame (if any) and return True when 'q' or Esc has been pressed."""
+    if not args.headless:
+        if frame is not None:
+            cv2.imshow(window, frame)
+        if cv2.waitKey(1) & 0xFF in [ord('q'), 27]:
+            print("[INFO] Exit key pressed. Terminating.")
+            return True
+    else:
+        if check_keypress():
+            print("[INFO] Exit key pressed (headless mode). Terminating.")
+            return True
+    return False
+
+def report_stats(stats_source, name):
+    print(f"[INFO] {name} stats: {stats_source.stats()}")
+    for camera in cameras.values():
+        if camera.scheduler is not None or camera.identity_cache is not None or camera.motion_gate is not None:
+            print(f"[INFO] Camera {camera.camera_id}: {camera.stats()}")
+    if metrics.enabled:
+        print(f"[INFO] Stage latency {metrics.summary()}")
+
+# --- Main Loops ---
+def run_sequential():
+    read_frame = timed_reader(captures[primary_camera])
+    while True:
+        ret, frame = read_frame()
         if not ret:
             print("[INFO] Failed to read frame from webcam.")
             break
 
-        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        faces = facemodel.get(img_rgb)
-
-        for face in faces:
-            bbox = face.bbox.astype(int)
-            embedding = normalize(face.embedding.astype("float32")).reshape(1, -1)
-
-            try:
-                scores, indices = faiss_index.search(embedding, TOP_K)
-                best_score = float(scores[0][0])
-                best_idx = int(indices[0][0])
-
-                if best_score >= SIMILARITY_THRESHOLD:
-                    vector_id = vector_ids[best_idx]
-                    meta = metadata.get(vector_id, {})
-                    uid = meta.get("uid", "Unknown")
-                    label = f"{uid} ({best_score:.2f})"
-
-                    if "08:45:00" <= time_str < "17:45:00":
-                        exists, welcome_dictionary = add_to_dictionary(welcome_dictionary, uid)
-                        if not exists:
-                            name = get_name(uid)
-                            play_sound(uid)
-                            print(f"[INFO] Welcome recorded for {name}")
-                            goodbye_dictionary.clear()
-                    elif "17:45:00" <= time_str < "23:59:59":
-                        exists, goodbye_dictionary = add_to_dictionary(goodbye_dictionary, uid)
-                        if not exists:
-                            name = get_name(uid)
-                            play_sound(uid)
-                            print(f"[INFO] Goodbye recorded for {name}")
-                            welcome_dictionary.clear()
-                else:
-                    label = "Unknown"
-
-            except Exception as e:
-                label = f"Error: {str(e)}"
-                print(f"[ERROR] FAISS query failed: {e}")
-
-            color = (0, 255, 0) if label != "Unknown" else (0, 0, 255)
-            frame_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            draw = ImageDraw.Draw(frame_pil)
-            draw.text((bbox[0], bbox[1] - 30), label, font=font, fill=color)
-            frame = cv2.cvtColor(np.array(frame_pil), cv2.COLOR_RGB2BGR)
-            cv2.rectangle(frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
+        frame = draw_detections(frame, recognize_frame(frame))
+        if exit_requested(frame):
+            break
 
-        if not args.headless:
-            cv2.imshow("Webcam Face Recognition (Local)", frame)
-            if cv2.waitKey(1) & 0xFF in [ord('q'), 27]:
-                print("[INFO] Exit key pressed. Terminating.")
+def run_pipelined():
+    pipeline = Pipeline(timed_reader(captures[primary_camera]), recognize_frame, queue_size=args.queue_size).start()
+    metrics.gauge_fn("capture_queue_depth", pipeline.capture_queue.depth)
+    metrics.gauge_fn("result_queue_depth", pipeline.result_queue.depth)
+    metrics.gauge_fn("frames_dropped_before_inference", lambda: pipeline.capture_queue.dropped)
+    metrics.gauge_fn("frames_dropped_before_render", lambda: pipeline.result_queue.dropped)
+    last_report = time.time()
+    try:
+        while pipeline.running():
+            item = pipeline.get_result(timeout=0.05)
+            if item is None:
+                if exit_requested():
+                    break
+                continue
+
+            frame, detections = item
+            frame = draw_detections(frame, detections)
+            if exit_requested(frame):
                 break
-        else:
-            if check_keypress():
-                print("[INFO] Exit key pressed (headless mode). Terminating.")
+
+            if time.time() - last_report >= PIPELINE_STATS_INTERVAL:
+                report_stats(pipeline, "Pipeline")
+                last_report = time.time()
+    finally:
+        pipeline.stop()
+        print(f"[INFO] Pipeline stats: {pipeline.stats()}")
+
+def run_multicam():
+    """
+    Capture every camera on its own thread and recognize them in fair rounds: each
+    round takes the freshest frame of every camera that has one and searches all of
+    their faces in one batch. Each camera is shown in its own window.
+    """
+    capture = MultiCapture({camera_id: timed_reader(cap) for camera_id, cap in captures.items()},
+                           queue_size=args.queue_size).start()
+    metrics.gauge_fn("frames_dropped_before_inference", lambda: sum(capture.stats()["dropped"].values()))
+    last_report = time.time()
+    try:
+        while capture.running():
+            batch = capture.next_round(timeout=0.05)
+            if batch:
+                results = recognize_frames([(cameras[camera_id], frame) for camera_id, frame in batch])
+                if not args.headless:
+                    for (camera_id, frame), detections in zip(batch, results):
+                        cv2.imshow(f"Face Recognition ({camera_id})", draw_detections(frame, detections))
+            if exit_requested():
                 break
 
+            if time.time() - last_report >= PIPELINE_STATS_INTERVAL:
+                report_stats(capture, "Multi-camera")
+                last_report = time.time()
+    finally:
+        capture.stop()
+        print(f"[INFO] Multi-camera stats: {capture.stats()}")
+
+def run_replay():
+    """
+    Lockstep replay: every round reads exactly one frame from each source, so no frame
+    is dropped and results do not depend on processing speed. Reports throughput.
+    """
+    readers = {camera_id: timed_reader(cap) for camera_id, cap in captures.items()}
+    started_at = time.perf_counter()
+    frames = 0
+    while True:
+        batch = []
+        for camera_id, read_frame in readers.items():
+            ret, frame = read_frame()
+            if ret:
+                batch.append((camera_id, frame))
+        if not batch:
+            print("[INFO] Replay finished.")
+            break
+
+        results = recognize_frames([(cameras[camera_id], frame) for camera_id, frame in batch])
+        frames += len(batch)
+        if not args.headless:
+            for (camera_id, frame), detections in zip(batch, results):
+                cv2.imshow(f"Face Recognition ({camera_id})", draw_detections(frame, detections))
+        if exit_requested():
+            break
+
+    elapsed = time.perf_counter() - started_at
+    print(f"[INFO] Replayed {frames} frames in {elapsed:.1f}s ({frames / elapsed if elapsed > 0 else 0.0:.1f} fps), "
+          f"clock ended at {replay_clock.now():%Y-%m-%d %H:%M:%S}.")
+
+try:
+    if args.replay:
+        run_replay()
+    elif len(cameras) > 1:
+        run_multicam()
+    elif args.sequential:
+        run_sequential()
+    else:
+        run_pipelined()
+
 finally:
     if not platform.system() == 'Windows' and args.headless:
         termios.tcsetattr(sys.stdin, termios.TCSADRAIN, orig_settings)
 
-    cap.release()
-    cv2.destroyAllWindows()
+    audio.stop()
+    if journal is not None:
+        journal.stop()
+        print(f"[INFO] Attendance journal stats: {journal.stats()}")
+    if metrics_server is not None:
+        metrics_server.stop()
+    if metrics_writer is not None:
+        metrics_writer.stop()
+    for cap in captures.values():
+        cap.release()
+    if not args.headless:
+        cv2.destroyAllWindows()
     print(f"[INFO] Welcome entries: {welcome_dictionary}")
     print(f"[INFO] Goodbye entries: {goodbye_dictionary}")
+    for camera in cameras.values():
+        print(f"[INFO] Camera {camera.camera_id}: {camera.stats()}")
+    print(f"[INFO] Audio stats: {audio.stats()}")
+    if quality_gate is not None:
+        print(f"[INFO] Quality gate stats: {quality_gate.stats()}")
+    if metrics.enabled:
+        print(f"[INFO] Stage latency {metrics.summary()}")
     print("[INFO] Exiting application.")
@@ -0,0 +1,128 @@
+import cv2
+import numpy as np
+
+# Batched ArcFace inference. insightface's recognition model aligns and embeds one face per
+# session.run() call, so a frame with many faces pays the per-call overhead of ONNX Runtime
+# once per face. BatchArcFace aligns every crop first (the same norm_crop as insightface)
+# and runs them through the recognition session together, with explicit ONNX Runtime
+# threading and graph optimization settings.
+#
+#   python bench/bench_batch_embed.py --faces 1 4 16 32
+
+GRAPH_OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+def session_options(intra_op_threads=0, inter_op_threads=0, graph_opt="all"):
+    """
+    args:
+        intra_op_threads (int): Threads used inside one operator (0 = ONNX Runtime default).
+        inter_op_threads (int): Threads running independent operators (0 = default).
+        graph_opt (str): Key of GRAPH_OPT_LEVELS.
+    returns:
+        onnxruntime.SessionOptions
+    """
+    import onnxruntime as ort  # Deferred so importing this module stays cheap
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPT_LEVELS[graph_opt])
+    return options
+
+
+class BatchArcFace:
+    """
+    args:
+        model_file (str): ArcFace ONNX model (e.g. buffalo_l's w600k_r50.onnx).
+        input_mean, input_std (float): Pixel normalization the model was trained with.
+        max_batch (int): Crops per session.run(); models exported with a fixed batch
+            dimension use that instead.
+        options (onnxruntime.SessionOptions): See session_options().
+        providers (list): ONNX Runtime execution providers (default: CPU).
+        session (onnxruntime.InferenceSession): An existing session of model_file to use
+            instead of creating one; options and providers are then ignored.
+    """
+
+    def __init__(self, model_file, input_mean=127.5, input_std=127.5, max_batch=32, options=None, providers=None,
+                 session=None):
+        import onnxruntime as ort
+
+        self.model_file = model_file
+        self.input_mean = input_mean
+        self.input_std = input_std
+        self.session = session or ort.InferenceSession(model_file, sess_options=options or session_options(),
+                                                       providers=providers or ["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = tuple(model_input.shape[2:4][::-1])
+        self.output_names = [output.name for output in self.session.get_outputs()]
+        fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        self.max_batch = min(max_batch, fixed_batch) if fixed_batch else max_batch
+        self.fixed_batch = fixed_batch
+
+    @classmethod
+    def from_model(cls, rec_model, **kwargs):
+        """Build from a loaded insightface ArcFaceONNX, keeping its normalization and providers."""
+        if "providers" not in kwargs:
+            kwargs["providers"] = rec_model.session.get_providers()
+        return cls(rec_model.model_file, rec_model.input_mean, rec_model.input_std, **kwargs)
+
+    def align(self, img, kps):
+        from insightface.utils import face_align
+
+        return face_align.norm_crop(img, landmark=kps, image_size=self.input_size[0])
+
+    def embed_crops(self, crops):
+        """
+        args:
+            crops (list): Aligned crops of input_size, as returned by align().
+        returns:
+            np.ndarray: (len(crops), 512) raw embeddings, in crop order.
+        """
+        if not crops:
+            return np.empty((0, 512), dtype="float32")
+        outputs = []
+        for start in range(0, len(crops), self.max_batch):
+            chunk = crops[start:start + self.max_batch]
+            blob = cv2.dnn.blobFromImages(chunk, 1.0 / self.input_std, self.input_size,
+                                          (self.input_mean,) * 3, swapRB=True)
+            if self.fixed_batch and len(chunk) < self.fixed_batch:
+                blob = np.concatenate([blob, np.zeros((self.fixed_batch - len(chunk),) + blob.shape[1:], blob.dtype)])
+            outputs.append(self.session.run(self.output_names, {self.input_name: blob})[0][:len(chunk)])
+        return np.vstack(outputs).astype("float32", copy=False)
+
+    def embed_faces(self, img, faces):
+        """Set face.embedding on every face of one image with a single batched call."""
+        embeddings = self.embed_crops([self.align(img, face.kps) for face in faces])
+        for face, embedding in zip(faces, embeddings):
+            face.embedding = embedding
+        return faces
+
+def enable_batch_recognition(facemodel, intra_op_threads=0, inter_op_threads=0, graph_opt="all", max_batch=32):
+    """
+    Route the recognition step of faces.embed_faces through one BatchArcFace session.
+    With ONNX Runtime's default settings (0 threads, graph_opt "all", as insightface
+    creates its sessions) the model's own session is reused. Otherwise the original
+    session is released before the replacement is created, so the recognition weights
+    are never held twice.
+    """
+    rec_model = facemodel.models["recognition"]
+    if (intra_op_threads, inter_op_threads, graph_opt) == (0, 0, "all"):
+        batch_model = BatchArcFace.from_model(rec_model, max_batch=max_batch, session=rec_model.session)
+    else:
+        original, providers = rec_model.session, rec_model.session.get_providers()
+        rec_model.session = None
+        del original  # Drop the last reference before the new session loads the weights again
+        try:
+            batch_model = BatchArcFace.from_model(rec_model, max_batch=max_batch, providers=providers,
+                                                  options=session_options(intra_op_threads, inter_op_threads, graph_opt))
+        except Exception:
+            rec_model.session = BatchArcFace.from_model(rec_model, providers=providers).session  # Keep the model usable
+            raise
+    rec_model.session = batch_model.session
+    facemodel.batch_recognizer = batch_model
+    return batch_model
@@ -0,0 +1,173 @@
+import os
+import wave
+import queue
+import threading
+import itertools
+
+# Greetings are generated and played on a background worker so the video loop never waits on audio.
+
+def greeting_text(name, welcome):
+    return f"Welcome, {name}!" if welcome else f"Goodbye, {name}!"
+
+def clip_path(temp_dir, stem, welcome, extension):
+    return os.path.join(temp_dir, f"{stem}_{'welcome' if welcome else 'goodbye'}.{extension}")
+
+
+class ElevenLabsTTS:
+    """Text-to-speech through the ElevenLabs API (the client is imported and created on first use)."""
+    extension = "mp3"
+
+    def __init__(self, api_key=None, voice_id="21m00Tcm4TlvDq8ikWAM", model_id="eleven_multilingual_v2"):
+        self.api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self._client = None
+
+    def synthesize(self, text, path):
+        if self._client is None:
+            from elevenlabs import ElevenLabs
+            self._client = ElevenLabs(api_key=self.api_key)
+        response = self._client.text_to_speech.convert(
+            voice_id=self.voice_id,
+            output_format="mp3_44100_128",
+            text=text,
+            model_id=self.model_id
+        )
+        with open(path, "wb") as f:
+            for chunk in response:
+                f.write(chunk)
+
+
+class StubTTS:
+    """Offline TTS backend that writes a short silent WAV clip, for tests and machines without API access."""
+    extension = "wav"
+
+    def __init__(self, duration=0.2, sample_rate=16000):
+        self.duration = duration
+        self.sample_rate = sample_rate
+        self.calls = []
+
+    def synthesize(self, text, path):
+        self.calls.append(text)
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(b"\x00\x00" * int(self.duration * self.sample_rate))
+
+
+def play_file(path):
+    from playsound import playsound
+    playsound(path)
+
+
+class AudioWorker:
+    """
+    Background TTS + playback worker.
+
+    args:
+        tts: Backend with an `extension` attribute and synthesize(text, path).
+        name_lookup (callable): uid -> display name.
+        player (callable): Plays an audio file; blocking is fine, it runs on the worker thread.
+        temp_dir (str): Directory where generated clips are cached.
+
+    say() only enqueues work and returns immediately. A (uid, welcome) request
+    that is already waiting in the queue is coalesced with it. Playback requests
+    take priority over prewarm jobs, which just generate clips into temp_dir.
+    """
+
+    STOP, PLAY, PREWARM = -1, 0, 1
+
+    def __init__(self, tts, name_lookup, player=play_file, temp_dir="./temp"):
+        self.tts = tts
+        self.name_lookup = name_lookup
+        self.player = player
+        self.temp_dir = temp_dir
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+        self.played = 0
+        self.generated = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def start(self):
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self._thread.start()
+        return self
+
+    def _submit(self, kind, uid, welcome):
+        key = (kind, uid, welcome)
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+                return False
+            self._pending.add(key)
+        self._queue.put((kind, next(self._order), uid, welcome))
+        return True
+
+    def say(self, uid, welcome=True):
+        """Queue the welcome/goodbye greeting for uid. Never blocks."""
+        return self._submit(self.PLAY, uid, welcome)
+
+    def prewarm(self, uids):
+        """Queue generation of every uid's welcome and goodbye clips (uids without a name are skipped)."""
+        for uid in uids:
+            if not self.name_lookup(uid):
+                continue
+            for welcome in (True, False):
+                self._submit(self.PREWARM, uid, welcome)
+
+    def clip(self, uid, welcome):
+        """Return the path of uid's clip, generating it first if it is not cached yet."""
+        name = self.name_lookup(uid)
+        # Some roster entries have no name yet; fall back to the uid so their clips do not collide
+        path = clip_path(self.temp_dir, name or uid, welcome, self.tts.extension)
+        if not os.path.isfile(path):
+            print(f"[INFO] Generating voice for UID: {uid} with name: {name}")
+            tmp_path = path + ".part"
+            self.tts.synthesize(greeting_text(name, welcome), tmp_path)
+            os.replace(tmp_path, path)
+            self.generated += 1
+        return path
+
+    def _run(self):
+        while True:
+            kind, _, uid, welcome = self._queue.get()
+            if kind == self.STOP:
+                break
+            with self._lock:
+                self._pending.discard((kind, uid, welcome))
+            try:
+                path = self.clip(uid, welcome)
+            except Exception as e:
+                self.failed += 1
+                print(f"[ERROR] Failed to generate voice for UID {uid}: {e}")
+                continue
+            if kind != self.PLAY:
+                continue
+            try:
+                self.player(path)
+                self.played += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[ERROR] Failed to play sound: {e}")
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stop(self, timeout=2):
+        """Stop after the clip currently being played; queued jobs are abandoned."""
+        self._queue.put((self.STOP, next(self._order), None, None))
+        self._thread.join(timeout=timeout)
+
+    def stats(self):
+        return {
+            "pending": self.pending(),
+            "played": self.played,
+            "generated": self.generated,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+        }
@@ -0,0 +1,181 @@
+import os
+import sys
+import cv2
+import json
+import time
+import argparse
+import faiss
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils import get_name, prefetch, trim_partial_line
+from faces import detect_faces, embed_faces
+from recognize import stack_embeddings, search_batch, resolve_top_k
+from prototypes import load_row_uids
+from index_spec import load_params, apply_search_params
+from profiles import PROFILES, DEFAULT_PROFILE, describe_profile, load_face_model
+
+# Offline batch recognition against the local FAISS index, for labelling archived snapshots.
+#
+#   python app/batch_recognize.py ./snapshots/ --output results.jsonl --workers 4
+#   python app/batch_recognize.py --file-list paths.txt --output results.jsonl --resume
+#
+# Images are decoded on a prefetch pool and run through detection and embedding on a worker
+# pool sharing one model; the faces of each batch of images are searched with one FAISS call.
+# One JSON line per image is appended as soon as its batch completes, so --resume can skip
+# everything already in the output after an interruption.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+INDEX_PATH = "./faissIndex/face_index_cosine.faiss"
+METADATA_PATH = "./faissIndex/face_metadata.json"
+
+def collect_inputs(inputs, file_list=None):
+    """Expand files and directories (recursively, in name order) into a list of image paths."""
+    paths = []
+    if file_list:
+        with (sys.stdin if file_list == "-" else open(file_list, "r")) as f:
+            paths.extend(line.strip() for line in f if line.strip())
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                paths.extend(os.path.join(root, name) for name in sorted(files)
+                             if name.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            paths.append(item)
+    return paths
+
+def completed_paths(output_path):
+    """Paths already written to a JSONL output; a truncated last line is ignored."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["path"])
+            except (ValueError, KeyError):
+                pass  # Partial line from an interrupted run
+    return done
+
+def decode_image(path):
+    data = np.fromfile(path, dtype=np.uint8) if os.path.isfile(path) else None
+    img = cv2.imdecode(data, cv2.IMREAD_COLOR) if data is not None and data.size else None
+    return path, img
+
+def detect_and_embed(facemodel, batch, max_faces=0):
+    """Return [(path, faces or None)] for a batch of decoded (path, img) pairs."""
+    results = []
+    for path, img in batch:
+        if img is None:
+            results.append((path, None))
+            continue
+        faces = detect_faces(facemodel, img, max_num=max_faces)  # BGR, as the index was built
+        results.append((path, embed_faces(facemodel, img, faces)))
+    return results
+
+def records_for_batch(results, faiss_index, row_uids, top_k, threshold):
+    """Search every face of a batch of images at once and build one output record per image."""
+    faces = [face for _, image_faces in results for face in (image_faces or [])]
+    scores, indices = search_batch(faiss_index, stack_embeddings(faces), top_k * 4)  # Extra depth for distinct uids
+    matches = iter(resolve_top_k(scores, indices, row_uids, top_k))
+
+    records = []
+    for path, image_faces in results:
+        if image_faces is None:
+            records.append({"path": path, "error": "unreadable image"})
+            continue
+        face_records = [face_record(face, next(matches), threshold) for face in image_faces]
+        records.append({"path": path, "faces": face_records})
+    return records
+
+def match_record(top, threshold):
+    """JSON-ready result for one query from its resolve_top_k list."""
+    best_uid, best_score = top[0] if top else ("Unknown", 0.0)
+    matched = best_score >= threshold
+    return {
+        "uid": best_uid if matched else "Unknown",
+        "name": get_name(best_uid) if matched else "Unknown",
+        "score": round(best_score, 4),
+        "matches": [{"uid": uid, "score": round(score, 4)} for uid, score in top],
+    }
+
+def face_record(face, top, threshold):
+    return {
+        "bbox": [round(float(v), 1) for v in face.bbox],
+        "det_score": round(float(face.det_score), 4),
+        **match_record(top, threshold),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognize faces in many images against the local FAISS index")
+    parser.add_argument("inputs", nargs="*", help="Image files and/or directories (searched recursively)")
+    parser.add_argument("--file-list", default=None, help="Text file with one image path per line ('-' for stdin)")
+    parser.add_argument("--output", required=True, help="JSONL output, one line per image")
+    parser.add_argument("--resume", action="store_true", help="Skip images already in --output and append to it")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--metadata", default=METADATA_PATH)
+    parser.add_argument("--top-k", type=int, default=3, help="Distinct uids reported per face")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Minimum similarity for the uid field")
+    parser.add_argument("--max-faces", type=int, default=0, help="Keep at most this many faces per image (0 = all)")
+    parser.add_argument("--workers", type=int, default=4, help="Decode and embedding worker threads")
+    parser.add_argument("--batch-size", type=int, default=16, help="Images per embedding / search batch")
+    parser.add_argument("--ctx-id", type=int, default=0, help="InsightFace context: 0 for GPU, -1 for CPU")
+    parser.add_argument("--model-profile", choices=list(PROFILES), default=DEFAULT_PROFILE,
+                        help="Face model modules, detector size and image downscale (see app/profiles.py)")
+    args = parser.parse_args()
+
+    paths = collect_inputs(args.inputs, args.file_list)
+    if args.resume:
+        trim_partial_line(args.output)
+        done = completed_paths(args.output)
+        paths = [path for path in paths if path not in done]
+        print(f"[INFO] Resuming: {len(done)} images already done, {len(paths)} to go.")
+    elif os.path.exists(args.output):
+        parser.error(f"{args.output} exists; pass --resume to continue it or choose another --output")
+    if not paths:
+        print("[INFO] Nothing to do.")
+        return
+
+    print("[INFO] Loading FAISS index and metadata.")
+    faiss_index = faiss.read_index(args.index)
+    apply_search_params(faiss_index, load_params(args.index))
+    row_uids = load_row_uids(args.metadata)
+
+    print(f"[INFO] Loading face embedding model: {describe_profile(args.model_profile)}.")
+    facemodel = load_face_model(args.model_profile, ctx_id=args.ctx_id)
+
+    start = time.time()
+    images = faces_total = 0
+    with open(args.output, "a") as out, \
+            ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="decode") as io_pool, \
+            ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="embed") as embed_pool:
+        in_flight = deque()
+
+        def collect(future):
+            nonlocal images, faces_total
+            for record in records_for_batch(future.result(), faiss_index, row_uids, args.top_k, args.threshold):
+                out.write(json.dumps(record) + "\n")
+                images += 1
+                faces_total += len(record.get("faces", []))
+            out.flush()
+            print(f"[INFO] {images}/{len(paths)} images, {faces_total} faces "
+                  f"({images / max(time.time() - start, 1e-9):.1f} images/s).")
+
+        batch = []
+        for item in prefetch(io_pool, decode_image, paths, args.batch_size * args.workers * 2):
+            batch.append(item)
+            if len(batch) >= args.batch_size:
+                in_flight.append(embed_pool.submit(detect_and_embed, facemodel, batch, args.max_faces))
+                batch = []
+                while len(in_flight) > args.workers:
+                    collect(in_flight.popleft())  # Batches are written in input order
+        if batch:
+            in_flight.append(embed_pool.submit(detect_and_embed, facemodel, batch, args.max_faces))
+        while in_flight:
+            collect(in_flight.popleft())
+
+    print(f"[INFO] Done: {images} images, {faces_total} faces in {time.time() - start:.1f}s. Results in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from profiles import downscale
+
+# FaceAnalysis.get() runs detection and every other model in one call. These helpers
+# split it in two so callers can decide which detected faces are worth embedding.
+
+Face = None  # insightface's Face class, imported by load_face_class()
+
+def load_face_class():
+    """
+    Import insightface's Face class. It is deferred so importing this module stays cheap;
+    app.py calls this during its parallel startup so the first frame does not pay for it.
+    """
+    global Face
+    if Face is None:
+        from insightface.app.common import Face as face_class
+        Face = face_class
+    return Face
+
+def detect_faces(facemodel, img, max_num=0, max_side=None):
+    """
+    args:
+        facemodel (FaceAnalysis): A prepared FaceAnalysis instance.
+        img (np.ndarray): Image passed to the detector.
+        max_num (int): Keep at most this many faces (0 = all).
+        max_side (int): Detect on a copy shrunk to this longer side; defaults to the
+            model's profile setting (see profiles.py). Boxes and keypoints are returned
+            in img coordinates either way.
+    returns:
+        list: Face objects with bbox, kps and det_score only.
+    """
+    face_class = Face or load_face_class()
+    if max_side is None:
+        max_side = getattr(facemodel, "max_side", None)
+    small, scale = downscale(img, max_side)
+    bboxes, kpss = facemodel.det_model.detect(small, max_num=max_num, metric='default')
+    if scale != 1.0:
+        bboxes[:, 0:4] /= scale
+        if kpss is not None:
+            kpss = kpss / scale
+    faces = []
+    for i in range(bboxes.shape[0]):
+        kps = kpss[i] if kpss is not None else None
+        faces.append(face_class(bbox=bboxes[i, 0:4], kps=kps, det_score=bboxes[i, 4]))
+    return faces
+
+def embed_faces(facemodel, img, faces):
+    """
+    Run every non-detection model of facemodel on the given faces, as FaceAnalysis.get() does.
+    With a batch_recognizer attached (see arcface.enable_batch_recognition), all faces are
+    embedded in one recognition call instead of one call per face.
+    """
+    batch_recognizer = getattr(facemodel, "batch_recognizer", None)
+    if batch_recognizer is not None and faces:
+        batch_recognizer.embed_faces(img, faces)
+    for face in faces:
+        for taskname, model in facemodel.models.items():
+            if taskname == 'detection' or (taskname == 'recognition' and batch_recognizer is not None):
+                continue
+            model.get(img, face)
+    return faces
+
+def get_faces(facemodel, img, max_num=0):
+    """FaceAnalysis.get() equivalent that honours the model profile's pre-downscale."""
+    return embed_faces(facemodel, img, detect_faces(facemodel, img, max_num=max_num))
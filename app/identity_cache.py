@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+from tracker import iou_matrix
+
+class IdentityCache:
+    """
+    Track-keyed cache of confirmed identities.
+
+    Once a track has been recognized with a confident score, get() returns that
+    uid and score instead of re-running ArcFace and FAISS, until one of:
+      - the entry is older than ttl seconds,
+      - the decayed confidence (score - decay * age) drops below min_score,
+      - the track's box jumps so that its IoU with the cached box is below min_iou.
+    The cache holds at most capacity entries and evicts the least recently used.
+
+    args:
+        ttl (float): Maximum age of an entry in seconds.
+        min_score (float): Minimum (decayed) score for an entry to be trusted.
+        decay (float): Score lost per second since the identity was confirmed.
+        min_iou (float): Minimum IoU between the current and cached box.
+        capacity (int): Maximum number of cached tracks.
+    """
+
+    def __init__(self, ttl=10.0, min_score=0.6, decay=0.01, min_iou=0.3, capacity=256, clock=time.monotonic):
+        self.ttl = ttl
+        self.min_score = min_score
+        self.decay = decay
+        self.min_iou = min_iou
+        self.capacity = capacity
+        self.clock = clock
+        self._entries = OrderedDict()  # track_id -> [uid, score, bbox, confirmed_at]
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, track_id, bbox):
+        """Return the cached (uid, score) for track_id, or None when recognition must re-run."""
+        entry = self._entries.get(track_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        uid, score, cached_bbox, confirmed_at = entry
+        age = self.clock() - confirmed_at
+        if (age > self.ttl
+                or score - self.decay * age < self.min_score
+                or iou_matrix([cached_bbox], [bbox])[0, 0] < self.min_iou):
+            del self._entries[track_id]
+            self.expired += 1
+            self.misses += 1
+            return None
+
+        entry[2] = bbox
+        self._entries.move_to_end(track_id)
+        self.hits += 1
+        return uid, score
+
+    def put(self, track_id, uid, score, bbox):
+        """Cache a recognition result; results that are not confident enough are not cached."""
+        if uid == "Unknown" or score < self.min_score:
+            self._entries.pop(track_id, None)
+            return
+        self._entries[track_id] = [uid, score, bbox, self.clock()]
+        self._entries.move_to_end(track_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def discard(self, track_id):
+        self._entries.pop(track_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
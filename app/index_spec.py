@@ -0,0 +1,115 @@
+import os
+import json
+import math
+import faiss
+
+# Index specs for the face index. A spec is a kind plus optional comma-separated parameters:
+#
+#   flat                           exact search (default)
+#   sq8                            8-bit scalar-quantized vectors, exact scan
+#   hnsw:M=32,efConstruction=200,efSearch=64
+#   ivf-flat:nlist=1024,nprobe=16
+#   ivf-pq:nlist=1024,m=64,nbits=8,nprobe=16
+#
+# Omitted nlist / nbits are derived from the number of training vectors. Search parameters
+# (nprobe, efSearch) are saved next to the index in <index>.params.json and applied on load.
+
+KINDS = ("flat", "sq8", "hnsw", "ivf-flat", "ivf-pq")
+SEARCH_PARAMS = ("nprobe", "efSearch")
+
+def parse_spec(spec):
+    """Split "ivf-pq:nlist=256,m=64" into ("ivf-pq", {"nlist": 256, "m": 64})."""
+    kind, _, rest = spec.partition(":")
+    kind = kind.strip().lower()
+    if kind not in KINDS:
+        raise ValueError(f"Unknown index kind '{kind}', expected one of {', '.join(KINDS)}")
+    params = {}
+    for pair in filter(None, rest.split(",")):
+        key, _, value = pair.partition("=")
+        params[key.strip()] = int(value)
+    return kind, params
+
+def factory_string(kind, params, n_train, dimension=512):
+    """Return the faiss.index_factory string for a spec; fills derived defaults into params."""
+    if kind == "flat":
+        return "IDMap2,Flat"
+    if kind == "sq8":
+        return "IDMap2,SQ8"
+    if kind == "hnsw":
+        params.setdefault("M", 32)
+        return f"IDMap2,HNSW{params['M']},Flat"
+
+    # IVF: roughly 4 * sqrt(n) lists, but at least 39 training points per centroid
+    params.setdefault("nlist", max(1, min(int(4 * math.sqrt(n_train)), n_train // 39)))
+    params.setdefault("nprobe", min(params["nlist"], max(8, params["nlist"] // 8)))
+    if kind == "ivf-flat":
+        return f"IVF{params['nlist']},Flat"
+    params.setdefault("m", 64)
+    if dimension % params["m"]:
+        raise ValueError(f"PQ m={params['m']} must divide the dimension {dimension}")
+    # Each sub-quantizer has 2^nbits centroids, which again want ~39 training points each
+    params.setdefault("nbits", max(1, min(8, int(math.log2(max(n_train // 39, 2))))))
+    return f"IVF{params['nlist']},PQ{params['m']}x{params['nbits']}"
+
+def build_index(spec, vectors, ids, dimension=512):
+    """
+    args:
+        spec (str): Index spec, see the top of this module.
+        vectors (np.ndarray): (n, dimension) L2-normalized vectors, also used for training.
+        ids (np.ndarray): int64 id of every vector.
+    returns:
+        tuple: (index, params) where params holds the resolved build and search parameters.
+    """
+    kind, params = parse_spec(spec)
+    index = faiss.index_factory(dimension, factory_string(kind, params, len(vectors), dimension),
+                                faiss.METRIC_INNER_PRODUCT)
+    if kind == "hnsw":
+        hnsw = faiss.downcast_index(index.index).hnsw
+        hnsw.efConstruction = params.setdefault("efConstruction", 200)
+        params.setdefault("efSearch", 64)
+    if not index.is_trained:
+        index.train(vectors)
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    params = {"spec": kind, **params}
+    apply_search_params(index, params)
+    return index, params
+
+def params_path(index_path):
+    return os.path.splitext(index_path)[0] + ".params.json"
+
+def save_params(index_path, params):
+    path = params_path(index_path)
+    with open(path + ".tmp", "w") as f:
+        json.dump(params, f, indent=4)
+    os.replace(path + ".tmp", path)
+
+def load_params(index_path):
+    path = params_path(index_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def apply_search_params(index, params):
+    """Apply every search parameter in params that the index understands; returns what was applied."""
+    space = faiss.ParameterSpace()
+    applied = {}
+    for name in SEARCH_PARAMS:
+        if params.get(name) is None:
+            continue
+        try:
+            space.set_index_parameter(index, name, params[name])
+            applied[name] = params[name]
+        except RuntimeError:
+            pass  # Not a parameter of this index type
+    return applied
+
+def describe_index(index):
+    """Short description of an index, e.g. "IndexIVFPQ (ntotal=100000)"."""
+    inner = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    return f"{type(inner).__name__} (ntotal={index.ntotal})"
+
+def index_memory(index):
+    """Serialized size of an index in bytes, a close proxy for its resident memory."""
+    return int(faiss.serialize_index(index).size)
@@ -0,0 +1,333 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import datetime
+import threading
+from utils import write_logs, trim_partial_line
+
+# Durable attendance journal. Every welcome, goodbye and (throttled) last-seen update is an
+# event appended to a journal by a background thread, in batches, with a periodic fsync,
+# so the frame loop never waits on the disk and a crash loses at most the last fsync
+# interval. On restart the day's sessions are rebuilt from the journal, and the daily
+# attendance CSV is derived from it by compaction once the day is over.
+#
+# Backends: an append-only JSON-lines file (default), or SQLite (path ending in .db /
+# .sqlite, or backend="sqlite"). Compaction moves a JSON-lines day's events to
+# <journal>.archive/<date>.jsonl, so the journal read on every restart only holds open days.
+# SQLite keeps every row for ad-hoc queries such as
+#   sqlite3 log/attendance_journal.db "SELECT uid, MIN(time) FROM events WHERE date='2024-05-02' GROUP BY uid"
+# and keeps a one-row-per-date days table, updated as events are appended, from which the
+# open days are read on restart.
+#
+# Event fields: date, time, kind (welcome | goodbye | seen | compacted), uid, name,
+# phase (welcome | goodbye, for seen events), track, camera.
+
+DAY_START = "06:00:00"  # Sessions of a day live from here until the next day's DAY_START
+DAY_END = "01:00:00"  # A day is compacted into the CSV once the next day reaches this time
+FIELDS = ("date", "time", "kind", "uid", "name", "phase", "track", "camera")
+
+def session_day(date_str, time_str):
+    """Date whose sessions are live at date_str time_str (before DAY_START, still yesterday's)."""
+    if time_str >= DAY_START:
+        return date_str
+    return str(datetime.date.fromisoformat(date_str) - datetime.timedelta(days=1))
+
+def compaction_due(day, date_str, time_str):
+    next_day = str(datetime.date.fromisoformat(day) + datetime.timedelta(days=1))
+    return date_str > next_day or (date_str == next_day and time_str >= DAY_END)
+
+def to_seconds(time_str):
+    h, m, s = time_str.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+class JsonlBackend:
+    def __init__(self, path):
+        self.path = path
+        trim_partial_line(path)  # A crash can leave the last event half-written
+        self._file = open(path, "a", encoding="utf-8")
+
+    def append(self, events):
+        self._file.write("".join(json.dumps(event) + "\n" for event in events))
+        self._file.flush()
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+
+    def read(self, date=None):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if date is None or event.get("date") == date:
+                    yield event
+
+    def days(self):
+        """returns: (dates with events, dates with a compacted marker)."""
+        days, compacted = set(), set()
+        for event in self.read():
+            (compacted if event["kind"] == "compacted" else days).add(event["date"])
+        return days, compacted
+
+    def archive(self, day):
+        """Move day's events (not its compacted marker) to <journal>.archive/<day>.jsonl; returns how many."""
+        self._file.close()
+        keep, moved = [], []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                (moved if event.get("date") == day and event.get("kind") != "compacted" else keep).append(line)
+        archive_dir = os.path.splitext(self.path)[0] + ".archive"
+        os.makedirs(archive_dir, exist_ok=True)
+        # The archive is synced before the journal drops the events, so a crash never loses them
+        for path, lines, mode in ((os.path.join(archive_dir, f"{day}.jsonl"), moved, "a"), (self.path + ".tmp", keep, "w")):
+            with open(path, mode, encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        return len(moved)
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+
+class SqliteBackend:
+    def __init__(self, path):
+        self.path = path
+        self._conn = None  # Opened by the writer thread; sqlite connections stay on one thread
+        with self._connect() as conn:
+            columns = ", ".join(f"{field} TEXT" for field in FIELDS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, {columns})")
+            conn.execute("CREATE INDEX IF NOT EXISTS events_date ON events (date, uid)")
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'days'").fetchone():
+                conn.execute("CREATE TABLE days (date TEXT PRIMARY KEY, compacted INTEGER NOT NULL DEFAULT 0)")
+                # Journals written before the days table existed are indexed once, here
+                conn.execute("INSERT INTO days SELECT date, MAX(kind = 'compacted') FROM events GROUP BY date")
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Commits are not fsynced; sync() checkpoints instead
+        return conn
+
+    def append(self, events):
+        if self._conn is None:
+            self._conn = self._connect()
+        with self._conn:
+            self._conn.executemany(f"INSERT INTO events ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                                   [tuple(event.get(field) for field in FIELDS) for event in events])
+            self._conn.executemany("INSERT INTO days (date, compacted) VALUES (?, ?) "
+                                   "ON CONFLICT (date) DO UPDATE SET compacted = MAX(compacted, excluded.compacted)",
+                                   {(event["date"], int(event["kind"] == "compacted")) for event in events})
+
+    def sync(self):
+        if self._conn is not None:
+            self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def read(self, date=None):
+        conn = self._connect()
+        try:
+            query = f"SELECT {', '.join(FIELDS)} FROM events" + (" WHERE date = ?" if date else "") + " ORDER BY id"
+            for row in conn.execute(query, (date,) if date else ()):
+                yield {field: value for field, value in zip(FIELDS, row) if value is not None}
+        finally:
+            conn.close()
+
+    def days(self):
+        """returns: (dates with events, dates with a compacted marker), from the days table."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT date, compacted FROM days").fetchall()
+        finally:
+            conn.close()
+        return {day for day, _ in rows}, {day for day, compacted in rows if compacted}
+
+    def archive(self, day):
+        return 0  # Rows are kept for queries; startup only reads the days table, so they cost no restart time
+
+    def close(self):
+        self.sync()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class AttendanceJournal:
+    """
+    args:
+        path (str): Journal file; .db / .sqlite selects the SQLite backend.
+        backend (str): 'jsonl' or 'sqlite' (default: from the extension).
+        flush_interval (float): Longest an event waits in memory before it is written.
+        fsync_interval (float): Seconds between fsyncs of written events.
+        seen_interval (float): Minimum seconds between two last-seen events of one session;
+            the latest skipped one is written when the journal stops.
+    """
+
+    def __init__(self, path, backend=None, flush_interval=1.0, fsync_interval=5.0, seen_interval=30.0):
+        if backend is None:
+            backend = "sqlite" if path.endswith((".db", ".sqlite")) else "jsonl"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.backend = SqliteBackend(path) if backend == "sqlite" else JsonlBackend(path)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.seen_interval = seen_interval
+        self.written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self._queue = queue.Queue()
+        self._last_seen = {}  # (phase, uid) -> (date, seconds) of the last seen event written
+        self._skipped_seen = {}  # (phase, uid) -> latest seen event not written yet
+        self._days, self._compacted = self.backend.days()
+        self._thread = threading.Thread(target=self._run, name="attendance-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, kind, uid, name, date, time_str, track=None, camera=None, phase=None):
+        """Queue one event; never blocks on the disk."""
+        event = {"date": date, "time": time_str, "kind": kind, "uid": uid, "name": name}
+        if phase is not None:
+            event["phase"] = phase
+        if track is not None:
+            event["track"] = str(track)
+        if camera is not None:
+            event["camera"] = str(camera)
+
+        if kind == "seen":
+            key = (phase, uid)
+            last = self._last_seen.get(key)
+            if last is not None and last[0] == date and to_seconds(time_str) - last[1] < self.seen_interval:
+                self._skipped_seen[key] = event
+                return
+            self._skipped_seen.pop(key, None)
+        if kind in ("welcome", "goodbye", "seen"):
+            self._last_seen[(phase or kind, uid)] = (date, to_seconds(time_str))
+        self._days.add(date)
+        self._queue.put(event)
+
+    def events(self, date=None):
+        return self.backend.read(date)
+
+    def compact_due(self, date_str, time_str, log_file):
+        """Queue compaction of every finished day not yet in the CSV (including days a restart skipped)."""
+        for day in sorted(self._days - self._compacted):
+            if compaction_due(day, date_str, time_str):
+                for key, event in list(self._skipped_seen.items()):
+                    if event["date"] == day:
+                        self._queue.put(self._skipped_seen.pop(key))
+                self._compacted.add(day)
+                self._queue.put(("compact", day, log_file))
+
+    def _compact(self, day, log_file):
+        rows = compact_day(self.backend.read(day))
+        write_logs(rows, log_file)
+        archived = self.backend.archive(day)
+        print(f"[INFO] Compacted {day} into {log_file}: {len(rows)} users"
+              f"{f', {archived} events archived' if archived else ''}.")
+        return {"date": day, "time": "00:00:00", "kind": "compacted", "uid": "", "name": ""}
+
+    def _run(self):
+        last_sync = time.monotonic()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is None:
+                        stopping = True
+                    elif isinstance(item, tuple):
+                        self._write(batch)  # Everything before the compaction must be readable
+                        batch = [self._compact(*item[1:])]
+                    else:
+                        batch.append(item)
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._write(batch)
+            if time.monotonic() - last_sync >= self.fsync_interval and not stopping:
+                self.backend.sync()
+                self.fsyncs += 1
+                last_sync = time.monotonic()
+        self.backend.close()  # Syncs; on this thread, which owns the SQLite connection
+        self.fsyncs += 1
+
+    def _write(self, batch):
+        if batch:
+            try:
+                self.backend.append(batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                print(f"[ERROR] Attendance journal write failed: {e}")
+            batch.clear()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {"written": self.written, "batches": self.batches, "fsyncs": self.fsyncs, "pending": self.pending()}
+
+    def stop(self):
+        for event in self._skipped_seen.values():
+            self._queue.put(event)
+        self._skipped_seen.clear()
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+
+def replay_sessions(events, welcome_store, goodbye_store):
+    """
+    Rebuild the session stores from one day's events, with the same rules as
+    app.record_attendance: a new welcome clears the goodbye sessions and vice versa.
+    returns:
+        int: Events applied.
+    """
+    stores = {"welcome": welcome_store, "goodbye": goodbye_store}
+    applied = 0
+    for event in events:
+        kind, uid = event["kind"], event["uid"]
+        if kind in stores:
+            result = stores[kind].add(uid, track_id=event.get("track"), date=event["date"], time=event["time"],
+                                      camera=event.get("camera"))
+            if result is not None and not result[0]:
+                stores["goodbye" if kind == "welcome" else "welcome"].clear()
+        elif kind == "seen" and uid in stores.get(event.get("phase"), ()):
+            record = stores[event["phase"]].get(uid)
+            record.last_seen = max(record.last_seen, event["time"])
+            if event.get("camera") is not None:
+                record.last_camera = event["camera"]
+        else:
+            continue
+        applied += 1
+    return applied
+
+def compact_day(events):
+    """
+    One (uid, name, log_in, log_out) row per uid welcomed that day, in welcome order.
+    log_out is the last goodbye-phase sighting, or the last welcome-phase sighting
+    for uids that never got a goodbye.
+
+    This differs from the in-memory end-of-day dump (--no-journal), which only wrote the
+    welcome sessions still open at dump time: a goodbye clears them, so uids welcomed
+    before the last goodbye were missing from its CSV. Here every welcomed uid gets a row.
+    """
+    welcomed, last = {}, {"welcome": {}, "goodbye": {}}
+    for event in events:
+        kind, uid = event["kind"], event["uid"]
+        phase = event.get("phase") or kind
+        if kind == "welcome" and uid not in welcomed:
+            welcomed[uid] = (event["name"], event["time"])
+        if phase in last and kind in ("welcome", "goodbye", "seen"):
+            last[phase][uid] = max(last[phase].get(uid, ""), event["time"])
+    return [(uid, name, log_in, last["goodbye"].get(uid) or last["welcome"].get(uid, log_in))
+            for uid, (name, log_in) in welcomed.items()]
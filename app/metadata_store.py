@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import numpy as np
+
+# Compact on-disk metadata for the FAISS index, replacing face_metadata.json at runtime:
+#
+#   <prefix>.codes.npy     int32 array, FAISS label -> uid code (-1 = no vector), memory-mapped
+#   <prefix>.uids.json     uid string table, indexed by uid code
+#   <prefix>.details.json  FAISS label -> {'image_name', 'path'}, only loaded when asked for
+#
+# The prefix is the metadata path without its extension, e.g. ./faissIndex/face_metadata.
+
+def compact_prefix(metadata_path):
+    return os.path.splitext(metadata_path)[0]
+
+def compact_exists(prefix):
+    return os.path.exists(prefix + ".codes.npy") and os.path.exists(prefix + ".uids.json")
+
+
+class CompactMetadata:
+    """
+    Read side of the compact metadata format.
+
+    Indexing with an array of FAISS labels returns their uids in one vectorized
+    call, so an instance can be passed wherever recognize.py expects row_uids.
+    """
+
+    def __init__(self, prefix, mmap=True):
+        self.prefix = prefix
+        self.codes = np.load(prefix + ".codes.npy", mmap_mode="r" if mmap else None)
+        with open(prefix + ".uids.json", "r") as f:
+            uid_table = json.load(f)
+        # Code -1 (no vector) lands on the trailing "Unknown" entry
+        self.uid_table = np.array(uid_table + ["Unknown"], dtype=object)
+        self._details = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, labels):
+        return self.uid_table[self.codes[labels]]
+
+    def uid(self, label):
+        return self.uid_table[self.codes[label]]
+
+    def details(self, label):
+        """Return {'image_name', 'path'} for a FAISS label, loading the side file on first use."""
+        if self._details is None:
+            with open(self.prefix + ".details.json", "r") as f:
+                self._details = json.load(f)
+        return self._details.get(str(int(label)), {})
+
+    def to_metadata(self):
+        """Rebuild the face_metadata.json-shaped dict, e.g. to edit and rewrite it with write_compact."""
+        self.details(0)
+        return {str(label): {"uid": self.uid_table[code], **self._details.get(str(label), {})}
+                for label, code in enumerate(self.codes.tolist()) if code >= 0}
+
+
+def labels_of(metadata):
+    """FAISS labels of a face_metadata.json dict: int ids for ID-mapped indexes, else row positions."""
+    if metadata and all(key.isdigit() for key in metadata):
+        return [int(key) for key in metadata]
+    return list(range(len(metadata)))
+
+def write_compact(metadata, prefix):
+    """
+    args:
+        metadata (dict): face_metadata.json contents (UUID-keyed or id-keyed).
+        prefix (str): Output prefix.
+
+    Each file is written to a temporary name and moved into place.
+    """
+    labels = labels_of(metadata)
+    uid_codes = {}
+    codes = np.full(max(labels, default=-1) + 1, -1, dtype=np.int32)
+    details = {}
+    for label, meta in zip(labels, metadata.values()):
+        codes[label] = uid_codes.setdefault(meta["uid"], len(uid_codes))
+        details[str(label)] = {"image_name": meta.get("image_name"), "path": meta.get("path")}
+
+    def replace(suffix, write):
+        tmp_path = prefix + suffix + ".tmp"
+        with open(tmp_path, "wb" if suffix.endswith(".npy") else "w") as f:
+            write(f)
+        os.replace(tmp_path, prefix + suffix)
+
+    replace(".codes.npy", lambda f: np.save(f, codes))
+    replace(".uids.json", lambda f: json.dump(list(uid_codes), f))
+    replace(".details.json", lambda f: json.dump(details, f))
+
+def convert_json(metadata_path):
+    """Convert an existing face_metadata.json to the compact format next to it."""
+    with open(metadata_path, "r") as f:
+        metadata = json.load(f)
+    prefix = compact_prefix(metadata_path)
+    write_compact(metadata, prefix)
+    return prefix
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "./faissIndex/face_metadata.json"
+    prefix = convert_json(path)
+    print(f"[INFO] Wrote {prefix}.codes.npy, {prefix}.uids.json and {prefix}.details.json")
@@ -0,0 +1,299 @@
+import os
+import time
+import cProfile
+import threading
+import collections
+import numpy as np
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Low-overhead instrumentation for the real-time loop.
+#
+# Stage timings go into rolling windows of the most recent samples; quantiles are only
+# computed on export, so the hot path is one perf_counter pair and a deque append.
+# Counters and gauges are plain numbers; gauge callbacks are evaluated at export time.
+# Everything is exported in the Prometheus text format, over a local HTTP endpoint
+# (/metrics) and/or a file rewritten every few seconds.
+
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = "face_app"
+
+
+class RollingWindow:
+    """The last `size` samples of one stage, plus running count and sum."""
+
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self, size=2048):
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, qs=QUANTILES):
+        samples = list(self.samples)
+        if not samples:
+            return {q: 0.0 for q in qs}
+        values = np.percentile(samples, [100 * q for q in qs])
+        return dict(zip(qs, values.tolist()))
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Registry of stage timings, counters and gauges.
+
+    args:
+        enabled (bool): When False every call is a no-op, so call sites need no guards.
+        window (int): Samples kept per stage for the rolling quantiles.
+
+    Usage:
+        with metrics.timer("detection"):
+            faces = detect_faces(...)
+        metrics.inc("faces", len(faces))
+    """
+
+    def __init__(self, enabled=True, window=2048):
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self._gauge_fns = {}
+        self._lock = threading.Lock()  # Held to add a key, and by exporters while they copy the dicts
+        self._started_at = time.time()
+
+    def timer(self, stage):
+        if not self.enabled:
+            return nullcontext()
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        window = self.stages.get(stage)
+        if window is None:
+            with self._lock:
+                window = self.stages.setdefault(stage, RollingWindow(self.window))
+        window.add(seconds)
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        if name not in self.counters:
+            with self._lock:
+                self.counters.setdefault(name, 0.0)
+        self.counters[name] += value
+
+    def set_gauge(self, name, value):
+        if not self.enabled:
+            return
+        if name not in self.gauges:
+            with self._lock:
+                self.gauges[name] = value
+        else:
+            self.gauges[name] = value
+
+    def _copy(self):
+        """(stages, counters, gauges) copied under the lock, safe to iterate while other threads add keys."""
+        with self._lock:
+            return dict(self.stages), dict(self.counters), dict(self.gauges)
+
+    def gauge_fn(self, name, fn):
+        """Register a callable returning a gauge value, evaluated at export time."""
+        with self._lock:
+            self._gauge_fns[name] = fn
+
+    def gauge_values(self, gauges=None):
+        if gauges is None:
+            gauges = self._copy()[2]
+        with self._lock:
+            gauge_fns = list(self._gauge_fns.items())
+        for name, fn in gauge_fns:
+            try:
+                gauges[name] = float(fn())
+            except Exception:
+                pass  # A gauge source that went away must not break the export
+        return gauges
+
+    def snapshot(self):
+        """Return {'uptime', 'stages', 'counters', 'gauges'} with stage quantiles in milliseconds."""
+        windows, counters, gauges = self._copy()
+        stages = {}
+        for stage, window in windows.items():
+            quantiles = window.quantiles()
+            stages[stage] = {
+                "count": window.count,
+                "mean_ms": 1000 * window.total / window.count if window.count else 0.0,
+                **{f"p{int(q * 100)}_ms": 1000 * value for q, value in quantiles.items()},
+            }
+        return {"uptime": time.time() - self._started_at, "stages": stages,
+                "counters": counters, "gauges": self.gauge_values(gauges)}
+
+    def render_prometheus(self):
+        windows, counters, gauges = self._copy()
+        lines = [f"# TYPE {PREFIX}_stage_seconds summary"]
+        for stage, window in windows.items():
+            for q, value in window.quantiles().items():
+                lines.append(f'{PREFIX}_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.9g}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {window.total:.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {window.count}')
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value:g}")
+        for name, value in sorted(self.gauge_values(gauges).items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value:g}")
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {time.time() - self._started_at:.1f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One-line per-stage p50/p95/p99 summary for the console."""
+        parts = []
+        for stage, values in self.snapshot()["stages"].items():
+            parts.append(f"{stage} {values['p50_ms']:.1f}/{values['p95_ms']:.1f}/{values['p99_ms']:.1f}")
+        return "p50/p95/p99 ms: " + (", ".join(parts) if parts else "no samples")
+
+
+class ProfileWindow:
+    """
+    On-demand cProfile window for the thread that calls tick().
+
+    request(seconds) arms a window; the next tick() starts cProfile on the calling
+    thread and the first tick() after the window ends writes a .prof file to
+    output_dir (open it with `python -m pstats` or snakeviz). For whole-process
+    sampling without restarting, attach py-spy to the PID printed at startup instead;
+    the pipeline threads are named "capture" and "inference".
+    """
+
+    def __init__(self, output_dir="./log/profiles"):
+        self.output_dir = output_dir
+        self._requested = None
+        self._profile = None
+        self._ends_at = None
+        self._lock = threading.Lock()
+
+    def request(self, seconds=10.0):
+        with self._lock:
+            if self._profile is None:
+                self._requested = seconds
+        return self._profile is None
+
+    def active(self):
+        return self._profile is not None
+
+    def tick(self):
+        if self._requested is None and self._profile is None:
+            return
+        with self._lock:
+            if self._profile is None and self._requested is not None:
+                self._profile = cProfile.Profile()
+                self._ends_at = time.perf_counter() + self._requested
+                self._requested = None
+                self._profile.enable()
+                print(f"[INFO] Profiling started ({self._ends_at - time.perf_counter():.0f}s).")
+            elif self._profile is not None and time.perf_counter() >= self._ends_at:
+                self._profile.disable()
+                os.makedirs(self.output_dir, exist_ok=True)
+                path = os.path.join(self.output_dir, time.strftime("profile_%Y%m%d_%H%M%S.prof"))
+                self._profile.dump_stats(path)
+                self._profile = None
+                print(f"[INFO] Profile written to {path}")
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint: GET /metrics (Prometheus text) and GET /profile?seconds=N.
+
+    Binds to 127.0.0.1 by default and serves from a daemon thread.
+    """
+
+    def __init__(self, metrics, port=9108, host="127.0.0.1", profiler=None):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/metrics":
+                    self._reply(200, registry.render_prometheus(), "text/plain; version=0.0.4")
+                elif url.path == "/profile" and profiler is not None:
+                    seconds = float(parse_qs(url.query).get("seconds", ["10"])[0])
+                    started = profiler.request(seconds)
+                    self._reply(202 if started else 409, "profiling requested\n" if started else "profile already running\n")
+                else:
+                    self._reply(404, "not found\n")
+
+            def _reply(self, status, body, content_type="text/plain"):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # Keep scrapes out of the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsFileWriter:
+    """Rewrite a Prometheus text file every `interval` seconds (e.g. for node_exporter's textfile collector)."""
+
+    def __init__(self, metrics, path, interval=10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.metrics.render_prometheus())
+        os.replace(tmp_path, self.path)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.flush()
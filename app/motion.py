@@ -0,0 +1,97 @@
+import time
+import cv2
+import numpy as np
+
+class MotionGate:
+    """
+    Cheap pre-stage that decides whether a frame changed enough to run face detection.
+
+    Frames are downscaled to `width` pixels wide, converted to gray and blurred,
+    then compared against a running-average background ("diff") or fed to a
+    MOG2 background subtractor ("mog2"). A frame triggers detection when the
+    fraction of changed pixels reaches min_changed; regardless of motion,
+    detection also runs at least every idle_interval seconds as a safety net.
+
+    args:
+        width (int): Width of the analysis frame.
+        pixel_threshold (int): Gray-level difference for a pixel to count as changed ("diff" only).
+        min_changed (float): Fraction of changed pixels that triggers detection.
+        idle_interval (float): Maximum seconds between detections.
+        method (str): "diff" or "mog2".
+        alpha (float): Background adaptation rate for "diff".
+        log_interval (float): Seconds between skipped-frame statistics lines (0 disables).
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, min_changed=0.01, idle_interval=2.0, method="diff",
+                 alpha=0.05, log_interval=60.0, clock=time.monotonic):
+        if method not in ("diff", "mog2"):
+            raise ValueError(f"Unknown motion method '{method}'")
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.idle_interval = idle_interval
+        self.method = method
+        self.alpha = alpha
+        self.log_interval = log_interval
+        self.clock = clock
+        self._background = None
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if method == "mog2" else None
+        self._last_run = None
+        self._last_log = clock()
+        self.frames = 0
+        self.skipped = 0
+        self.motion_runs = 0
+        self.idle_runs = 0
+        self.last_changed = 0.0
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, frame):
+        gray = self._small_gray(frame)
+        if self._subtractor is not None:
+            mask = self._subtractor.apply(gray)
+            return float(np.count_nonzero(mask)) / mask.size
+
+        if self._background is None:
+            self._background = gray.astype("float32")
+            return 1.0  # First frame: always look
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(gray, self._background, self.alpha)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+
+    def should_detect(self, frame):
+        """Return True when detection should run on this frame."""
+        now = self.clock()
+        self.frames += 1
+        self.last_changed = self.changed_fraction(frame)
+
+        if self.last_changed >= self.min_changed:
+            self.motion_runs += 1
+            run = True
+        elif self._last_run is None or now - self._last_run >= self.idle_interval:
+            self.idle_runs += 1
+            run = True
+        else:
+            self.skipped += 1
+            run = False
+
+        if run:
+            self._last_run = now
+        if self.log_interval and now - self._last_log >= self.log_interval:
+            print(f"[INFO] Motion gate: {self.stats()}")
+            self._last_log = now
+        return run
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skipped_pct": round(100.0 * self.skipped / self.frames, 1) if self.frames else 0.0,
+            "motion_runs": self.motion_runs,
+            "idle_runs": self.idle_runs,
+            "last_changed": round(self.last_changed, 4),
+        }
@@ -0,0 +1,145 @@
+import time
+import threading
+from pipeline import FrameQueue
+
+# Multi-source capture for running several entrances from one process. Each source gets a
+# capture thread feeding a "latest frame wins" queue; the inference side pulls rounds of
+# at most one frame per camera, so every camera with a fresh frame is served once per round
+# and a busy door cannot starve the others. The model, index and metadata stay shared.
+
+def parse_sources(specs):
+    """
+    args:
+        specs (list): Sources as "name=source" or just "source", e.g. ["front=0", "rtsp://..."].
+    returns:
+        list: (camera_id, source) pairs; numeric sources become webcam indexes and
+        unnamed sources are called cam0, cam1, ...
+    """
+    sources = []
+    for i, spec in enumerate(specs):
+        name, sep, source = spec.partition("=")
+        if not sep or "://" in name:
+            name, source = f"cam{i}", spec
+        sources.append((name, int(source) if source.isdigit() else source))
+    names = [name for name, _ in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate camera ids in {names}")
+    return sources
+
+
+class CameraContext:
+    """
+    Per-camera state: tracker, detection scheduler, identity cache, motion gate and the
+    last results (reused on frames that skip detection). Track ids are only unique
+    within one camera, so session keys are prefixed with the camera id.
+    """
+
+    def __init__(self, camera_id, tracker=None, scheduler=None, identity_cache=None, motion_gate=None):
+        self.camera_id = camera_id
+        self.tracker = tracker
+        self.scheduler = scheduler
+        self.identity_cache = identity_cache
+        self.motion_gate = motion_gate
+        self.last_detections = []
+        self.frames = 0
+        self.detected_frames = 0
+        self.faces = 0
+
+    def session_key(self, track):
+        if track is None:
+            return None
+        return f"{self.camera_id}/t{track.track_id}"
+
+    def stats(self):
+        stats = {"frames": self.frames, "detected_frames": self.detected_frames, "faces": self.faces}
+        if self.scheduler is not None:
+            stats["tracking"] = self.scheduler.stats()
+        if self.identity_cache is not None:
+            stats["identity_cache"] = self.identity_cache.stats()
+        if self.motion_gate is not None:
+            stats["motion_gate"] = self.motion_gate.stats()
+        return stats
+
+
+class MultiCapture:
+    """
+    One capture thread per camera, read in fair rounds.
+
+    args:
+        readers (dict): camera_id -> callable returning (ret, frame), e.g. cap.read.
+        queue_size (int): Capacity of each camera's queue; older frames are dropped when full.
+
+    next_round() returns [(camera_id, frame), ...] with at most one frame per camera.
+    The starting camera rotates every round so no camera is always served first.
+    """
+
+    def __init__(self, readers, queue_size=1):
+        self.readers = readers
+        self.queues = {camera_id: FrameQueue(queue_size) for camera_id in readers}
+        self.captured = {camera_id: 0 for camera_id in readers}
+        self.rounds = 0
+        self._order = list(readers)
+        self._offset = 0
+        self._stop = threading.Event()
+        self._new_frame = threading.Event()
+        self._threads = {
+            camera_id: threading.Thread(target=self._capture_loop, args=(camera_id,), name=f"capture-{camera_id}", daemon=True)
+            for camera_id in readers
+        }
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        for thread in self._threads.values():
+            thread.start()
+        return self
+
+    def _capture_loop(self, camera_id):
+        read_frame = self.readers[camera_id]
+        while not self._stop.is_set():
+            ret, frame = read_frame()
+            if not ret:
+                print(f"[INFO] Failed to read frame from camera {camera_id}.")
+                break
+            self.captured[camera_id] += 1
+            self.queues[camera_id].put(frame)
+            self._new_frame.set()
+        self._new_frame.set()  # Wake the consumer so it notices the camera stopped
+
+    def running(self):
+        """True while any camera is still capturing or has a frame waiting."""
+        return any(thread.is_alive() for thread in self._threads.values()) or \
+            any(q.depth() > 0 for q in self.queues.values())
+
+    def next_round(self, timeout=0.1):
+        """Return the freshest frame of every camera that has one, or [] on timeout."""
+        if not self._new_frame.wait(timeout):
+            return []
+        # Cleared before draining, so a frame put during the drain sets it again
+        self._new_frame.clear()
+        order = self._order[self._offset:] + self._order[:self._offset]
+        self._offset = (self._offset + 1) % len(self._order)
+        batch = []
+        for camera_id in order:
+            frame = self.queues[camera_id].get(timeout=0)
+            if frame is not None:
+                batch.append((camera_id, frame))
+        if any(q.depth() > 0 for q in self.queues.values()):
+            self._new_frame.set()  # Frames left over (queue_size > 1) are served next round without waiting
+        if batch:
+            self.rounds += 1
+        return batch
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "rounds": self.rounds,
+            "rounds_per_second": self.rounds / elapsed if elapsed > 0 else 0.0,
+            "captured": dict(self.captured),
+            "dropped": {camera_id: q.dropped for camera_id, q in self.queues.items()},
+        }
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads.values():
+            thread.join(timeout=2)
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+import cv2
+import numpy as np
+from PIL import ImageFont, ImageDraw, Image
+
+class OverlayRenderer:
+    """
+    Draws boxes and labels for a whole frame in one pass, in place on the BGR frame.
+
+    Label bitmaps are rendered once with PIL and cached as (alpha mask, colored
+    patch) pairs keyed by (text, color). A label is made of its uid part and an
+    optional score part, cached separately, so a uid is rasterized once per
+    color no matter how its score changes between frames.
+    """
+
+    def __init__(self, font_path, font_size=24, cache_size=1024, label_offset=30, thickness=2):
+        self.font = ImageFont.truetype(font_path, font_size)
+        self.cache_size = cache_size
+        self.label_offset = label_offset
+        self.thickness = thickness
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _bitmap(self, text, color):
+        key = (text, color)
+        bitmap = self._cache.get(key)
+        if bitmap is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return bitmap
+
+        self.misses += 1
+        left, top, right, bottom = self.font.getbbox(text)
+        mask = Image.new("L", (max(right, 1), max(bottom, 1)), 0)
+        ImageDraw.Draw(mask).text((0, 0), text, font=self.font, fill=255)
+        alpha = np.asarray(mask, dtype=np.uint16)[..., None]
+        patch = np.empty(alpha.shape[:2] + (3,), dtype=np.uint16)
+        patch[:] = color
+        bitmap = (alpha, patch * alpha)
+        self._cache[key] = bitmap
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return bitmap
+
+    def _blend(self, frame, bitmap, x, y):
+        alpha, premultiplied = bitmap
+        h, w = alpha.shape[:2]
+        fh, fw = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, fw), min(y + h, fh)
+        if x0 >= x1 or y0 >= y1:
+            return
+        a = alpha[y0 - y:y1 - y, x0 - x:x1 - x]
+        src = premultiplied[y0 - y:y1 - y, x0 - x:x1 - x]
+        roi = frame[y0:y1, x0:x1]
+        roi[:] = ((roi * (255 - a) + src) // 255).astype(np.uint8)
+
+    def draw_label(self, frame, x, y, parts, color):
+        """Alpha-blend the label made of parts (rendered left to right) with its top-left corner at (x, y)."""
+        for text in parts:
+            if not text:
+                continue
+            bitmap = self._bitmap(text, color)
+            self._blend(frame, bitmap, x, y)
+            x += int(self.font.getlength(text))
+
+    def draw(self, frame, detections):
+        """
+        args:
+            frame (np.ndarray): BGR frame, modified in place.
+            detections (list): (bbox, text, score, color) tuples; score may be None and color is BGR.
+        returns:
+            np.ndarray: The same frame, for convenience.
+        """
+        for bbox, text, score, color in detections:
+            x1, y1, x2, y2 = (int(v) for v in bbox[:4])
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, self.thickness)
+            parts = (text, f" ({score:.2f})") if score is not None else (text,)
+            self.draw_label(frame, x1, y1 - self.label_offset, parts, color)
+        return frame
@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+
+class FrameQueue:
+    """
+    Bounded queue with a "latest frame wins" drop policy.
+
+    When the queue is full, put() discards the oldest item instead of blocking,
+    so the consumer always sees the freshest frame. Discarded items are counted.
+    """
+
+    def __init__(self, maxsize=1):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        """Return the next item, or None if nothing arrives within timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def depth(self):
+        return self._queue.qsize()
+
+
+class Pipeline:
+    """
+    Capture -> inference -> render pipeline.
+
+    args:
+        read_frame (callable): Returns (ret, frame), e.g. cap.read.
+        infer (callable): Takes a frame and returns the per-frame results.
+        queue_size (int): Capacity of each inter-stage queue.
+
+    A capture thread and an inference thread run in the background; the render
+    stage pulls (frame, results) pairs with get_result() on the calling thread,
+    which keeps cv2.imshow on the main thread.
+    """
+
+    def __init__(self, read_frame, infer, queue_size=1):
+        self.read_frame = read_frame
+        self.infer = infer
+        self.capture_queue = FrameQueue(queue_size)
+        self.result_queue = FrameQueue(queue_size)
+        self.frames_captured = 0
+        self.frames_inferred = 0
+        self.frames_rendered = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._capture_done = threading.Event()
+        self._capture_thread = threading.Thread(target=self._capture_loop, name="capture", daemon=True)
+        self._infer_thread = threading.Thread(target=self._infer_loop, name="inference", daemon=True)
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._capture_thread.start()
+        self._infer_thread.start()
+        return self
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.read_frame()
+                if not ret:
+                    print("[INFO] Failed to read frame from webcam.")
+                    break
+                self.frames_captured += 1
+                self.capture_queue.put(frame)
+        finally:
+            self._capture_done.set()
+
+    def _infer_loop(self):
+        while not self._stop.is_set():
+            frame = self.capture_queue.get(timeout=0.1)
+            if frame is None:
+                if self._capture_done.is_set():
+                    break
+                continue
+            try:
+                results = self.infer(frame)
+            except Exception as e:
+                print(f"[ERROR] Inference stage failed: {e}")
+                self.error = e
+                self._stop.set()
+                break
+            self.frames_inferred += 1
+            self.result_queue.put((frame, results))
+
+    def running(self):
+        """True while the pipeline can still produce results."""
+        return self._infer_thread.is_alive() or self.result_queue.depth() > 0
+
+    def get_result(self, timeout=0.1):
+        """Return the next (frame, results) pair for rendering, or None on timeout."""
+        item = self.result_queue.get(timeout=timeout)
+        if item is not None:
+            self.frames_rendered += 1
+        return item
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "frames_captured": self.frames_captured,
+            "frames_inferred": self.frames_inferred,
+            "frames_rendered": self.frames_rendered,
+            "capture_queue_depth": self.capture_queue.depth(),
+            "result_queue_depth": self.result_queue.depth(),
+            "dropped_before_inference": self.capture_queue.dropped,
+            "dropped_before_render": self.result_queue.dropped,
+            "inference_fps": self.frames_inferred / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def stop(self):
+        self._stop.set()
+        self._capture_thread.join(timeout=2)
+        self._infer_thread.join(timeout=2)
@@ -0,0 +1,81 @@
+import cv2
+
+# Performance profiles for buffalo_l, shared by app.py, prep/train.py, prep/infer.py and the
+# batch / service entry points. FaceAnalysis(name='buffalo_l') loads five models by default
+# (detection, recognition, 2D and 3D landmarks, gender/age) and runs all of them on every
+# face, although only the detector's boxes and keypoints and the ArcFace embedding are used.
+#
+# A profile chooses:
+#   modules    models FaceAnalysis loads (None = every model in the pack)
+#   det_size   detector input size; SCRFD letterboxes every frame to this size
+#   max_side   optional pre-downscale: frames whose longer side exceeds it are shrunk before
+#              detection, and boxes and keypoints are mapped back to full resolution, so the
+#              ArcFace crop is still aligned on the full-resolution frame. SCRFD resizes to
+#              det_size on its own, so this costs about the same as not downscaling (one
+#              linear resize either way); it only bounds what the detector is handed.
+#
+#   python bench/bench_profiles.py --dataset ./holdout --index-dir ./faissIndex
+
+PROFILES = {
+    # Everything buffalo_l ships, as FaceAnalysis(name='buffalo_l') does by default
+    "full": {"modules": None, "det_size": (640, 640), "max_side": None},
+    # Same boxes and embeddings as "full", without the unused landmark / attribute models
+    "accurate": {"modules": ["detection", "recognition"], "det_size": (640, 640), "max_side": None},
+    "balanced": {"modules": ["detection", "recognition"], "det_size": (480, 480), "max_side": None},
+    "fast": {"modules": ["detection", "recognition"], "det_size": (320, 320), "max_side": 640},
+}
+DEFAULT_PROFILE = "accurate"
+
+def get_profile(name):
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"unknown model profile '{name}' (choose from {', '.join(PROFILES)})") from None
+
+def describe_profile(name):
+    profile = get_profile(name)
+    modules = "+".join(profile["modules"]) if profile["modules"] else "all modules"
+    det_w, det_h = profile["det_size"]
+    downscale = f", frames downscaled to {profile['max_side']}px" if profile["max_side"] else ""
+    return f"{name} ({modules}, detector {det_w}x{det_h}{downscale})"
+
+def model_signature(profile=DEFAULT_PROFILE, name="buffalo_l"):
+    """Short string identifying the embeddings a pack and profile produce, for caches that depend on them."""
+    settings = get_profile(profile)
+    det_w, det_h = settings["det_size"]
+    downscale = f"-s{settings['max_side']}" if settings["max_side"] else ""
+    return f"{name}-{profile}-{det_w}x{det_h}{downscale}"
+
+def load_face_model(profile=DEFAULT_PROFILE, ctx_id=0, name="buffalo_l", root="~/.insightface"):
+    """
+    args:
+        profile (str): Key of PROFILES.
+        ctx_id (int): InsightFace context: 0 for GPU, -1 for CPU.
+        name (str): Model pack under <root>/models/, e.g. a quantized pack built by
+            prep/quantize.py.
+    returns:
+        FaceAnalysis: A prepared instance. Its max_side attribute holds the profile's
+        pre-downscale, which faces.detect_faces picks up.
+    """
+    from insightface.app import FaceAnalysis  # Deferred so importing this module stays cheap
+
+    settings = get_profile(profile)
+    kwargs = {"allowed_modules": settings["modules"]} if settings["modules"] else {}
+    facemodel = FaceAnalysis(name=name, root=root, **kwargs)
+    facemodel.prepare(ctx_id=ctx_id, det_size=settings["det_size"])
+    facemodel.max_side = settings["max_side"]
+    facemodel.profile = profile
+    return facemodel
+
+def downscale(img, max_side):
+    """
+    returns:
+        tuple: (image, scale). The image is shrunk so its longer side is at most max_side;
+        scale is the factor applied (1.0 when the image was left alone).
+    """
+    h, w = img.shape[:2]
+    if not max_side or max(h, w) <= max_side:
+        return img, 1.0
+    scale = max_side / max(h, w)
+    small = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+    return small, scale
@@ -0,0 +1,265 @@
+import os
+import json
+import argparse
+import faiss
+import numpy as np
+from utils import normalize_batch
+from metadata_store import CompactMetadata, compact_prefix, compact_exists, write_compact
+from recognize import build_row_uids
+from index_spec import save_params, load_params
+
+# Per-identity prototype index. Each uid is reduced to its normalized centroid plus up to k
+# diverse representatives (farthest-point sampling), skipping near-duplicates of vectors already
+# kept. Queries search the small prototype index first and can optionally be reranked against
+# the full vector set of the best candidate uids.
+#
+#   python app/prototypes.py --k 8      # build from ./faissIndex/face_index_cosine.faiss
+#
+# k and dedup_threshold are saved in face_index_prototypes.params.json, so prep/enroll.py can
+# refresh the prototypes of the uids it adds or removes. A prototype index older than the full
+# index, or one whose uids differ from it, is refused on load.
+
+PROTOTYPE_INDEX_NAME = "face_index_prototypes.faiss"
+PROTOTYPE_METADATA_NAME = "face_prototypes.json"
+
+def select_prototypes(vectors, k=8, dedup_threshold=0.95):
+    """
+    args:
+        vectors (np.ndarray): (n, 512) L2-normalized vectors of one uid.
+        k (int): Maximum number of representatives besides the centroid.
+        dedup_threshold (float): A vector this similar to an already kept prototype is a near-duplicate.
+    returns:
+        tuple: (prototypes, rows) where prototypes is (m, 512) with the centroid first, and rows
+        holds the source row of each prototype (-1 for the centroid).
+    """
+    centroid = normalize_batch(vectors.mean(axis=0, keepdims=True))
+    closest = vectors @ centroid[0]  # Similarity of every vector to its closest kept prototype
+    rows = []
+    for _ in range(k):
+        i = int(np.argmin(closest))
+        if closest[i] >= dedup_threshold:
+            break  # Everything left is a near-duplicate of something already kept
+        rows.append(i)
+        closest = np.maximum(closest, vectors @ vectors[i])
+    prototypes = np.vstack([centroid, vectors[rows]]).astype("float32")
+    return prototypes, [-1] + rows
+
+def ivf_labels(ivf):
+    """Every id stored in an IVF index, read from its inverted lists."""
+    invlists = ivf.invlists
+    labels = []
+    for list_no in range(ivf.nlist):
+        size = invlists.list_size(list_no)
+        if size:
+            ids = invlists.get_ids(list_no)
+            labels.append(faiss.rev_swig_ptr(ids, size).copy())
+            invlists.release_ids(list_no, ids)
+    return np.concatenate(labels) if labels else np.zeros(0, dtype="int64")
+
+def vectors_by_label(faiss_index):
+    """
+    Return (labels, vectors) for every vector of a face index of any index_spec.py kind.
+    Vectors are decoded from the index (approximate for sq8 and ivf-pq) and re-normalized.
+    Raises ValueError for an index that cannot reconstruct its vectors.
+    """
+    if hasattr(faiss_index, "id_map"):
+        inner_labels, vectors = vectors_by_label(faiss.downcast_index(faiss_index.index))
+        return faiss.vector_to_array(faiss_index.id_map)[inner_labels], vectors
+    try:
+        ivf = faiss.try_extract_index_ivf(faiss_index)
+        if ivf is not None:
+            # IVF ids are arbitrary and can only be reconstructed through a direct map
+            labels = ivf_labels(ivf)
+            if ivf.direct_map.type == faiss.DirectMap.NoMap:
+                ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            vectors = faiss_index.reconstruct_batch(labels) if len(labels) else np.zeros((0, faiss_index.d), "float32")
+        else:
+            labels = np.arange(faiss_index.ntotal)
+            vectors = faiss_index.reconstruct_n(0, faiss_index.ntotal)
+    except RuntimeError as e:
+        raise ValueError(f"[ERROR] Cannot read the vectors back from a {type(faiss_index).__name__}; rebuild the index "
+                         f"with a flat, sq8, hnsw, ivf-flat or ivf-pq --index-spec. {e}")
+    return labels, normalize_batch(np.asarray(vectors, dtype="float32"))
+
+def group_by_uid(labels, vectors, row_uids):
+    uids = row_uids[labels]
+    groups = {}
+    for uid in np.unique(uids):
+        if uid != "Unknown":
+            groups[uid] = np.ascontiguousarray(vectors[uids == uid])
+    return groups
+
+def add_prototypes(index, metadata, groups, k=8, dedup_threshold=0.95):
+    """Add the prototypes of every uid in groups to index and metadata, with ids after the largest one in use."""
+    next_id = max((int(label) for label in metadata), default=-1) + 1
+    all_prototypes = []
+    for uid, vectors in groups.items():
+        prototypes, rows = select_prototypes(vectors, k, dedup_threshold)
+        for row in rows:
+            metadata[str(next_id)] = {"uid": uid, "image_name": "centroid" if row < 0 else f"row {row}", "path": None}
+            next_id += 1
+        all_prototypes.append(prototypes)
+    if all_prototypes:
+        vectors = np.vstack(all_prototypes)
+        index.add_with_ids(vectors, np.arange(next_id - len(vectors), next_id, dtype="int64"))
+
+def build_prototype_index(groups, k=8, dedup_threshold=0.95):
+    """
+    args:
+        groups (dict): uid -> (n, 512) normalized vectors.
+    returns:
+        tuple: (index, metadata) with metadata keyed by prototype id, in face_metadata.json shape.
+    """
+    index, metadata = faiss.IndexIDMap2(faiss.IndexFlatIP(512)), {}
+    add_prototypes(index, metadata, groups, k, dedup_threshold)
+    return index, metadata
+
+def prototypes_exist(index_dir):
+    return (os.path.exists(os.path.join(index_dir, PROTOTYPE_INDEX_NAME))
+            and compact_exists(compact_prefix(os.path.join(index_dir, PROTOTYPE_METADATA_NAME))))
+
+def save_prototype_index(index, metadata, index_dir, k=8, dedup_threshold=0.95):
+    index_path = os.path.join(index_dir, PROTOTYPE_INDEX_NAME)
+    write_compact(metadata, compact_prefix(os.path.join(index_dir, PROTOTYPE_METADATA_NAME)))
+    save_params(index_path, {"k": k, "dedup_threshold": dedup_threshold})
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)  # Last, so its mtime marks a complete prototype set
+
+def update_prototypes(index_dir, groups, removed=()):
+    """
+    Refresh the prototypes of the uids prep/enroll.py touched, reusing the saved k and dedup_threshold.
+    args:
+        groups (dict): uid -> (n, 512) normalized vectors of every added or changed uid.
+        removed (iterable): uids that are no longer enrolled.
+    returns:
+        int: Prototypes in the updated index.
+    """
+    index_path = os.path.join(index_dir, PROTOTYPE_INDEX_NAME)
+    params = load_params(index_path)
+    index = faiss.read_index(index_path)
+    metadata = CompactMetadata(compact_prefix(os.path.join(index_dir, PROTOTYPE_METADATA_NAME)), mmap=False).to_metadata()
+
+    stale = set(groups) | set(removed)
+    stale_ids = [int(label) for label, meta in metadata.items() if meta["uid"] in stale]
+    if stale_ids:
+        index.remove_ids(np.array(stale_ids, dtype="int64"))
+        for label in stale_ids:
+            del metadata[str(label)]
+    k, dedup_threshold = params.get("k", 8), params.get("dedup_threshold", 0.95)
+    add_prototypes(index, metadata, groups, k, dedup_threshold)
+    save_prototype_index(index, metadata, index_dir, k, dedup_threshold)
+    return index.ntotal
+
+def enrolled_uids(row_uids):
+    """Set of uids with at least one vector, from build_row_uids output or a CompactMetadata."""
+    return set(row_uids[np.arange(len(row_uids))].tolist()) - {"Unknown"}
+
+def load_prototype_searcher(index_dir, full_groups=None, row_uids=None, index_path=None, **kwargs):
+    """
+    args:
+        row_uids: Label -> uid lookup of the full index; the prototype index must cover exactly its uids.
+        index_path (str): The full index; the prototype index must not be older than it.
+    raises:
+        FileNotFoundError: No prototype index in index_dir.
+        ValueError: The prototype index is stale.
+    """
+    rebuild = "rebuild it with: python app/prototypes.py"
+    if not prototypes_exist(index_dir):
+        raise FileNotFoundError(f"[ERROR] Prototype index not found in {index_dir}; build it with: python app/prototypes.py")
+    prototype_path = os.path.join(index_dir, PROTOTYPE_INDEX_NAME)
+    if index_path is not None and os.path.getmtime(prototype_path) < os.path.getmtime(index_path):
+        raise ValueError(f"[ERROR] Prototype index is older than {os.path.basename(index_path)}; {rebuild}")
+
+    prototype_uids = CompactMetadata(compact_prefix(os.path.join(index_dir, PROTOTYPE_METADATA_NAME)), mmap=False)
+    if row_uids is not None:
+        missing, extra = enrolled_uids(row_uids) - enrolled_uids(prototype_uids), enrolled_uids(prototype_uids) - enrolled_uids(row_uids)
+        if missing or extra:
+            raise ValueError(f"[ERROR] Prototype index disagrees with the full index ({len(missing)} uids missing, "
+                             f"{len(extra)} no longer enrolled); {rebuild}")
+    index = faiss.read_index(prototype_path)
+    return PrototypeSearcher(index, prototype_uids, full_groups, **kwargs)
+
+def load_row_uids(metadata_path):
+    prefix = compact_prefix(metadata_path)
+    if compact_exists(prefix):
+        return CompactMetadata(prefix, mmap=False)
+    with open(metadata_path, "r") as f:
+        return build_row_uids(json.load(f))
+
+
+class PrototypeSearcher:
+    """
+    Two-stage search: prototypes first, then an optional exact rerank.
+
+    args:
+        prototype_index (faiss.Index): Index built by build_prototype_index.
+        prototype_uids: Label -> uid lookup for the prototype index.
+        full_groups (dict): uid -> full normalized vector set; enables reranking when given.
+        candidates (int): Prototypes retrieved per query.
+        rerank_uids (int): Distinct candidate uids rescored against their full set.
+    """
+
+    def __init__(self, prototype_index, prototype_uids, full_groups=None, candidates=8, rerank_uids=3):
+        self.prototype_index = prototype_index
+        self.prototype_uids = prototype_uids
+        self.full_groups = full_groups
+        self.candidates = candidates
+        self.rerank_uids = rerank_uids
+
+    def match(self, embeddings, threshold):
+        """
+        args:
+            embeddings (np.ndarray): (n, 512) raw embeddings.
+            threshold (float): Minimum similarity for a match.
+        returns:
+            list: One (uid, score) per embedding; uid is "Unknown" below the threshold.
+        """
+        if len(embeddings) == 0:
+            return []
+        queries = np.ascontiguousarray(normalize_batch(embeddings), dtype="float32")
+        k = self.candidates if self.full_groups is not None else 1
+        scores, labels = self.prototype_index.search(queries, k)
+
+        matches = []
+        for query, row_scores, row_labels in zip(queries, scores, labels):
+            valid = row_labels >= 0
+            uids = self.prototype_uids[row_labels[valid]]
+            if len(uids) == 0:
+                matches.append(("Unknown", 0.0))
+                continue
+            best_uid, best_score = uids[0], float(row_scores[0])
+
+            if self.full_groups is not None:
+                seen = []
+                for uid in uids:
+                    if uid not in seen:
+                        seen.append(uid)
+                    if len(seen) == self.rerank_uids:
+                        break
+                # A uid without a full vector set cannot be rescored; keep the prototype match if none can
+                rescored = [(uid, float((self.full_groups[uid] @ query).max())) for uid in seen if uid in self.full_groups]
+                if rescored:
+                    best_uid, best_score = max(rescored, key=lambda item: item[1])
+
+            matches.append((best_uid if best_score >= threshold else "Unknown", best_score))
+        return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-identity prototype index from the full index")
+    parser.add_argument("--index-dir", default="./faissIndex")
+    parser.add_argument("--k", type=int, default=8, help="Representatives per uid besides the centroid")
+    parser.add_argument("--dedup-threshold", type=float, default=0.95, help="Similarity above which vectors are near-duplicates")
+    args = parser.parse_args()
+
+    full_index = faiss.read_index(os.path.join(args.index_dir, "face_index_cosine.faiss"))
+    row_uids = load_row_uids(os.path.join(args.index_dir, "face_metadata.json"))
+    labels, vectors = vectors_by_label(full_index)
+    index, metadata = build_prototype_index(group_by_uid(labels, vectors, row_uids), args.k, args.dedup_threshold)
+
+    save_prototype_index(index, metadata, args.index_dir, args.k, args.dedup_threshold)
+    print(f"[INFO] {full_index.ntotal} vectors -> {index.ntotal} prototypes "
+          f"({100 * index.ntotal / max(full_index.ntotal, 1):.1f}%).")
+
+if __name__ == "__main__":
+    main()
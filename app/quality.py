@@ -0,0 +1,123 @@
+import threading
+import cv2
+import numpy as np
+
+# Pre-recognition quality gate. Faces that are too small, low-confidence, blurred or turned
+# too far away rarely match anything and only produce "Unknown" labels, so they are
+# rejected before ArcFace and FAISS see them. Checks run cheapest first:
+#
+#   low_score  det_score below min_score
+#   small      shorter box side below min_size pixels
+#   pose       yaw or pitch estimated from the 5 detector landmarks out of range
+#   blurry     variance of the Laplacian of the face crop (resized to 64x64) below min_sharpness
+#
+# Pose uses the nose position between the eyes (yaw) and between the eye and mouth lines
+# (pitch); both are 0 for a frontal face, and about 0.5 yaw is a half profile.
+
+REASONS = ("low_score", "small", "pose", "blurry")
+SHARPNESS_SIZE = 64
+
+def pose_ratios(kps):
+    """
+    args:
+        kps (np.ndarray): (5, 2) landmarks: left eye, right eye, nose, left and right mouth corner.
+    returns:
+        tuple: (yaw, pitch), each roughly in [-1, 1] and 0 for a frontal face.
+    """
+    left_eye, right_eye, nose, left_mouth, right_mouth = np.asarray(kps, dtype="float32")
+    eye_mid, mouth_mid = (left_eye + right_eye) / 2, (left_mouth + right_mouth) / 2
+    eye_distance = max(float(np.linalg.norm(right_eye - left_eye)), 1e-6)
+    face_height = max(float(mouth_mid[1] - eye_mid[1]), 1e-6)
+    yaw = float(nose[0] - eye_mid[0]) / eye_distance
+    pitch = float(nose[1] - eye_mid[1]) / face_height - 0.5
+    return yaw, pitch
+
+def sharpness(img, bbox):
+    """
+    Variance of the Laplacian of the face crop, resized to a fixed size so scores compare across box sizes.
+    img must be BGR (as from cv2): the grayscale conversion weighs the channels by their order.
+    """
+    h, w = img.shape[:2]
+    x1, y1, x2, y2 = np.asarray(bbox[:4]).astype(int)
+    x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, w), min(y2, h)
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return 0.0
+    crop = cv2.cvtColor(img[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+    crop = cv2.resize(crop, (SHARPNESS_SIZE, SHARPNESS_SIZE), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(crop, cv2.CV_32F).var())
+
+
+class QualityGate:
+    """
+    args:
+        min_size (int): Minimum shorter box side in pixels (0 disables the check).
+        min_score (float): Minimum detector score.
+        min_sharpness (float): Minimum Laplacian variance of the 64x64 crop (0 disables).
+        max_yaw (float): Largest |yaw| ratio accepted (see pose_ratios).
+        max_pitch (float): Largest |pitch| ratio accepted.
+    """
+
+    def __init__(self, min_size=40, min_score=0.6, min_sharpness=40.0, max_yaw=0.5, max_pitch=0.25):
+        self.min_size = min_size
+        self.min_score = min_score
+        self.min_sharpness = min_sharpness
+        self.max_yaw = max_yaw
+        self.max_pitch = max_pitch
+        self.checked = 0
+        self.rejected = dict.fromkeys(REASONS, 0)
+        self._lock = threading.Lock()  # prep/train.py checks faces from several worker threads
+
+    def reason(self, img, face):
+        """Return why face (in BGR img) should not be recognized, or None if it passes."""
+        if face.det_score is not None and face.det_score < self.min_score:
+            return "low_score"
+        x1, y1, x2, y2 = face.bbox[:4]
+        if min(x2 - x1, y2 - y1) < self.min_size:
+            return "small"
+        if face.kps is not None:
+            yaw, pitch = pose_ratios(face.kps)
+            if abs(yaw) > self.max_yaw or abs(pitch) > self.max_pitch:
+                return "pose"
+        if self.min_sharpness > 0 and sharpness(img, face.bbox) < self.min_sharpness:
+            return "blurry"
+        return None
+
+    def check(self, img, face):
+        reason = self.reason(img, face)
+        with self._lock:
+            self.checked += 1
+            if reason is not None:
+                self.rejected[reason] += 1
+        return reason
+
+    def split(self, img, faces):
+        """
+        returns:
+            tuple: (indexes of faces that pass, {index: reason} for the rejected ones).
+        """
+        passed, rejected = [], {}
+        for i, face in enumerate(faces):
+            reason = self.check(img, face)
+            if reason is None:
+                passed.append(i)
+            else:
+                rejected[i] = reason
+        return passed, rejected
+
+    def signature(self):
+        """Short string identifying the thresholds, for caches whose contents depend on them."""
+        return (f"q{self.min_size}-{self.min_score:g}-{self.min_sharpness:g}"
+                f"-{self.max_yaw:g}-{self.max_pitch:g}")
+
+    def stats(self):
+        total_rejected = sum(self.rejected.values())
+        return {
+            "checked": self.checked,
+            "rejected": total_rejected,
+            "reject_rate": round(total_rejected / self.checked, 3) if self.checked else 0.0,
+            **{f"rejected_{reason}": count for reason, count in self.rejected.items()},
+        }
+
+    def __repr__(self):
+        return (f"QualityGate(min_size={self.min_size}, min_score={self.min_score}, "
+                f"min_sharpness={self.min_sharpness}, max_yaw={self.max_yaw}, max_pitch={self.max_pitch})")
@@ -0,0 +1,107 @@
+import numpy as np
+from utils import normalize_batch
+from metadata_store import labels_of
+
+EMBEDDING_DIM = 512  # ArcFace output
+
+def build_row_uids(metadata):
+    """
+    args:
+        metadata (dict): vector id -> {'uid', 'image_name', 'path'}, as loaded from the metadata file.
+    returns:
+        np.ndarray: object array mapping every FAISS label to its uid.
+
+    Indexes built by prep/train.py and prep/enroll.py are ID-mapped and their
+    metadata is keyed by the int64 FAISS id. Older metadata files are keyed by
+    UUID, in which case FAISS labels are row positions in file order.
+
+    Resolving uids through this array lets a whole batch of search results be
+    looked up with one fancy-indexing call instead of two dict lookups per face.
+    """
+    labels = labels_of(metadata)
+    row_uids = np.full(max(labels, default=-1) + 1, "Unknown", dtype=object)
+    for label, meta in zip(labels, metadata.values()):
+        row_uids[label] = meta.get("uid", "Unknown")
+    return row_uids
+
+def stack_embeddings(faces):
+    """Stack the embeddings of every face detected in a frame into one (n, 512) float32 matrix."""
+    if not faces:
+        return np.empty((0, EMBEDDING_DIM), dtype="float32")
+    return np.stack([face.embedding for face in faces]).astype("float32", copy=False)
+
+def search_batch(faiss_index, embeddings, top_k=1):
+    """
+    args:
+        faiss_index (faiss.Index): Inner-product index of L2-normalized embeddings.
+        embeddings (np.ndarray): (n, 512) raw embeddings.
+        top_k (int): Number of neighbours per query.
+    returns:
+        tuple: (scores, indices), each of shape (n, top_k).
+
+    Normalizes all embeddings in one vectorized call and runs a single FAISS search for the batch.
+    """
+    if len(embeddings) == 0:
+        return np.empty((0, top_k), dtype="float32"), np.empty((0, top_k), dtype="int64")
+    embeddings = np.ascontiguousarray(normalize_batch(embeddings), dtype="float32")
+    return faiss_index.search(embeddings, top_k)
+
+def resolve_matches(scores, indices, row_uids, threshold):
+    """
+    args:
+        scores (np.ndarray): (n, k) similarity scores from search_batch.
+        indices (np.ndarray): (n, k) FAISS row ids from search_batch.
+        row_uids: Output of build_row_uids, or a CompactMetadata; indexed with an array of labels.
+        threshold (float): Minimum similarity for a match.
+    returns:
+        list: One (uid, score) tuple per query; uid is "Unknown" below the threshold.
+    """
+    if len(scores) == 0:
+        return []
+    best_scores = scores[:, 0]
+    best_idx = indices[:, 0]
+    matched = (best_scores >= threshold) & (best_idx >= 0)
+    uids = np.full(len(best_scores), "Unknown", dtype=object)
+    uids[matched] = row_uids[best_idx[matched]]
+    return list(zip(uids.tolist(), best_scores.astype(float).tolist()))
+
+def recognize_faces(faces, faiss_index, row_uids, top_k=1, threshold=0.5):
+    """
+    args:
+        faces (list): Faces returned by FaceAnalysis.get for one frame.
+        faiss_index (faiss.Index): The loaded FAISS index.
+        row_uids (np.ndarray): Output of build_row_uids.
+        top_k (int): Number of neighbours per query.
+        threshold (float): Minimum similarity for a match.
+    returns:
+        list: One (uid, score) tuple per face, in the same order as faces.
+
+    Per-frame recognition step: one normalization, one FAISS search and one metadata lookup for all faces.
+    """
+    scores, indices = search_batch(faiss_index, stack_embeddings(faces), top_k)
+    return resolve_matches(scores, indices, row_uids, threshold)
+
+def resolve_top_k(scores, indices, row_uids, k):
+    """
+    args:
+        scores, indices (np.ndarray): (n, m) results of search_batch with m >= k.
+        row_uids: Label -> uid lookup, as for resolve_matches.
+        k (int): Distinct uids to keep per query.
+    returns:
+        list: For every query, up to k (uid, score) tuples with distinct uids, best first.
+    """
+    if len(scores) == 0:
+        return []
+    valid = indices >= 0
+    uids = np.full(indices.shape, "Unknown", dtype=object)
+    uids[valid] = row_uids[indices[valid]]
+    results = []
+    for row_uids_, row_scores, row_valid in zip(uids, scores.astype(float), valid):
+        seen = {}
+        for uid, score, ok in zip(row_uids_, row_scores, row_valid):
+            if ok and uid not in seen:
+                seen[uid] = score
+                if len(seen) == k:
+                    break
+        results.append(list(seen.items()))
+    return results
@@ -0,0 +1,311 @@
+import os
+import cv2
+import json
+import time
+import queue
+import argparse
+import threading
+import faiss
+import numpy as np
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from faces import detect_faces, embed_faces
+from recognize import EMBEDDING_DIM, stack_embeddings, search_batch, resolve_top_k
+from prototypes import load_row_uids
+from index_spec import load_params, apply_search_params, describe_index
+from batch_recognize import match_record, face_record
+from profiles import PROFILES, DEFAULT_PROFILE, describe_profile, load_face_model
+
+# Resident recognition service: the model, index and metadata are loaded once and queries
+# are answered over a local HTTP port or Unix socket.
+#
+#   POST /recognize   body: encoded image        -> {"faces": [{bbox, det_score, uid, name, score, matches}]}
+#   POST /search      body: {"embeddings": [[...512 floats]], "top_k": 3}
+#                                               -> {"results": [{uid, name, score, matches}]}
+#   GET  /health                                -> service and batching statistics
+#
+# Image requests are decoded, detected and embedded on the request threads; the resulting
+# embeddings from all concurrent requests are coalesced by a MicroBatcher into one FAISS
+# search per batch, flushed when max_batch queries are waiting or max_wait has passed.
+#
+#   python app/service.py --port 8765
+#   python bench/load_service.py --url http://127.0.0.1:8765 --concurrency 1 4 16 64
+
+INDEX_PATH = "./faissIndex/face_index_cosine.faiss"
+METADATA_PATH = "./faissIndex/face_metadata.json"
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent requests into batches.
+
+    args:
+        process (callable): Takes a list of items and returns one result per item.
+        max_batch (int): Items after which a batch is flushed immediately.
+        max_wait (float): Seconds the first item of a batch waits for company.
+        expected (callable): Optional count of requests currently in the service; a batch
+            that already holds that many items is flushed without waiting, so a lone
+            request never pays max_wait.
+
+    submit() returns a concurrent.futures.Future; exceptions raised by process are
+    set on every future of the batch.
+    """
+
+    def __init__(self, process, max_batch=64, max_wait=0.002, expected=None):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.expected = expected
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._stop = threading.Event()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                if self.expected is not None and len(batch) >= self.expected():
+                    break  # Nobody else is on the way
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            try:
+                results = self.process([item for item, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "waiting": self._queue.qsize(),
+        }
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+
+class RecognitionService:
+    """
+    args:
+        faiss_index (faiss.Index): Loaded index of normalized embeddings.
+        row_uids: Label -> uid lookup (CompactMetadata or build_row_uids output).
+        facemodel (FaceAnalysis): Prepared model, or None for an embedding-only service.
+        threshold (float): Minimum similarity for a match.
+        max_top_k (int): Upper bound on the top_k a request may ask for.
+        model_workers (int): Image requests allowed in detection / embedding at once.
+    """
+
+    def __init__(self, faiss_index, row_uids, facemodel=None, threshold=0.5, max_top_k=10,
+                 model_workers=2, max_batch=64, max_wait=0.002):
+        self.faiss_index = faiss_index
+        self.row_uids = row_uids
+        self.facemodel = facemodel
+        self.threshold = threshold
+        self.max_top_k = max_top_k
+        self.batcher = MicroBatcher(self._search, max_batch, max_wait, expected=lambda: self.in_flight).start()
+        self._model_slots = threading.Semaphore(model_workers)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.started_at = time.time()
+
+    def _search(self, items):
+        """Batch worker: items are (embeddings, top_k); one FAISS search covers all of them."""
+        embeddings = np.vstack([emb for emb, _ in items])
+        depth = max(top_k for _, top_k in items) * 4  # Extra depth so top_k distinct uids survive
+        scores, indices = search_batch(self.faiss_index, embeddings, depth)
+        results, start = [], 0
+        for emb, top_k in items:
+            rows = slice(start, start + len(emb))
+            results.append(resolve_top_k(scores[rows], indices[rows], self.row_uids, top_k))
+            start += len(emb)
+        return results
+
+    def _track(self, delta):
+        with self._lock:
+            self.in_flight += delta
+            self.requests += delta > 0
+
+    def search(self, embeddings, top_k=1):
+        """Return one match record per (n, 512) embedding row."""
+        embeddings = np.asarray(embeddings, dtype="float32").reshape(-1, EMBEDDING_DIM)
+        top_k = max(1, min(int(top_k), self.max_top_k))
+        if len(embeddings) == 0:
+            return []
+        self._track(1)
+        try:
+            tops = self.batcher.submit((embeddings, top_k)).result()
+        finally:
+            self._track(-1)
+        return [match_record(top, self.threshold) for top in tops]
+
+    def recognize_image(self, data, top_k=1):
+        """Return one face record per face found in an encoded image."""
+        if self.facemodel is None:
+            raise ValueError("service started without a model; only /search is available")
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("could not decode image")
+        top_k = max(1, min(int(top_k), self.max_top_k))
+        self._track(1)
+        try:
+            with self._model_slots:
+                faces = embed_faces(self.facemodel, img, detect_faces(self.facemodel, img))  # BGR, as the index was built
+            if not faces:
+                return []
+            tops = self.batcher.submit((stack_embeddings(faces), top_k)).result()
+        finally:
+            self._track(-1)
+        return [face_record(face, top, self.threshold) for face, top in zip(faces, tops)]
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime": round(time.time() - self.started_at, 1),
+            "index": describe_index(self.faiss_index),
+            "model": self.facemodel is not None,
+            "requests": self.requests,
+            "batching": self.batcher.stats(),
+        }
+
+
+def make_handler(service, tcp=True):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, so load tests do not measure connection setup
+        disable_nagle_algorithm = tcp  # Headers and body go out as separate writes
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, service.health())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            path, _, query = self.path.partition("?")
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                if path == "/search":
+                    request = json.loads(body)
+                    self._reply(200, {"results": service.search(request["embeddings"], request.get("top_k", 1))})
+                elif path == "/recognize":
+                    top_k = dict(p.partition("=")[::2] for p in query.split("&") if p).get("top_k", 1)
+                    self._reply(200, {"faces": service.recognize_image(body, top_k)})
+                else:
+                    self._reply(404, {"error": "not found"})
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": str(e)})
+            except Exception as e:
+                print(f"[ERROR] Request failed: {e}")
+                self._reply(500, {"error": str(e)})
+
+        def _reply(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self):
+            return str(self.client_address[0]) if self.client_address else "unix"
+
+        def log_message(self, *args):
+            pass  # One line per request would dominate the console under load
+
+    return Handler
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # The default backlog of 5 resets connections under load
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident face recognition service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--metadata", default=METADATA_PATH)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--max-batch", type=int, default=64, help="Queries per FAISS batch")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Longest a query waits for its batch to fill")
+    parser.add_argument("--model-workers", type=int, default=2, help="Image requests in detection / embedding at once")
+    parser.add_argument("--no-model", action="store_true", help="Serve /search only, without loading buffalo_l")
+    parser.add_argument("--ctx-id", type=int, default=0, help="InsightFace context: 0 for GPU, -1 for CPU")
+    parser.add_argument("--model-profile", choices=list(PROFILES), default=DEFAULT_PROFILE,
+                        help="Face model modules, detector size and image downscale (see app/profiles.py)")
+    args = parser.parse_args()
+
+    print("[INFO] Loading FAISS index and metadata.")
+    faiss_index = faiss.read_index(args.index)
+    apply_search_params(faiss_index, load_params(args.index))
+    row_uids = load_row_uids(args.metadata)
+
+    facemodel = None
+    if not args.no_model:
+        print(f"[INFO] Loading face embedding model: {describe_profile(args.model_profile)}.")
+        facemodel = load_face_model(args.model_profile, ctx_id=args.ctx_id)
+
+    service = RecognitionService(faiss_index, row_uids, facemodel, args.threshold, model_workers=args.model_workers,
+                                 max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    if args.unix_socket:
+        if os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+        server = ThreadingUnixHTTPServer(args.unix_socket, make_handler(service, tcp=False))
+        print(f"[INFO] Recognition service listening on unix:{args.unix_socket}")
+    else:
+        server = ServiceHTTPServer((args.host, args.port), make_handler(service))
+        print(f"[INFO] Recognition service listening on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down.")
+    finally:
+        server.server_close()
+        service.batcher.stop()
+        print(f"[INFO] Service stats: {service.health()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import os
+import time
+import queue
+import datetime
+import threading
+import cv2
+
+# Frame sources for the app. A source spec is one of:
+#
+#   0, webcam:1                      local webcam index
+#   rtsp://..., http://..., url:...  network stream (reconnects when the stream drops)
+#   path/to/clip.mp4, file:...       video file
+#   path/to/frames/, dir:...         directory of images, read in name order
+#
+# Every source has read() -> (ret, frame), isOpened() and release() like cv2.VideoCapture,
+# so it can be passed anywhere a capture was. File and directory sources decode on a
+# background read-ahead thread and keep every frame (no drops), which together with
+# ReplayClock makes runs reproducible.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+STREAM_SCHEMES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+class WebcamSource:
+    def __init__(self, index=0):
+        self.cap = cv2.VideoCapture(index)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class StreamSource:
+    """
+    Network stream (RTSP/HTTP). A failed read reopens the stream up to `retries`
+    times, waiting `retry_delay` seconds in between, before reporting end of stream.
+    """
+
+    def __init__(self, url, retries=5, retry_delay=2.0):
+        self.url = url
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cap = cv2.VideoCapture(url)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.reconnects = 0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        ret, frame = self.cap.read()
+        attempts = 0
+        while not ret and attempts < self.retries:
+            attempts += 1
+            print(f"[WARNING] Stream {self.url} dropped, reconnecting ({attempts}/{self.retries}).")
+            self.cap.release()
+            time.sleep(self.retry_delay)
+            self.cap = cv2.VideoCapture(self.url)
+            ret, frame = self.cap.read()
+            self.reconnects += ret
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class ReadAhead:
+    """
+    Decode frames on a background thread into a bounded queue.
+
+    args:
+        frames (iterator): Yields decoded frames; exhausted at end of input.
+        depth (int): Frames decoded ahead of the consumer. The producer blocks when
+            the queue is full, so no frame is ever dropped.
+    """
+
+    _END = object()
+
+    def __init__(self, frames, depth=8):
+        self._queue = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(frames,), name="read-ahead", daemon=True)
+        self._thread.start()
+
+    def _run(self, frames):
+        try:
+            for frame in frames:
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(frame, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if self._stop.is_set():
+                    return
+        finally:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(self._END, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def read(self):
+        frame = self._queue.get()
+        if frame is self._END:
+            self._queue.put(self._END)  # Stay at end of input for later reads
+            return False, None
+        return True, frame
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+
+class FileSource:
+    """
+    Video file or image directory with read-ahead decoding.
+
+    args:
+        path (str): Video file or directory of images.
+        fps (float): Frame rate of an image directory (video files use their own).
+        realtime (bool): Pace reads at the recorded frame rate instead of as fast as possible.
+        loop (bool): Start over at the end of the input.
+        readahead (int): Frames decoded ahead on the background thread.
+    """
+
+    def __init__(self, path, fps=None, realtime=False, loop=False, readahead=8):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.is_directory = os.path.isdir(path)
+        if self.is_directory:
+            self.images = sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.lower().endswith(IMAGE_EXTENSIONS))
+            self.fps = fps or 15.0
+            self.frame_count = len(self.images)
+        else:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                raise IOError(f"[ERROR] Cannot open video file: {path}")
+            self.fps = fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+            self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+        self.frames_read = 0
+        self._next_due = None
+        self._reader = ReadAhead(self._frames(), readahead)
+
+    def _frames(self):
+        while True:
+            if self.is_directory:
+                for image_path in self.images:
+                    frame = cv2.imread(image_path)
+                    if frame is None:
+                        print(f"[WARNING] Skipping unreadable image: {image_path}")
+                        continue
+                    yield frame
+            else:
+                cap = cv2.VideoCapture(self.path)
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    yield frame
+                cap.release()
+            if not self.loop:
+                return
+
+    def isOpened(self):
+        return not self.is_directory or self.frame_count > 0
+
+    def read(self):
+        ret, frame = self._reader.read()
+        if ret and self.realtime:
+            now = time.perf_counter()
+            if self._next_due is None:
+                self._next_due = now
+            elif now < self._next_due:
+                time.sleep(self._next_due - now)
+            self._next_due = max(self._next_due, now) + 1.0 / self.fps
+        self.frames_read += ret
+        return ret, frame
+
+    def release(self):
+        self._reader.close()
+
+
+class ReplayClock:
+    """
+    Deterministic clock driven by frames instead of the wall clock.
+
+    Starts at `start` and advances by 1 / fps every time tick() is called (once per
+    frame read), so time-window logic sees the same timestamps on every run no matter
+    how fast frames are processed. Pass now to utils.set_clock and monotonic to the
+    components that take a clock (identity cache, motion gate).
+    """
+
+    def __init__(self, start, fps):
+        self.start = start
+        self.fps = fps
+        self.frames = 0
+
+    def tick(self):
+        self.frames += 1
+
+    def elapsed(self):
+        return self.frames / self.fps
+
+    def now(self):
+        return self.start + datetime.timedelta(seconds=self.elapsed())
+
+    def monotonic(self):
+        return self.elapsed()
+
+
+class ClockedSource:
+    """Wrap a source so every successful read advances a ReplayClock."""
+
+    def __init__(self, source, clock):
+        self.source = source
+        self.clock = clock
+
+    def isOpened(self):
+        return self.source.isOpened()
+
+    def read(self):
+        ret, frame = self.source.read()
+        if ret:
+            self.clock.tick()
+        return ret, frame
+
+    def release(self):
+        self.source.release()
+
+
+def parse_start_time(text):
+    """Parse "YYYY-mm-dd HH:MM:SS" or "HH:MM:SS" (today) into a datetime."""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    clock_time = datetime.datetime.strptime(text, "%H:%M:%S").time()
+    return datetime.datetime.combine(datetime.date.today(), clock_time)
+
+def open_source(spec, realtime=False, loop=False, readahead=8, fps=None):
+    """
+    args:
+        spec (str | int): Source spec, see the top of this module.
+        realtime (bool): For files and directories, pace reads at the recorded rate.
+        loop (bool): For files and directories, start over at the end.
+        readahead (int): Frames decoded ahead for files and directories.
+        fps (float): Frame rate override (required to be meaningful for image directories).
+    returns:
+        A source with read(), isOpened() and release().
+    """
+    if isinstance(spec, int):
+        return WebcamSource(spec)
+    kind, sep, rest = spec.partition(":")
+    if sep and kind in ("webcam", "file", "dir", "url"):
+        if kind == "webcam":
+            return WebcamSource(int(rest))
+        if kind == "url":
+            return StreamSource(rest)
+        return FileSource(rest, fps, realtime, loop, readahead)
+    if spec.isdigit():
+        return WebcamSource(int(spec))
+    if spec.lower().startswith(STREAM_SCHEMES):
+        return StreamSource(spec)
+    if not os.path.exists(spec):
+        raise FileNotFoundError(f"[ERROR] Frame source not found: {spec}")
+    return FileSource(spec, fps, realtime, loop, readahead)
@@ -0,0 +1,63 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Startup bookkeeping for app.py: independent loading steps (model, index, metadata, cameras)
+# run concurrently, and every step's offset and duration is kept for a breakdown printed
+# once the first frame has been recognized.
+
+
+class StartupProfile:
+    """
+    args:
+        began (float): time.perf_counter() value taken as early as possible in the process.
+    """
+
+    def __init__(self, began=None):
+        self.began = began if began is not None else time.perf_counter()
+        self.steps = []  # (name, start offset, duration)
+        self.ready_at = None
+        self._lock = threading.Lock()
+
+    def mark(self, name, since=None):
+        """Record a step that ran from `since` (default: process start) until now."""
+        now = time.perf_counter()
+        since = self.began if since is None else since
+        with self._lock:
+            self.steps.append((name, since - self.began, now - since))
+
+    def step(self, name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.mark(name, since=start)
+
+    def run_parallel(self, tasks, workers=4):
+        """
+        args:
+            tasks (dict): name -> zero-argument callable.
+        returns:
+            dict: name -> result. The first exception raised by a task is re-raised
+            once every task has finished.
+        """
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="startup") as pool:
+            futures = {name: pool.submit(self.step, name, fn) for name, fn in tasks.items()}
+            errors = [future.exception() for future in futures.values()]
+        for error in errors:
+            if error is not None:
+                raise error
+        return {name: future.result() for name, future in futures.items()}
+
+    def ready(self):
+        """Mark the moment the first frame was recognized; only the first call counts."""
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter() - self.began
+            return True
+        return False
+
+    def report(self):
+        lines = [f"[INFO] Startup breakdown (first frame recognized after {self.ready_at or 0.0:.2f}s):"]
+        for name, offset, duration in sorted(self.steps, key=lambda step: step[1]):
+            lines.append(f"[INFO]   {name:<14} {offset:>6.2f}s -> {offset + duration:>6.2f}s  ({duration:.2f}s)")
+        return "\n".join(lines)
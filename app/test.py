@@ -1,8 +1,12 @@
 import os
 import cv2
+import faiss
 import matplotlib.pyplot as plt
-from insightface.app import FaceAnalysis
-from pinecone import Pinecone
+from profiles import load_face_model, describe_profile
+from faces import get_faces
+from recognize import search_batch, resolve_matches
+from prototypes import load_row_uids
+from index_spec import load_params, apply_search_params
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,21 +15,19 @@ def query_face_embedding():
     query = input("[INPUT] Enter query image path: ")
 
     QUERY_IMAGE_PATH = query
-    PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-    PINECONE_REGION = "us-east-1"
-    INDEX_NAME = "aiml-da-face-embeds"
-    TOP_K = 5  # Number of top results to return
+    INDEX_PATH = "./faissIndex/face_index_cosine.faiss"
+    METADATA_PATH = "./faissIndex/face_metadata.json"
     USE_GPU = 0  # Use -1 for CPU
     SIMILARITY_THRESHOLD = 0.5
+    MODEL_PROFILE = "accurate"  # See profiles.py
 
-    print("[INFO] Loading face embedding model.")
-    app = FaceAnalysis(name="buffalo_l")
-    app.prepare(ctx_id=0)  # GPU: 0, CPU: -1
+    print(f"[INFO] Loading face embedding model: {describe_profile(MODEL_PROFILE)}.")
+    app = load_face_model(MODEL_PROFILE, ctx_id=USE_GPU)
     print("[INFO] Model loaded.")
 
     def extract_embedding(image_path):
         img = cv2.imread(image_path)
-        faces = app.get(img)
+        faces = get_faces(app, img)
         if not faces:
             raise ValueError("[ERROR] No face detected in query image.")
         return faces[0].embedding, img
@@ -37,35 +39,20 @@ def query_face_embedding():
         exit(1)
     print(query_embedding.shape, query_img.shape)
 
-    print("[INFO] Connecting to Pinecone.")
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    index = pc.Index(INDEX_NAME)
-
     try:
-        print("[INFO] Querying Pinecone for nearest neighbors.")
-        results = index.query(
-            vector=query_embedding.tolist(),
-            top_k=TOP_K,
-            include_metadata=True
-        )
+        print("[INFO] Loading FAISS index and metadata.")
+        index = faiss.read_index(INDEX_PATH)
+        apply_search_params(index, load_params(INDEX_PATH))
+        row_uids = load_row_uids(METADATA_PATH)
 
-        print("\n[OUTPUT] Top matches:")
-        if not results.matches:
-            print("[ERROR] No matches found.")
+        print("[INFO] Querying FAISS for the nearest neighbor.")
+        scores, indices = search_batch(index, query_embedding[None])
+        uid, score = resolve_matches(scores, indices, row_uids, SIMILARITY_THRESHOLD)[0]
+        if uid == "Unknown":
+            print(f"[ERROR] No matches found.")
             return 0
-        else:
-            for match in results.matches:
-                # metadata = match.metadata
-                # print(f"- UID: {metadata['uid']} | Image: {metadata['image_name']} | Score: {match.score:.4f}")
-                top_match = match
-                score = top_match.score
-                if score >= SIMILARITY_THRESHOLD:
-                    uid = top_match.metadata['uid']
-                    print(f"[OUTPUT] UID: {uid} | Score: {score:.4f}")
-                    return uid
-                else:
-                    print(f"[ERROR] No matches found.")
-                    return 0
+        print(f"[OUTPUT] UID: {uid} | Score: {score:.4f}")
+        return uid
     except Exception as e:
         print(f"[ERROR] An error occurred: {str(e)}")
         return 0
@@ -82,10 +69,15 @@ def get_name():
         return None
 
 def greet_user():
-    from utils import generate_voice
+    from utils import get_name, create_greeting
+    from audio import AudioWorker, ElevenLabsTTS
     uid = query_face_embedding()
     if uid:
-        generate_voice(uid)
+        _, welcome = create_greeting(uid)
+        worker = AudioWorker(ElevenLabsTTS(), name_lookup=get_name)
+        os.makedirs(worker.temp_dir, exist_ok=True)
+        path = worker.clip(uid, welcome)  # Generates on the calling thread; no worker needed for one clip
+        print(f"[INFO] Greeting audio saved to {path}")
     else:
         print("[ERROR] No valid UID found. Cannot generate greeting voice.")
 
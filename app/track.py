@@ -1,63 +1,142 @@
 from utils import get_name, get_current_time
 import uuid
 
-def add_to_dictionary(dictionary, uid):
+class SessionRecord:
     """
+    One attendance session entry. Fields can also be read dict-style
+    (record['uid']) so code written against the old dictionaries keeps working.
+    """
+    __slots__ = ("track_id", "uid", "name", "date", "time", "last_seen", "camera", "last_camera")
+
+    def __init__(self, track_id, uid, name, date, time, camera=None):
+        self.track_id = track_id
+        self.uid = uid
+        self.name = name
+        self.date = date
+        self.time = time
+        self.last_seen = time
+        self.camera = camera
+        self.last_camera = camera
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __repr__(self):
+        return (f"{{'uid': {self.uid!r}, 'name': {self.name!r}, 'date': {self.date!r}, "
+                f"'time': {self.time!r}, 'last_seen': {self.last_seen!r}"
+                + (f", 'camera': {self.camera!r}, 'last_camera': {self.last_camera!r}" if self.camera is not None else "")
+                + "}")
+
+
+class SessionStore:
+    """
+    Attendance sessions keyed by uid, with a secondary view by track id.
+
+    Lookups and last_seen updates are O(1). Iteration (items/values) follows
+    insertion order and yields (track_id, record) like the old dictionaries.
+
     args:
-        dictionary (dict): The dictionary to update.
-        uid (str): The UID to add or update in the dictionary.
-    returns:
-        tuple: (exists, updated_dictionary)
+        name_lookup (callable): uid -> display name; 'Unknown' means the uid is not on the roster.
+    """
+
+    def __init__(self, name_lookup=get_name):
+        self.name_lookup = name_lookup
+        self._by_uid = {}
+        self._by_track = {}
+
+    def add(self, uid, track_id=None, date=None, time=None, camera=None):
+        """
+        args:
+            uid (str): The UID to add or update.
+            track_id (str): Optional track id to associate with the session (generated if omitted).
+            date, time (str): Timestamp of the sighting; defaults to now.
+            camera (str): Optional id of the camera that made the sighting.
+        returns:
+            tuple: (exists, record), or None if the uid has no known name.
+        """
+        if date is None or time is None:
+            date, time = get_current_time()
+
+        record = self._by_uid.get(uid)
+        if record is not None:
+            record.last_seen = time
+            if camera is not None:
+                record.last_camera = camera
+            if track_id is not None and track_id != record.track_id:
+                self._by_track.pop(record.track_id, None)
+                record.track_id = track_id
+                self._by_track[track_id] = record
+            return True, record
+
+        name = self.name_lookup(uid)
+        if name == 'Unknown':
+            return None
+
+        if track_id is None:
+            track_id = uuid.uuid4().hex[:8]
+        record = SessionRecord(track_id, uid, name, date, time, camera)
+        self._by_uid[uid] = record
+        self._by_track[track_id] = record
+        return False, record
 
-    This function checks if the UID exists in the dictionary and adds it if not found.
-    If the UID is found, it returns True and the existing dictionary.
+    def get(self, uid):
+        return self._by_uid.get(uid)
+
+    def by_track(self, track_id):
+        return self._by_track.get(track_id)
+
+    def items(self):
+        return ((record.track_id, record) for record in self._by_uid.values())
+
+    def values(self):
+        return self._by_uid.values()
+
+    def clear(self):
+        self._by_uid.clear()
+        self._by_track.clear()
+
+    def __contains__(self, uid):
+        return uid in self._by_uid
+
+    def __len__(self):
+        return len(self._by_uid)
+
+    def __bool__(self):
+        return bool(self._by_uid)
+
+    def __repr__(self):
+        return repr({track_id: record for track_id, record in self.items()})
+
+
+def add_to_dictionary(dictionary, uid, track_id=None, camera=None):
     """
-    track_id = uuid.uuid4().hex[:8]  # Generate a unique track ID
-    # print(f"[INFO] Generated track ID: {track_id}")
-    name = get_name(uid) # Get the name associated with the UID
+    args:
+        dictionary (SessionStore): The session store to update.
+        uid (str): The UID to add or update in the store.
+        track_id (str): Optional track id for the session.
+        camera (str): Optional id of the camera that saw the uid.
+    returns:
+        tuple: (exists, updated_store), or None if the uid has no known name.
 
-    if name == 'Unknown':
-        # print(f"[ERROR] No name found for UID: {uid}")
+    This function checks if the UID exists in the store and adds it if not found.
+    If the UID is found, its last_seen time is updated and it returns True.
+    """
+    result = dictionary.add(uid, track_id=track_id, camera=camera)
+    if result is None:
         return None
-    # else:
-    #     print(f"[INFO] Name found for UID {uid}: {name}")
-
-    date, time = get_current_time()
-
-    if review_dictionary(dictionary, uid)[0] is None:
-        dictionary[track_id] = {
-            'uid': uid,
-            'name': name,
-            'date': date,
-            'time': time,
-            'last_seen': time
-        }
-        # print(f"[INFO] Added {name} with UID {uid} to the dictionary.")
-        return False, dictionary
-    
-    else:
-        # print(f"[INFO] {name} with UID {uid} already exists in the dictionary.")
-        existing_track_id, details = review_dictionary(dictionary, uid)
-        dictionary[existing_track_id]['last_seen'] = time
-        return True, dictionary
+    exists, _ = result
+    return exists, dictionary
 
 
 def review_dictionary(dictionary, uid):
     """
     args:
-        dictionary (dict): The dictionary to search.
+        dictionary (SessionStore): The session store to search.
         uid (str): The UID to search for.
     returns:
-        tuple: (track_id, details) if found, else (None, None)
-
-    This function checks if the UID exists in the dictionary and returns the associated track ID and details.
+        tuple: (track_id, record) if found, else (None, None)
     """
-    name = get_name(uid)
-
-    for track_id, details in dictionary.items():
-        if details['name'] == name:
-            # print(f"[INFO] Found {name} with UID {uid} against track ID {track_id} in the dictionary at {details['date']} {details['time']}.")
-            return track_id, details
-        
-    # print(f"[ERROR] {name} with UID {uid} not found in the dictionary.")
-    return None, None
\ No newline at end of file
+    record = dictionary.get(uid)
+    if record is None:
+        return None, None
+    return record.track_id, record
@@ -0,0 +1,226 @@
+import cv2
+import numpy as np
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    args:
+        boxes_a (np.ndarray): (n, 4) boxes as x1, y1, x2, y2.
+        boxes_b (np.ndarray): (m, 4) boxes as x1, y1, x2, y2.
+    returns:
+        np.ndarray: (n, m) intersection-over-union matrix.
+    """
+    a = np.asarray(boxes_a, dtype="float32").reshape(-1, 4)[:, None, :]
+    b = np.asarray(boxes_b, dtype="float32").reshape(-1, 4)[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    __slots__ = ("track_id", "bbox", "payload", "hits", "age")
+
+    def __init__(self, track_id, bbox, payload):
+        self.track_id = track_id
+        self.bbox = np.asarray(bbox, dtype="float32")
+        self.payload = payload  # Identity carried between detections, e.g. (label, score, color)
+        self.hits = 1           # Detection frames this track was matched on
+        self.age = 0            # Frames propagated since the last detection
+
+
+class FaceTracker:
+    """
+    Lightweight box tracker used between full detections.
+
+    update() associates fresh detections with existing tracks by IoU so tracks
+    keep their id; predict() moves every track by the median Lucas-Kanade
+    optical flow of a grid of points inside its box. A track whose points can
+    no longer be followed is dropped and `lost` is raised so the caller can
+    force a detection on the next frame.
+
+    args:
+        iou_threshold (float): Minimum IoU to associate a detection with a track.
+        use_flow (bool): Propagate boxes with optical flow; when False boxes are held in place.
+        scale (float): Downscale factor applied before computing optical flow.
+        grid (int): Points per side of the sampling grid inside each box.
+        min_tracked (float): Fraction of grid points that must be followed to keep a track.
+    """
+
+    def __init__(self, iou_threshold=0.3, use_flow=True, scale=0.5, grid=5, min_tracked=0.4):
+        self.iou_threshold = iou_threshold
+        self.use_flow = use_flow
+        self.scale = scale
+        self.grid = grid
+        self.min_tracked = min_tracked
+        self.tracks = []
+        self.lost = False
+        self._next_id = 0
+        self._prev_gray = None
+
+    def _gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if self.scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def reset(self):
+        self.tracks = []
+        self.lost = False
+        self._prev_gray = None
+
+    def update(self, frame, boxes, payloads=None):
+        """
+        args:
+            frame (np.ndarray): The frame the detections come from.
+            boxes (list): Detected boxes as x1, y1, x2, y2.
+            payloads (list): Identity payload for each box; may be set on the returned tracks later instead.
+        returns:
+            list: The Track for each box, in the same order.
+
+        Detections are authoritative: unmatched tracks are dropped, unmatched boxes start new tracks.
+        """
+        boxes = np.asarray(boxes, dtype="float32").reshape(-1, 4)
+        assigned = [None] * len(boxes)
+        if payloads is None:
+            payloads = [None] * len(boxes)
+
+        if self.tracks and len(boxes):
+            ious = iou_matrix([t.bbox for t in self.tracks], boxes)
+            for flat in np.argsort(-ious, axis=None):
+                ti, di = np.unravel_index(flat, ious.shape)
+                if ious[ti, di] < self.iou_threshold:
+                    break
+                track = self.tracks[ti]
+                if assigned[di] is not None or track in assigned:
+                    continue
+                assigned[di] = track
+
+        for i, box in enumerate(boxes):
+            track = assigned[i]
+            if track is None:
+                track = Track(self._next_id, box, payloads[i])
+                self._next_id += 1
+                assigned[i] = track
+            else:
+                track.bbox = box
+                track.payload = payloads[i]
+                track.hits += 1
+                track.age = 0
+
+        self.tracks = assigned
+        self.lost = False
+        self._prev_gray = self._gray(frame) if self.use_flow else None
+        return assigned
+
+    def predict(self, frame):
+        """
+        args:
+            frame (np.ndarray): The next frame, without detections.
+        returns:
+            list: The surviving tracks with propagated boxes.
+        """
+        for track in self.tracks:
+            track.age += 1
+        if not self.tracks or not self.use_flow:
+            return self.tracks
+
+        gray = self._gray(frame)
+        steps = (np.arange(self.grid) + 1) / (self.grid + 1)
+        points = []
+        for track in self.tracks:
+            x1, y1, x2, y2 = track.bbox * self.scale
+            xs = x1 + (x2 - x1) * steps
+            ys = y1 + (y2 - y1) * steps
+            points.append(np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2))
+        points = np.concatenate(points).astype("float32").reshape(-1, 1, 2)
+
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, points, None,
+                                                    winSize=(15, 15), maxLevel=2)
+        status = status.reshape(-1).astype(bool)
+        flow = (moved - points).reshape(-1, 2)
+        per_track = self.grid * self.grid
+        h, w = frame.shape[:2]
+
+        survivors = []
+        for i, track in enumerate(self.tracks):
+            ok = status[i * per_track:(i + 1) * per_track]
+            if ok.mean() < self.min_tracked:
+                self.lost = True
+                continue
+            dx, dy = np.median(flow[i * per_track:(i + 1) * per_track][ok], axis=0) / self.scale
+            track.bbox = track.bbox + np.array([dx, dy, dx, dy], dtype="float32")
+            x1, y1, x2, y2 = track.bbox
+            if x2 <= 0 or y2 <= 0 or x1 >= w or y1 >= h:
+                self.lost = True
+                continue
+            survivors.append(track)
+
+        self.tracks = survivors
+        self._prev_gray = gray
+        return survivors
+
+
+class DetectionScheduler:
+    """
+    Decides on which frames full detection + recognition runs.
+
+    Detection runs every `every` frames, or immediately when forced (e.g. a
+    track was lost). With adaptive=True, `every` is re-derived from the
+    measured cost of detection and tracking frames so that the average frame
+    time stays within target_frame_time.
+    """
+
+    def __init__(self, every=5, adaptive=False, target_frame_time=1 / 15, min_every=1, max_every=30, smoothing=0.1):
+        self.every = every
+        self.adaptive = adaptive
+        self.target_frame_time = target_frame_time
+        self.min_every = min_every
+        self.max_every = max_every
+        self.smoothing = smoothing
+        self.detect_time = None
+        self.track_time = None
+        self.detections = 0
+        self.tracked_frames = 0
+        self._since_detection = None
+
+    def should_detect(self, force=False):
+        return force or self._since_detection is None or self._since_detection + 1 >= self.every
+
+    def record(self, seconds, detected):
+        """Record how long a frame took, and whether it was a detection frame."""
+        if detected:
+            self.detections += 1
+            self._since_detection = 0
+            self.detect_time = self._ema(self.detect_time, seconds)
+        else:
+            self.tracked_frames += 1
+            self._since_detection = (self._since_detection or 0) + 1
+            self.track_time = self._ema(self.track_time, seconds)
+
+        if self.adaptive and self.detect_time is not None:
+            self.every = self._adaptive_every()
+
+    def _ema(self, current, value):
+        return value if current is None else current + self.smoothing * (value - current)
+
+    def _adaptive_every(self):
+        # Average frame time with one detection every N frames: (detect + (N - 1) * track) / N <= target
+        track_time = self.track_time or 0.0
+        if self.detect_time <= self.target_frame_time:
+            return self.min_every
+        if track_time >= self.target_frame_time:
+            return self.max_every
+        needed = (self.detect_time - track_time) / (self.target_frame_time - track_time)
+        return int(min(max(np.ceil(needed), self.min_every), self.max_every))
+
+    def stats(self):
+        return {
+            "every": self.every,
+            "detections": self.detections,
+            "tracked_frames": self.tracked_frames,
+            "detect_ms": round((self.detect_time or 0.0) * 1000, 2),
+            "track_ms": round((self.track_time or 0.0) * 1000, 2),
+        }
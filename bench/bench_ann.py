@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import argparse
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from index_spec import build_index, apply_search_params, index_memory
+from prototypes import vectors_by_label
+
+# Recall@1 against the exact flat index, QPS and memory for each index spec,
+# on synthetic clustered embeddings and on the real embeddings in faissIndex/.
+
+parser = argparse.ArgumentParser(description="ANN index recall-vs-latency benchmark")
+parser.add_argument("--specs", nargs="+", default=["flat", "sq8", "hnsw:M=32", "ivf-flat", "ivf-pq:m=64"])
+parser.add_argument("--synthetic", type=int, default=100000, help="Synthetic vectors (0 to skip)")
+parser.add_argument("--identities", type=int, default=2000, help="Synthetic identities (clusters)")
+parser.add_argument("--index", default="./faissIndex/face_index_cosine.faiss", help="Real index to benchmark (skipped if missing)")
+parser.add_argument("--queries", type=int, default=1000)
+parser.add_argument("--sweep", action="store_true", help="Also sweep nprobe / efSearch")
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+
+def normalized(x):
+    x = x.astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+def synthetic(n, n_ids):
+    # Identities are random directions; each vector is its identity plus per-shot noise,
+    # giving same-identity cosine similarities around 0.6 as with ArcFace embeddings
+    centers = normalized(rng.standard_normal((n_ids, 512)))
+    owners = rng.integers(0, n_ids, n)
+    return normalized(centers[owners] + 0.8 * rng.standard_normal((n, 512)) / np.sqrt(512))
+
+def make_queries(base, n):
+    picks = base[rng.integers(0, len(base), n)]
+    return normalized(picks + 0.5 * rng.standard_normal(picks.shape) / np.sqrt(512))
+
+def timed_search(index, queries):
+    index.search(queries[:10], 1)  # warm-up
+    start = time.perf_counter()
+    _, labels = index.search(queries, 1)
+    return labels[:, 0], len(queries) / (time.perf_counter() - start)
+
+def run(name, base, queries):
+    ids = np.arange(len(base), dtype="int64")
+    exact = faiss.IndexFlatIP(512)
+    exact.add(base)
+    truth = exact.search(queries, 1)[1][:, 0]
+
+    print(f"\n[INFO] {name}: {len(base)} vectors, {len(queries)} queries")
+    print(f"{'spec':>28} | {'build s':>7} | {'recall@1':>8} | {'QPS':>9} | {'MiB':>7}")
+    for spec in args.specs:
+        start = time.perf_counter()
+        index, params = build_index(spec, base, ids)
+        build_time = time.perf_counter() - start
+        sweeps = [None]
+        if args.sweep and "nprobe" in params:
+            sweeps = [("nprobe", v) for v in (1, 4, 16, 64) if v <= params["nlist"]]
+        elif args.sweep and "efSearch" in params:
+            sweeps = [("efSearch", v) for v in (16, 32, 64, 128)]
+        for sweep in sweeps:
+            label = spec
+            if sweep is not None:
+                apply_search_params(index, {sweep[0]: sweep[1]})
+                label = f"{spec} {sweep[0]}={sweep[1]}"
+            found, qps = timed_search(index, queries)
+            recall = float(np.mean(found == truth))
+            print(f"{label:>28} | {build_time:>7.1f} | {recall:>8.3f} | {qps:>9.0f} | {index_memory(index) / 2**20:>7.1f}")
+
+if args.synthetic:
+    base = synthetic(args.synthetic, args.identities)
+    run("synthetic", base, make_queries(base, args.queries))
+
+if os.path.exists(args.index):
+    _, base = vectors_by_label(faiss.read_index(args.index))
+    base = np.ascontiguousarray(base)
+    run("real embeddings", base, make_queries(base, min(args.queries, len(base))))
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from arcface import BatchArcFace, GRAPH_OPT_LEVELS, session_options
+
+# Per-face vs. batched ArcFace inference on CPU. The per-face path is insightface's own
+# ArcFaceONNX.get() (one norm_crop + session.run per face); the batched path is
+# app/arcface.py's BatchArcFace (all crops aligned, then one session.run). Both use a
+# session built with the same ONNX Runtime options, and every frame holds --faces faces
+# at synthetic landmark positions, so no face photos or detector are needed.
+#
+#   python bench/bench_batch_embed.py --faces 1 4 16 32 --intra-threads 1 4
+
+DEFAULT_MODEL = os.path.expanduser("~/.insightface/models/buffalo_l/w600k_r50.onnx")
+
+parser = argparse.ArgumentParser(description="Batched ArcFace benchmark")
+parser.add_argument("--model", default=DEFAULT_MODEL, help="ArcFace ONNX model")
+parser.add_argument("--faces", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Faces per frame")
+parser.add_argument("--intra-threads", type=int, nargs="+", default=[0], help="ONNX Runtime intra-op threads (0 = default)")
+parser.add_argument("--inter-threads", type=int, default=0)
+parser.add_argument("--opt-level", choices=list(GRAPH_OPT_LEVELS), default="all")
+parser.add_argument("--frames", type=int, default=20, help="Frames timed per configuration")
+args = parser.parse_args()
+
+# insightface's 112x112 ArcFace landmark template (eyes, nose, mouth corners)
+ARCFACE_DST = np.array([[38.2946, 51.6963], [73.5318, 51.5014], [56.0252, 71.7366],
+                        [41.5493, 92.3655], [70.7299, 92.2041]], dtype="float32")
+
+class Face(dict):
+    __getattr__ = dict.get
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+def synthetic_frame(n_faces, rng):
+    img = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    faces = []
+    for i in range(n_faces):
+        scale = rng.uniform(0.8, 1.6)
+        x, y = (i % 8) * 150 + 20, (i // 8) * 170 + 20
+        faces.append(Face(kps=ARCFACE_DST * scale + (x, y)))
+    return img, faces
+
+def per_face(rec_model, img, faces):
+    for face in faces:
+        rec_model.get(img, face)
+    return np.array([face.embedding for face in faces])
+
+def batched(batch_model, img, faces):
+    batch_model.embed_faces(img, faces)
+    return np.array([face.embedding for face in faces])
+
+def timed(fn, model, frames):
+    fn(model, *frames[0])  # warm-up
+    start = time.perf_counter()
+    for img, faces in frames:
+        embeddings = fn(model, img, faces)
+    return (time.perf_counter() - start) / len(frames) * 1000, embeddings
+
+if not os.path.isfile(args.model):
+    sys.exit(f"[ERROR] {args.model} not found; pass --model with an ArcFace ONNX file")
+from insightface.model_zoo.arcface_onnx import ArcFaceONNX
+
+rng = np.random.default_rng(0)
+print(f"[INFO] {args.model}, graph optimization '{args.opt_level}', {args.frames} frames per configuration.")
+print(f"{'intra':>5} | {'faces':>5} | {'per-face ms':>11} | {'batched ms':>10} | {'faces/s':>15} | {'speedup':>7} | {'min cos':>7}")
+for intra in args.intra_threads:
+    options = session_options(intra, args.inter_threads, args.opt_level)
+    batch_model = BatchArcFace(args.model, options=options, max_batch=max(args.faces))
+    rec_model = ArcFaceONNX(args.model, session=batch_model.session)
+    batch_model.input_mean, batch_model.input_std = rec_model.input_mean, rec_model.input_std
+    for n_faces in args.faces:
+        frames = [synthetic_frame(n_faces, rng) for _ in range(args.frames)]
+        single_ms, single = timed(per_face, rec_model, frames)
+        batch_ms, batch = timed(batched, batch_model, frames)
+        cos = np.sum(single * batch, axis=1) / (np.linalg.norm(single, axis=1) * np.linalg.norm(batch, axis=1))
+        throughput = f"{n_faces / single_ms * 1000:.0f} -> {n_faces / batch_ms * 1000:.0f}"
+        print(f"{intra:>5} | {n_faces:>5} | {single_ms:>11.2f} | {batch_ms:>10.2f} | {throughput:>15} | "
+              f"{single_ms / batch_ms:>6.2f}x | {cos.min():>7.5f}")
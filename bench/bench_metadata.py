@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import time
+import uuid
+import tempfile
+import argparse
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from recognize import build_row_uids
+from metadata_store import CompactMetadata, write_compact
+
+# Metadata load benchmark: face_metadata.json + build_row_uids vs. the compact store,
+# on metadata synthesized at campus scale in the same shape as faissIndex/face_metadata.json.
+
+parser = argparse.ArgumentParser(description="Metadata load-time benchmark")
+parser.add_argument("--vectors", type=int, nargs="+", default=[2000, 100000, 500000])
+parser.add_argument("--uids", type=int, default=5000, help="Distinct identities in the synthetic metadata")
+args = parser.parse_args()
+
+def synthesize(n_vectors, n_uids):
+    metadata = {}
+    for i in range(n_vectors):
+        uid = f"TNU2020{i % n_uids:09d}"
+        image_name = f"{i // n_uids}_DSC_{1000 + i % 9000}.jpg"
+        metadata[str(uuid.uuid4())] = {
+            "uid": uid,
+            "image_name": image_name,
+            "path": f"D:/Wrishav/face-recognition/datasets/AIML and DA/train\\{uid}\\{image_name}"
+        }
+    return metadata
+
+def measure(load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed * 1000, peak / 2**20
+
+def load_json(path):
+    with open(path, "r") as f:
+        metadata = json.load(f)
+    return build_row_uids(metadata)
+
+print(f"{'vectors':>8} | {'json ms':>9} | {'json MiB':>8} | {'compact ms':>10} | {'compact MiB':>11} | {'resolve 16 us':>13}")
+rng = np.random.default_rng(0)
+with tempfile.TemporaryDirectory() as tmp:
+    for n in args.vectors:
+        metadata = synthesize(n, min(args.uids, n))
+        json_path = os.path.join(tmp, f"meta_{n}.json")
+        with open(json_path, "w") as f:
+            json.dump(metadata, f, indent=4)
+        prefix = os.path.join(tmp, f"meta_{n}")
+        write_compact(metadata, prefix)
+        del metadata
+
+        legacy, t_json, m_json = measure(lambda: load_json(json_path))
+        compact, t_compact, m_compact = measure(lambda: CompactMetadata(prefix))
+
+        labels = rng.integers(0, n, 16)
+        assert (legacy[labels] == compact[labels]).all()
+        start = time.perf_counter()
+        for _ in range(1000):
+            compact[labels]
+        t_resolve = (time.perf_counter() - start) * 1000
+
+        print(f"{n:>8} | {t_json:>9.1f} | {m_json:>8.1f} | {t_compact:>10.2f} | {m_compact:>11.2f} | {t_resolve:>13.2f}")
+        del legacy, compact
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+from PIL import ImageFont, ImageDraw, Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from overlay import OverlayRenderer
+
+# Overlay benchmark on 1080p frames: per-face PIL round-trip (old app.py) vs. OverlayRenderer.
+
+parser = argparse.ArgumentParser(description="Overlay rendering benchmark")
+parser.add_argument("--font", default="./helper/cambria.ttc", help="Path to the Cambria font")
+parser.add_argument("--repeats", type=int, default=50, help="Frames timed per face count")
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+frame = rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+font = ImageFont.truetype(args.font, 24)
+renderer = OverlayRenderer(args.font, font_size=24)
+
+def make_detections(n_faces):
+    detections = []
+    for i in range(n_faces):
+        x, y = 80 + (i % 8) * 220, 100 + (i // 8) * 250
+        uid = f"TNU20200211000{i:02d}"
+        detections.append(((x, y, x + 160, y + 200), uid, float(rng.uniform(0.5, 0.9)), (0, 255, 0)))
+    return detections
+
+def draw_pil(frame, detections):
+    for bbox, uid, score, color in detections:
+        label = f"{uid} ({score:.2f})"
+        frame_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        draw = ImageDraw.Draw(frame_pil)
+        draw.text((bbox[0], bbox[1] - 30), label, font=font, fill=color)
+        frame = cv2.cvtColor(np.array(frame_pil), cv2.COLOR_RGB2BGR)
+        cv2.rectangle(frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
+    return frame
+
+def draw_renderer(frame, detections):
+    return renderer.draw(frame, detections)
+
+def time_frames(fn, detections):
+    fn(frame.copy(), detections)  # warm-up (fills the label cache)
+    total = 0.0
+    for _ in range(args.repeats):
+        target = frame.copy()
+        start = time.perf_counter()
+        fn(target, detections)
+        total += time.perf_counter() - start
+    return total / args.repeats * 1000
+
+print(f"{'faces':>5} | {'PIL ms':>8} | {'renderer ms':>11} | {'speedup':>7}")
+for n_faces in (1, 4, 8, 16):
+    detections = make_detections(n_faces)
+    t_pil = time_frames(draw_pil, detections)
+    t_renderer = time_frames(draw_renderer, detections)
+    print(f"{n_faces:>5} | {t_pil:>8.2f} | {t_renderer:>11.3f} | {t_pil / t_renderer:>6.1f}x")
+print(f"[INFO] Label cache hits: {renderer.hits}, misses: {renderer.misses}")
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import argparse
+import cv2
+import faiss
+import numpy as np
+from glob import glob
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from profiles import PROFILES, describe_profile, load_face_model
+from faces import detect_faces, embed_faces
+from recognize import search_batch, resolve_top_k
+from prototypes import load_row_uids
+from index_spec import load_params, apply_search_params
+
+# Latency and recognition accuracy of every model profile in app/profiles.py, on a labelled
+# set of photos laid out like the training dataset (<dir>/<uid>/*.jpg). Use photos that were
+# NOT enrolled in the index, otherwise every profile scores a near-perfect self-match.
+#
+# --frame-size pastes each photo onto a camera-sized canvas, so the pre-downscale of the
+# faster profiles is exercised the way it is on live frames.
+#
+#   python bench/bench_profiles.py --dataset ./holdout --index-dir ./faissIndex --frame-size 1280x720
+
+parser = argparse.ArgumentParser(description="Model profile latency / accuracy benchmark")
+parser.add_argument("--dataset", required=True, help="Held-out photos laid out as <uid>/*.jpg")
+parser.add_argument("--index-dir", default="./faissIndex")
+parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES),
+                    help="Profiles to run; the first one is the reference for embedding agreement")
+parser.add_argument("--frame-size", default=None, help="WxH canvas each photo is centred on, e.g. 1280x720")
+parser.add_argument("--threshold", type=float, default=0.5)
+parser.add_argument("--limit", type=int, default=500, help="Use at most this many photos")
+parser.add_argument("--ctx-id", type=int, default=-1, help="InsightFace context: 0 for GPU, -1 for CPU")
+args = parser.parse_args()
+
+def load_photos():
+    photos = []
+    for uid in sorted(os.listdir(args.dataset)):
+        for path in sorted(glob(os.path.join(args.dataset, uid, "*.jpg"))):
+            img = cv2.imread(path)
+            if img is not None:
+                photos.append((uid, place_on_canvas(img)))
+    rng = np.random.default_rng(0)
+    if len(photos) > args.limit:
+        photos = [photos[i] for i in sorted(rng.choice(len(photos), args.limit, replace=False))]
+    return photos
+
+def place_on_canvas(img):
+    if not args.frame_size:
+        return img
+    width, height = (int(v) for v in args.frame_size.lower().split("x"))
+    scale = min(1.0, width / img.shape[1], height / img.shape[0])
+    if scale < 1.0:
+        img = cv2.resize(img, (int(img.shape[1] * scale), int(img.shape[0] * scale)))
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    y, x = (height - img.shape[0]) // 2, (width - img.shape[1]) // 2
+    canvas[y:y + img.shape[0], x:x + img.shape[1]] = img
+    return canvas
+
+def run_profile(profile, photos):
+    """returns: (load seconds, detection ms, embedding ms, best-face embedding or None per photo)"""
+    start = time.perf_counter()
+    facemodel = load_face_model(profile, ctx_id=args.ctx_id)
+    load_seconds = time.perf_counter() - start
+    embed_faces(facemodel, photos[0][1], detect_faces(facemodel, photos[0][1]))  # warm-up
+
+    detect_time = embed_time = 0.0
+    embeddings = []
+    for _, img in photos:
+        start = time.perf_counter()
+        faces = detect_faces(facemodel, img)
+        detect_time += time.perf_counter() - start
+        if not faces:
+            embeddings.append(None)
+            continue
+        best = max(faces, key=lambda face: face.det_score)
+        start = time.perf_counter()
+        embed_faces(facemodel, img, [best])
+        embed_time += time.perf_counter() - start
+        embeddings.append(best.embedding / np.linalg.norm(best.embedding))
+    return load_seconds, detect_time / len(photos) * 1000, embed_time / len(photos) * 1000, embeddings
+
+faiss_index = faiss.read_index(os.path.join(args.index_dir, "face_index_cosine.faiss"))
+apply_search_params(faiss_index, load_params(os.path.join(args.index_dir, "face_index_cosine.faiss")))
+row_uids = load_row_uids(os.path.join(args.index_dir, "face_metadata.json"))
+photos = load_photos()
+if not photos:
+    sys.exit(f"[ERROR] No photos found in {args.dataset}")
+truth = [uid for uid, _ in photos]
+print(f"[INFO] {len(photos)} photos of {len(set(truth))} uids, index of {faiss_index.ntotal} vectors.")
+
+reference = None
+print(f"{'profile':>9} | {'load s':>6} | {'det ms':>7} | {'emb ms':>7} | {'total ms':>8} | {'found':>6} | "
+      f"{'top-1 acc':>9} | {'cos vs ' + args.profiles[0]:>14}")
+for profile in args.profiles:
+    print(f"[INFO] {describe_profile(profile)}")
+    load_seconds, detect_ms, embed_ms, embeddings = run_profile(profile, photos)
+    found = [i for i, emb in enumerate(embeddings) if emb is not None]
+    correct = 0
+    if found:
+        scores, indices = search_batch(faiss_index, np.array([embeddings[i] for i in found], dtype="float32"), 4)
+        for i, top in zip(found, resolve_top_k(scores, indices, row_uids, 1)):
+            correct += bool(top) and top[0][1] >= args.threshold and top[0][0] == truth[i]
+    if reference is None:
+        reference = embeddings
+    shared = [i for i in found if reference[i] is not None]
+    agreement = np.mean([float(embeddings[i] @ reference[i]) for i in shared]) if shared else float("nan")
+    print(f"{profile:>9} | {load_seconds:>6.2f} | {detect_ms:>7.2f} | {embed_ms:>7.2f} | {detect_ms + embed_ms:>8.2f} | "
+          f"{len(found) / len(photos):>6.1%} | {correct / len(photos):>9.3f} | {agreement:>14.4f}")
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import argparse
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from prototypes import vectors_by_label, group_by_uid, build_prototype_index, load_row_uids, PrototypeSearcher
+
+# Prototype index vs. full flat index on the enrolled embeddings. Each uid's vectors are split
+# into enrollment and held-out queries; both indexes are built from the enrollment part only.
+
+parser = argparse.ArgumentParser(description="Prototype index benchmark")
+parser.add_argument("--index-dir", default="./faissIndex")
+parser.add_argument("--k", type=int, nargs="+", default=[0, 4, 8, 16])
+parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of each uid's vectors used as queries")
+parser.add_argument("--noise", type=float, default=0.02, help="Gaussian noise added to queries")
+parser.add_argument("--repeats", type=int, default=20)
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+full_index = faiss.read_index(os.path.join(args.index_dir, "face_index_cosine.faiss"))
+row_uids = load_row_uids(os.path.join(args.index_dir, "face_metadata.json"))
+labels, vectors = vectors_by_label(full_index)
+groups = group_by_uid(labels, vectors, row_uids)
+
+enrolled, queries, truth = {}, [], []
+for uid, group in groups.items():
+    order = rng.permutation(len(group))
+    n_test = max(1, int(len(group) * args.holdout))
+    enrolled[uid] = group[order[n_test:]]
+    queries.append(group[order[:n_test]])
+    truth += [uid] * n_test
+queries = np.vstack(queries)
+queries = queries + rng.normal(0, args.noise, queries.shape).astype("float32")
+truth = np.array(truth, dtype=object)
+
+flat = faiss.IndexFlatIP(512)
+flat_uids = np.concatenate([[uid] * len(group) for uid, group in enrolled.items()]).astype(object)
+flat.add(np.vstack(list(enrolled.values())))
+flat_searcher = PrototypeSearcher(flat, flat_uids)  # Single stage over every vector = plain flat search
+
+def evaluate(searcher):
+    searcher.match(queries[:8], 0.0)  # warm-up
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        matches = searcher.match(queries, 0.0)
+    per_query = (time.perf_counter() - start) / (args.repeats * len(queries)) * 1e6
+    predicted = np.array([uid for uid, _ in matches], dtype=object)
+    return predicted, per_query
+
+flat_pred, flat_us = evaluate(flat_searcher)
+print(f"[INFO] {len(queries)} held-out queries, {flat.ntotal} enrolled vectors, {len(enrolled)} uids.")
+print(f"{'index':>18} | {'vectors':>7} | {'size':>6} | {'us/query':>8} | {'top-1 acc':>9} | {'agrees w/ flat':>14}")
+print(f"{'flat':>18} | {flat.ntotal:>7} | {'100%':>6} | {flat_us:>8.1f} | {np.mean(flat_pred == truth):>9.3f} | {'-':>14}")
+for k in args.k:
+    index, metadata = build_prototype_index(enrolled, k=k)
+    proto_uids = np.array([meta["uid"] for meta in metadata.values()], dtype=object)
+    for rerank in (False, True):
+        searcher = PrototypeSearcher(index, proto_uids, enrolled if rerank else None)
+        pred, us = evaluate(searcher)
+        name = f"proto k={k}{' +rerank' if rerank else ''}"
+        size = f"{100 * index.ntotal / flat.ntotal:.1f}%"
+        print(f"{name:>18} | {index.ntotal:>7} | {size:>6} | {us:>8.1f} | {np.mean(pred == truth):>9.3f} | {np.mean(pred == flat_pred):>14.3f}")
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from utils import normalize
+from recognize import search_batch
+
+# Micro-benchmark: per-face FAISS search (as app.py used to do) vs. one batched search per frame.
+
+parser = argparse.ArgumentParser(description="Per-face vs batched FAISS search benchmark")
+parser.add_argument("--index", default="./faissIndex/face_index_cosine.faiss", help="FAISS index to query (synthetic if missing)")
+parser.add_argument("--synthetic", type=int, default=0, help="Use a synthetic flat index with this many vectors")
+parser.add_argument("--repeats", type=int, default=200, help="Frames timed per batch size")
+parser.add_argument("--top-k", type=int, default=1)
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+
+if args.synthetic or not os.path.exists(args.index):
+    n = args.synthetic or 10000
+    print(f"[INFO] Building synthetic IndexFlatIP with {n} vectors.")
+    base = rng.standard_normal((n, 512)).astype("float32")
+    faiss.normalize_L2(base)
+    index = faiss.IndexFlatIP(512)
+    index.add(base)
+else:
+    index = faiss.read_index(args.index)
+    print(f"[INFO] Loaded {args.index} ({index.ntotal} vectors).")
+
+def per_face(embeddings):
+    for embedding in embeddings:
+        index.search(normalize(embedding).reshape(1, -1), args.top_k)
+
+def batched(embeddings):
+    search_batch(index, embeddings, args.top_k)
+
+def time_frames(fn, embeddings):
+    fn(embeddings)  # warm-up
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        fn(embeddings)
+    return (time.perf_counter() - start) / args.repeats * 1000
+
+print(f"{'faces':>5} | {'per-face ms':>11} | {'batched ms':>10} | {'speedup':>7}")
+for n_faces in (1, 2, 4, 8, 12, 16, 24, 32):
+    embeddings = rng.standard_normal((n_faces, 512)).astype("float32")
+    t_single = time_frames(per_face, embeddings)
+    t_batch = time_frames(batched, embeddings)
+    print(f"{n_faces:>5} | {t_single:>11.3f} | {t_batch:>10.3f} | {t_single / t_batch:>6.2f}x")
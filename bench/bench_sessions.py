@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import uuid
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from utils import get_current_time
+from track import SessionStore
+
+# Attendance tracking benchmark: the old linear-scan dictionaries vs. SessionStore,
+# with thousands of identities present at the same time.
+
+parser = argparse.ArgumentParser(description="Session store benchmark")
+parser.add_argument("--identities", type=int, nargs="+", default=[100, 1000, 5000])
+parser.add_argument("--sightings", type=int, default=20000, help="Recognized faces replayed per run")
+args = parser.parse_args()
+
+def name_lookup(uid):
+    return f"Person {uid}"
+
+# The pre-SessionStore implementation, kept here as the baseline
+def review_dictionary_scan(dictionary, uid):
+    name = name_lookup(uid)
+    for track_id, details in dictionary.items():
+        if details['name'] == name:
+            return track_id, details
+    return None, None
+
+def add_to_dictionary_scan(dictionary, uid):
+    track_id = uuid.uuid4().hex[:8]
+    name = name_lookup(uid)
+    date, time_str = get_current_time()
+    if review_dictionary_scan(dictionary, uid)[0] is None:
+        dictionary[track_id] = {'uid': uid, 'name': name, 'date': date, 'time': time_str, 'last_seen': time_str}
+        return False, dictionary
+    existing_track_id, details = review_dictionary_scan(dictionary, uid)
+    dictionary[existing_track_id]['last_seen'] = time_str
+    return True, dictionary
+
+def run(add, container, sightings):
+    start = time.perf_counter()
+    for uid in sightings:
+        add(container, uid)
+    return (time.perf_counter() - start) / len(sightings) * 1e6
+
+rng = np.random.default_rng(0)
+print(f"{'identities':>10} | {'scan us/op':>10} | {'store us/op':>11} | {'speedup':>8}")
+for n in args.identities:
+    uids = [f"UID{i:06d}" for i in range(n)]
+    # Everyone arrives once, then random repeat sightings
+    sightings = uids + [uids[i] for i in rng.integers(0, n, args.sightings)]
+    t_scan = run(add_to_dictionary_scan, {}, sightings)
+    t_store = run(lambda store, uid: store.add(uid), SessionStore(name_lookup=name_lookup), sightings)
+    print(f"{n:>10} | {t_scan:>10.1f} | {t_store:>11.2f} | {t_scan / t_store:>7.0f}x")
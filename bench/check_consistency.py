@@ -0,0 +1,90 @@
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import http.client
+from urllib.parse import urlparse
+
+# Consistency check between the recognition entry points: the top-1 uid and score for one
+# photo must be the same from prep/infer.py (the reference single-image query), from
+# app/batch_recognize.py and, when --url is given, from app/service.py's /recognize.
+# A mismatch means one path feeds the model a different image than the index was built
+# with (e.g. RGB instead of cv2.imread's BGR).
+#
+#   python bench/check_consistency.py face.jpg
+#   python bench/check_consistency.py face.jpg --url http://127.0.0.1:8765
+#
+# Run from the repository root so every tool finds ./faissIndex. Exits 1 on a mismatch.
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+INFER_PROFILE = "accurate"  # prep/infer.py's MODEL_PROFILE
+SCORE_TOLERANCE = 1e-3
+
+def infer_top1(photo):
+    """(uid, score) printed first by prep/infer.py, or None if it found no match."""
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "prep", "infer.py")], input=photo + "\n",
+                            capture_output=True, text=True, check=True)
+    match = re.search(r"\[OUTPUT\] UID: (\S+) \| Score: ([-\d.]+)", result.stdout)
+    return (match.group(1), float(match.group(2))) if match else None
+
+def batch_top1(photo):
+    """(uid, score) of the first face app/batch_recognize.py reports for photo, or None."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "results.jsonl")
+        subprocess.run([sys.executable, os.path.join(ROOT, "app", "batch_recognize.py"), photo, "--output", output,
+                        "--model-profile", INFER_PROFILE, "--workers", "1"],
+                       capture_output=True, text=True, check=True)
+        with open(output, "r") as f:
+            record = json.loads(f.readline())
+    return first_match(record.get("faces", []))
+
+def service_top1(photo, url):
+    """(uid, score) of the first face a running app/service.py returns for photo from /recognize, or None."""
+    with open(photo, "rb") as f:
+        body = f.read()
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+    conn.request("POST", "/recognize?top_k=1", body=body, headers={"Content-Type": "application/octet-stream"})
+    response = conn.getresponse()
+    payload = json.loads(response.read())
+    conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"/recognize returned {response.status}: {payload.get('error')}")
+    return first_match(payload["faces"])
+
+def first_match(faces):
+    if not faces or not faces[0]["matches"]:
+        return None
+    top = faces[0]["matches"][0]
+    return top["uid"], top["score"]
+
+def same(reference, other):
+    if reference is None or other is None:
+        return reference is other
+    return reference[0] == other[0] and abs(reference[1] - other[1]) <= SCORE_TOLERANCE
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every recognition path agrees with prep/infer.py")
+    parser.add_argument("photo", help="Image with at least one enrolled face")
+    parser.add_argument("--url", default=None, help="Also check /recognize of a service started with "
+                        f"--model-profile {INFER_PROFILE}, e.g. http://127.0.0.1:8765")
+    args = parser.parse_args()
+
+    reference = infer_top1(args.photo)
+    print(f"[INFO] prep/infer.py: {reference}")
+    results = {"app/batch_recognize.py": batch_top1(args.photo)}
+    if args.url:
+        results["app/service.py /recognize"] = service_top1(args.photo, args.url)
+
+    mismatched = False
+    for name, result in results.items():
+        ok = same(reference, result)
+        mismatched |= not ok
+        print(f"[{'INFO' if ok else 'ERROR'}] {name}: {result}{'' if ok else ' (differs from prep/infer.py)'}")
+    sys.exit(1 if mismatched else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import http.client
+import numpy as np
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+# Load generator for app/service.py: N client threads, each on a keep-alive connection,
+# send requests back to back for a fixed time per concurrency level. Reports throughput,
+# p50/p95/p99 latency and the server's mean micro-batch size for every level.
+#
+#   python bench/load_service.py --url http://127.0.0.1:8765 --concurrency 1 4 16 64
+#   python bench/load_service.py --url unix:/tmp/face.sock --image face.jpg
+
+parser = argparse.ArgumentParser(description="Throughput / tail-latency load test for the recognition service")
+parser.add_argument("--url", default="http://127.0.0.1:8765", help="http://host:port or unix:/path/to.sock")
+parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+parser.add_argument("--image", default=None, help="Send this image to /recognize instead of embeddings to /search")
+parser.add_argument("--faces", type=int, default=1, help="Embeddings per /search request")
+parser.add_argument("--top-k", type=int, default=1)
+parser.add_argument("--index", default="./faissIndex/face_index_cosine.faiss",
+                    help="Draw query embeddings from this index (random if missing)")
+args = parser.parse_args()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+def connect():
+    if args.url.startswith("unix:"):
+        return UnixHTTPConnection(args.url[len("unix:"):])
+    url = urlparse(args.url)
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+
+def query_bank():
+    rng = np.random.default_rng(0)
+    if os.path.exists(args.index):
+        import faiss
+        from prototypes import vectors_by_label
+        _, vectors = vectors_by_label(faiss.read_index(args.index))
+        picks = vectors[rng.integers(0, len(vectors), 256)]
+        return picks + rng.normal(0, 0.5 / np.sqrt(picks.shape[1]), picks.shape).astype("float32")
+    return rng.standard_normal((256, 512)).astype("float32")
+
+if args.image:
+    with open(args.image, "rb") as f:
+        image_body = f.read()
+    bodies = [image_body]
+    path, content_type = f"/recognize?top_k={args.top_k}", "application/octet-stream"
+else:
+    bank = query_bank()
+    bodies = [json.dumps({"embeddings": bank[(i + np.arange(args.faces)) % len(bank)].tolist(), "top_k": args.top_k})
+              for i in range(0, len(bank), args.faces)]
+    path, content_type = "/search", "application/json"
+
+def server_stats():
+    conn = connect()
+    conn.request("GET", "/health")
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    return stats
+
+def client(latencies, errors, stop, offset):
+    conn = connect()
+    i = offset
+    while not stop.is_set():
+        body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = connect()
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+print(f"[INFO] {args.url}: {'image ' + args.image if args.image else f'{args.faces} embedding(s)'} per request, "
+      f"{args.duration:g}s per level.")
+print(f"{'clients':>8} | {'req/s':>9} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'batch':>6} | errors")
+for concurrency in args.concurrency:
+    before = server_stats()["batching"]
+    latencies, errors, stop = [], [], threading.Event()
+    threads = [threading.Thread(target=client, args=(latencies, errors, stop, i), daemon=True) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    after = server_stats()["batching"]
+
+    batches = after["batches"] - before["batches"]
+    mean_batch = (after["items"] - before["items"]) / batches if batches else 0.0
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    print(f"{concurrency:>8} | {len(latencies) / elapsed:>9.1f} | {np.percentile(ms, 50):>8.2f} | "
+          f"{np.percentile(ms, 95):>8.2f} | {np.percentile(ms, 99):>8.2f} | {mean_batch:>6.1f} | {len(errors)}")
@@ -0,0 +1,265 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import cv2
+import faiss
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+import faces as face_helpers
+from utils import normalize_batch, check_and_log_day_end
+from recognize import stack_embeddings, search_batch, resolve_matches, build_row_uids, recognize_faces
+from metadata_store import CompactMetadata, compact_prefix, compact_exists
+from prototypes import vectors_by_label
+from track import SessionStore, add_to_dictionary
+from tracker import FaceTracker
+from identity_cache import IdentityCache
+from multicam import CameraContext
+from overlay import OverlayRenderer
+from stub_model import StubFaceAnalysis, StubFace
+
+# Stage-level benchmark suite. Every stage of the recognition pipeline is timed in isolation
+# on CPU with synthetic inputs (or a recorded video), plus an end-to-end replay through the
+# same per-frame functions app.py calls. No camera, GPU or network is needed; --stub-model
+# replaces buffalo_l for machine-independent runs.
+#
+#   python bench/run_benchmarks.py --stub-model --output report.json
+#   python bench/run_benchmarks.py --stub-model --compare report.json   # flag regressions
+
+parser = argparse.ArgumentParser(description="Stage-level benchmark suite")
+parser.add_argument("--stub-model", action="store_true", help="Use the stub detector/recognizer instead of buffalo_l")
+parser.add_argument("--index-dir", default="./faissIndex", help="FAISS index to search (synthetic if missing)")
+parser.add_argument("--font", default="./helper/cambria.ttc")
+parser.add_argument("--video", default=None, help="Recorded video for the decode and end-to-end stages")
+parser.add_argument("--faces", type=int, default=4, help="Faces per frame")
+parser.add_argument("--repeats", type=int, default=50, help="Timed iterations per stage")
+parser.add_argument("--replay-frames", type=int, default=100, help="Frames in the end-to-end replay")
+parser.add_argument("--replay-track", action="store_true",
+                    help="Replay with a tracker and identity cache, as app.py --identity-cache does")
+parser.add_argument("--stages", nargs="+", default=None, help="Only run these stages")
+parser.add_argument("--output", default=None, help="Write the JSON report here")
+parser.add_argument("--compare", default=None, help="Baseline JSON report to compare against")
+parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before a stage is flagged")
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+
+def measure(fn, repeats=args.repeats, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples = np.array(samples)
+    return {
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "iterations": repeats,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BENCH_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+# --- Inputs ---
+def load_frames():
+    if args.video:
+        cap = cv2.VideoCapture(args.video)
+        frames = []
+        while len(frames) < args.replay_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if frames:
+            return frames
+        print(f"[WARNING] Could not read {args.video}; using synthetic frames.")
+    base = cv2.GaussianBlur((rng.random((1080, 1920, 3)) * 255).astype(np.uint8), (15, 15), 0)
+    return [np.roll(base, 4 * i, axis=1) for i in range(8)]
+
+def load_index():
+    index_path = os.path.join(args.index_dir, "face_index_cosine.faiss")
+    metadata_path = os.path.join(args.index_dir, "face_metadata.json")
+    if os.path.exists(index_path):
+        index = faiss.read_index(index_path)
+        prefix = compact_prefix(metadata_path)
+        if compact_exists(prefix):
+            row_uids = CompactMetadata(prefix)
+        else:
+            with open(metadata_path, "r") as f:
+                row_uids = build_row_uids(json.load(f))
+        _, bank = vectors_by_label(index)
+        return index, row_uids, bank, "faissIndex"
+    bank = rng.standard_normal((10000, 512)).astype("float32")
+    faiss.normalize_L2(bank)
+    index = faiss.IndexFlatIP(512)
+    index.add(bank)
+    row_uids = np.array([f"UID{i // 50:05d}" for i in range(len(bank))], dtype=object)
+    return index, row_uids, bank, "synthetic"
+
+def load_model(bank):
+    if args.stub_model:
+        face_helpers.Face = StubFace  # detect_faces would otherwise import insightface for its Face class
+        return StubFaceAnalysis(bank, n_faces=args.faces), "stub"
+    from insightface.app import FaceAnalysis
+    model = FaceAnalysis(name="buffalo_l", allowed_modules=["detection", "recognition"])
+    model.prepare(ctx_id=-1)
+    return model, "buffalo_l"
+
+frames = load_frames()
+index, row_uids, bank, index_source = load_index()
+model, model_name = load_model(bank)
+frame = frames[0]
+jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1]
+faces = model.get(frame)
+embeddings = stack_embeddings(faces) if faces else rng.standard_normal((args.faces, 512)).astype("float32")
+scores, labels = search_batch(index, embeddings, 1)
+matches = resolve_matches(scores, labels, row_uids, 0.5)
+detections = [(face.bbox.astype(int), uid, score, (0, 255, 0)) for face, (uid, score) in zip(faces, matches)]
+renderer = OverlayRenderer(args.font, font_size=24)
+
+# --- Stages ---
+def stage_decode():
+    cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+
+def stage_detection():
+    model.det_model.detect(frame, max_num=0, metric='default')
+
+def stage_embedding():
+    recognizer = model.models['recognition']
+    for face in faces:
+        recognizer.get(frame, face)
+
+def stage_normalize():
+    normalize_batch(embeddings)
+
+def stage_faiss_search():
+    index.search(np.ascontiguousarray(normalize_batch(embeddings), dtype="float32"), 1)
+
+def stage_metadata():
+    resolve_matches(scores, labels, row_uids, 0.5)
+
+session_uids = [f"UID{i:05d}" for i in range(2000)]
+session_store = SessionStore(name_lookup=lambda uid: uid)
+
+def stage_sessions():
+    for uid in rng.choice(session_uids, 16):
+        session_store.add(uid)
+
+def stage_overlay():
+    renderer.draw(frame.copy(), detections)
+
+log_dir = tempfile.TemporaryDirectory(prefix="bench_log_")
+day_store = SessionStore(name_lookup=lambda uid: uid)
+for uid in session_uids[:500]:
+    day_store.add(uid)
+
+def stage_csv_logging():
+    with contextlib.redirect_stdout(io.StringIO()):
+        check_and_log_day_end(day_store, SessionStore(), os.path.join(log_dir.name, "attendance_log.csv"))
+
+def stage_end_to_end():
+    # app.py's detect_frame / finish_frame path with one camera and detection on every frame
+    camera = CameraContext("bench")
+    if args.replay_track:
+        camera.tracker, camera.identity_cache = FaceTracker(), IdentityCache(min_score=0.6)
+    store = SessionStore(name_lookup=lambda uid: uid)
+    for i in range(args.replay_frames):
+        img = cv2.imdecode(jpeg, cv2.IMREAD_COLOR) if not args.video else frames[i % len(frames)].copy()
+        found = face_helpers.detect_faces(model, img)
+        tracks = camera.tracker.update(img, [face.bbox for face in found]) if camera.tracker else [None] * len(found)
+        matches = [None] * len(found)
+        if camera.identity_cache is not None:
+            matches = [camera.identity_cache.get(track.track_id, face.bbox) for face, track in zip(found, tracks)]
+        pending = [j for j, match in enumerate(matches) if match is None]
+        pending_faces = face_helpers.embed_faces(model, img, [found[j] for j in pending])
+        if pending_faces:
+            for j, match in zip(pending, recognize_faces(pending_faces, index, row_uids, 1, 0.5)):
+                matches[j] = match
+                if camera.identity_cache is not None:
+                    camera.identity_cache.put(tracks[j].track_id, match[0], match[1], found[j].bbox)
+        detections = []
+        for face, track, (uid, score) in zip(found, tracks, matches):
+            if uid != "Unknown":
+                add_to_dictionary(store, uid, camera.session_key(track), camera.camera_id)
+            detections.append((face.bbox.astype(int), uid, score if uid != "Unknown" else None,
+                               (0, 255, 0) if uid != "Unknown" else (0, 0, 255)))
+        renderer.draw(img, detections)
+
+STAGES = {
+    "frame_decode": (stage_decode, args.repeats),
+    "detection": (stage_detection, args.repeats),
+    "embedding": (stage_embedding, args.repeats),
+    "normalize": (stage_normalize, args.repeats * 10),
+    "faiss_search": (stage_faiss_search, args.repeats * 10),
+    "metadata_resolve": (stage_metadata, args.repeats * 10),
+    "session_updates": (stage_sessions, args.repeats * 10),
+    "overlay_render": (stage_overlay, args.repeats),
+    "csv_logging": (stage_csv_logging, max(5, args.repeats // 10)),
+    "end_to_end_replay": (stage_end_to_end, 3),
+}
+
+report = {
+    "meta": {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "faiss": faiss.__version__,
+        "opencv": cv2.__version__,
+        "model": model_name,
+        "index": f"{index_source} ({index.ntotal} vectors)",
+        "faces_per_frame": len(faces),
+        "frame_shape": list(frame.shape),
+    },
+    "stages": {},
+}
+
+for name, (fn, repeats) in STAGES.items():
+    if args.stages and name not in args.stages:
+        continue
+    result = measure(fn, repeats=repeats, warmup=1 if name == "end_to_end_replay" else 3)
+    if name == "end_to_end_replay":
+        result["fps"] = round(args.replay_frames / (result["mean_ms"] / 1000), 2)
+    report["stages"][name] = result
+    print(f"{name:>18} | mean {result['mean_ms']:>9.3f} ms | p50 {result['p50_ms']:>9.3f} ms | p95 {result['p95_ms']:>9.3f} ms")
+log_dir.cleanup()
+
+if args.output:
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"[INFO] Report written to {args.output}")
+
+if args.compare:
+    with open(args.compare, "r") as f:
+        baseline = json.load(f)
+    print(f"\n[INFO] Compared with {args.compare} (commit {baseline['meta'].get('commit')}):")
+    regressions = []
+    for name, result in report["stages"].items():
+        old = baseline["stages"].get(name)
+        if old is None:
+            continue
+        change = result["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] > 0 else 0.0
+        flag = "REGRESSION" if change > args.tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:>18} | {old['p50_ms']:>9.3f} -> {result['p50_ms']:>9.3f} ms p50 ({change:+.1%}) {flag}")
+    if regressions:
+        print(f"[ERROR] {len(regressions)} stage(s) slower than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,70 @@
+import zlib
+import numpy as np
+
+# Machine-independent stand-in for insightface's FaceAnalysis, for benchmarks that must run
+# without model files. It mimics the parts of the API the app uses: det_model.detect(),
+# models['recognition'].get() and get(). Detection returns a fixed grid of boxes, and
+# embeddings are taken from a given bank of vectors (e.g. the FAISS index) so searches
+# find real matches.
+
+class StubFace(dict):
+    """Attribute-style dict like insightface.app.common.Face."""
+
+    def __getattr__(self, name):
+        return self.get(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class StubDetector:
+    def __init__(self, n_faces=4, box_size=160):
+        self.n_faces = n_faces
+        self.box_size = box_size
+
+    def detect(self, img, max_num=0, metric='default'):
+        h, w = img.shape[:2]
+        n = self.n_faces if max_num == 0 else min(self.n_faces, max_num)
+        cols = max(1, int(np.ceil(np.sqrt(n))))
+        bboxes = np.zeros((n, 5), dtype="float32")
+        kpss = np.zeros((n, 5, 2), dtype="float32")
+        for i in range(n):
+            x = (i % cols + 0.5) * w / cols - self.box_size / 2
+            y = (i // cols + 0.5) * h / cols - self.box_size / 2
+            bboxes[i] = (x, y, x + self.box_size, y + self.box_size, 0.9)
+            kpss[i] = [(x + 0.3 * self.box_size, y + 0.4 * self.box_size), (x + 0.7 * self.box_size, y + 0.4 * self.box_size),
+                       (x + 0.5 * self.box_size, y + 0.6 * self.box_size), (x + 0.35 * self.box_size, y + 0.8 * self.box_size),
+                       (x + 0.65 * self.box_size, y + 0.8 * self.box_size)]
+        return bboxes, kpss
+
+
+class StubRecognizer:
+    def __init__(self, bank, noise=0.05, seed=0):
+        self.bank = bank
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+    def get(self, img, face):
+        # Pick a bank vector from the face position, so the same box maps to the same identity
+        key = zlib.crc32(np.asarray(face.bbox[:2], dtype="int32").tobytes())
+        vector = self.bank[key % len(self.bank)]
+        face.embedding = (vector + self.noise * self.rng.standard_normal(vector.shape)).astype("float32")
+        return face.embedding
+
+
+class StubFaceAnalysis:
+    def __init__(self, bank, n_faces=4):
+        self.det_model = StubDetector(n_faces)
+        self.models = {'detection': self.det_model, 'recognition': StubRecognizer(bank)}
+
+    def prepare(self, ctx_id=0, det_size=(640, 640)):
+        pass
+
+    def get(self, img, max_num=0):
+        bboxes, kpss = self.det_model.detect(img, max_num=max_num)
+        faces = []
+        for i in range(len(bboxes)):
+            face = StubFace(bbox=bboxes[i, :4], kps=kpss[i], det_score=bboxes[i, 4])
+            self.models['recognition'].get(img, face)
+            faces.append(face)
+        return faces
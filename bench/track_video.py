@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from tracker import FaceTracker, DetectionScheduler, iou_matrix
+
+# Replays a recorded video through the detect-every-N tracker, without a camera.
+# With --evaluate the detector also runs on every tracked frame to measure how far
+# propagated boxes drift from a fresh detection.
+
+parser = argparse.ArgumentParser(description="Replay a video through the face tracker")
+parser.add_argument("video", help="Path to a recorded video file")
+parser.add_argument("--detect-every", type=int, default=5)
+parser.add_argument("--adaptive", action="store_true")
+parser.add_argument("--target-fps", type=float, default=15.0)
+parser.add_argument("--no-flow", action="store_true", help="Hold boxes in place instead of optical flow")
+parser.add_argument("--evaluate", action="store_true", help="Compare tracked boxes with per-frame detections")
+parser.add_argument("--verbose", action="store_true", help="Print the tracks of every frame")
+args = parser.parse_args()
+
+from insightface.app import FaceAnalysis
+model = FaceAnalysis(name="buffalo_l", allowed_modules=["detection"])
+model.prepare(ctx_id=-1)
+
+def detect(frame):
+    return [face.bbox for face in model.get(frame)]
+
+cap = cv2.VideoCapture(args.video)
+if not cap.isOpened():
+    raise IOError(f"[ERROR] Cannot open video: {args.video}")
+
+tracker = FaceTracker(use_flow=not args.no_flow)
+scheduler = DetectionScheduler(every=args.detect_every, adaptive=args.adaptive,
+                               target_frame_time=1.0 / args.target_fps)
+frame_no = 0
+drift = []
+misses = 0
+
+while True:
+    ret, frame = cap.read()
+    if not ret:
+        break
+
+    start = time.perf_counter()
+    if scheduler.should_detect(force=tracker.lost):
+        boxes = detect(frame)
+        tracks = tracker.update(frame, boxes, [None] * len(boxes))
+        scheduler.record(time.perf_counter() - start, detected=True)
+    else:
+        tracks = tracker.predict(frame)
+        scheduler.record(time.perf_counter() - start, detected=False)
+        if args.evaluate:
+            truth = detect(frame)
+            if len(truth) and tracks:
+                drift.extend(iou_matrix([t.bbox for t in tracks], truth).max(axis=1).tolist())
+            misses += abs(len(truth) - len(tracks))
+
+    if args.verbose:
+        print(frame_no, [(t.track_id, t.bbox.astype(int).tolist()) for t in tracks])
+    frame_no += 1
+
+cap.release()
+print(f"[INFO] Frames: {frame_no}")
+print(f"[INFO] Scheduler: {scheduler.stats()}")
+if args.evaluate:
+    mean_iou = float(np.mean(drift)) if drift else float("nan")
+    print(f"[INFO] Mean IoU of tracked vs detected boxes: {mean_iou:.3f}, face count mismatches: {misses}")
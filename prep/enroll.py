@@ -0,0 +1,213 @@
+import os
+import json
+import argparse
+import cv2
+import faiss
+import numpy as np
+from glob import glob
+from train import (INDEX_NAME, METADATA_NAME, DIMENSION, EmbeddingCache, cache_namespace, read_file,
+                   load_model, extract_embedding, normalize, atomic_write)
+from metadata_store import write_compact, compact_prefix
+from prototypes import prototypes_exist, update_prototypes
+from utils import normalize_batch
+from profiles import PROFILES, DEFAULT_PROFILE
+
+# Adds or removes one identity in the FAISS index in place, without rebuilding from the dataset.
+#
+#   python prep/enroll.py add TNU2020021100004 path/to/photos/ [--replace]
+#   python prep/enroll.py remove TNU2020021100004
+#   python prep/enroll.py list
+
+class FaceIndexStore:
+    """
+    The FAISS index and its metadata, addressed by stable int64 ids.
+
+    The index carries ids (IndexIDMap2 or IVF, see app/index_spec.py), so
+    vectors keep their id when others are removed, and metadata is keyed by
+    that id. Indexes written by older versions of prep/train.py (plain
+    IndexFlatIP, UUID-keyed metadata) are migrated on load: each vector's id
+    becomes its current row position. HNSW indexes cannot remove vectors.
+
+    If a prototype index (app/prototypes.py) sits next to the index, save()
+    also refreshes the prototypes of every uid added or removed since the
+    last save.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.index_path = os.path.join(index_dir, INDEX_NAME)
+        self.metadata_path = os.path.join(index_dir, METADATA_NAME)
+
+        if os.path.exists(self.index_path):
+            self.index = faiss.read_index(self.index_path)
+            with open(self.metadata_path, "r") as f:
+                self.metadata = json.load(f)
+        else:
+            os.makedirs(index_dir, exist_ok=True)
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIMENSION))
+            self.metadata = {}
+
+        if isinstance(self.index, faiss.IndexFlat):
+            self._migrate()
+
+        self.uid_ids = {}
+        for vector_id, meta in self.metadata.items():
+            self.uid_ids.setdefault(meta["uid"], []).append(int(vector_id))
+        self.next_id = max((int(k) for k in self.metadata), default=-1) + 1
+        self.touched = set()  # uids whose vectors changed since the last save
+
+    def _migrate(self):
+        print("[INFO] Migrating positional index to stable ids.")
+        ntotal = self.index.ntotal
+        vectors = self.index.reconstruct_n(0, ntotal) if ntotal else np.empty((0, DIMENSION), dtype="float32")
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIMENSION))
+        if ntotal:
+            index.add_with_ids(vectors, np.arange(ntotal, dtype="int64"))
+        self.index = index
+        self.metadata = {str(i): meta for i, meta in enumerate(self.metadata.values())}
+
+    def uids(self):
+        return {uid: len(ids) for uid, ids in self.uid_ids.items()}
+
+    def add(self, uid, embeddings, items):
+        """
+        args:
+            uid (str): Identity the vectors belong to.
+            embeddings (np.ndarray): (n, 512) raw embeddings.
+            items (list): One {'image_name', 'path'} dict per embedding.
+        returns:
+            np.ndarray: The int64 ids assigned to the new vectors.
+        """
+        vectors = np.array([normalize(e) for e in embeddings], dtype="float32").reshape(-1, DIMENSION)
+        ids = np.arange(self.next_id, self.next_id + len(vectors), dtype="int64")
+        if len(vectors):
+            self.index.add_with_ids(vectors, ids)
+        for vector_id, item in zip(ids.tolist(), items):
+            self.metadata[str(vector_id)] = {"uid": uid, "image_name": item["image_name"], "path": item["path"]}
+        self.uid_ids.setdefault(uid, []).extend(ids.tolist())
+        self.next_id += len(vectors)
+        self.touched.add(uid)
+        return ids
+
+    def remove(self, uid):
+        """Remove every vector of uid; returns how many were removed."""
+        ids = self.uid_ids.pop(uid, [])
+        if ids:
+            try:
+                self.index.remove_ids(np.array(ids, dtype="int64"))
+            except RuntimeError as e:
+                self.uid_ids[uid] = ids
+                raise RuntimeError(f"[ERROR] This index type does not support removal; rebuild with prep/train.py. {e}")
+            for vector_id in ids:
+                del self.metadata[str(vector_id)]
+            self.touched.add(uid)
+        return len(ids)
+
+    def vectors(self, uid):
+        """(n, 512) normalized vectors of uid, reconstructed from the index (approximate for PQ)."""
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)  # IVF can only reconstruct by id with a direct map
+        ids = self.uid_ids.get(uid, [])
+        return normalize_batch(np.vstack([self.index.reconstruct(vector_id) for vector_id in ids]).astype("float32"))
+
+    def save(self):
+        """Persist the index, the JSON metadata and its compact runtime form, each replaced atomically."""
+        atomic_write(self.index_path, lambda path: faiss.write_index(self.index, path))
+
+        def write_metadata(path):
+            with open(path, "w") as f:
+                json.dump(self.metadata, f, indent=4)
+        atomic_write(self.metadata_path, write_metadata)
+        write_compact(self.metadata, compact_prefix(self.metadata_path))
+        self._refresh_prototypes()
+
+    def _refresh_prototypes(self):
+        if self.touched and prototypes_exist(self.index_dir):
+            groups = {uid: self.vectors(uid) for uid in self.touched if self.uid_ids.get(uid)}
+            total = update_prototypes(self.index_dir, groups, removed=self.touched - set(groups))
+            print(f"[INFO] Refreshed the prototypes of {len(self.touched)} uids ({total} prototypes).")
+        self.touched.clear()
+
+def collect_images(paths):
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(sorted(glob(os.path.join(path, "*.jpg"))))
+        else:
+            images.append(path)
+    return images
+
+def embed_images(image_paths, ctx_id, cache=None, profile=DEFAULT_PROFILE, pack="buffalo_l"):
+    app = None
+    embeddings, items = [], []
+    for path in image_paths:
+        key, data = read_file(path)
+        embedding = cache.get(key) if cache is not None else None
+        if embedding is None:
+            if app is None:
+                app = load_model(ctx_id, profile, pack=pack)
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            embedding = extract_embedding(app, img) if img is not None else None
+            if cache is not None:
+                cache.put(key, embedding)
+        elif not embedding.size:
+            embedding = None
+        if embedding is None:
+            print(f"[ERROR] No face detected in {path}")
+            continue
+        embeddings.append(embedding)
+        items.append({"image_name": os.path.basename(path), "path": path})
+    return embeddings, items
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll or remove one identity in the FAISS index")
+    parser.add_argument("--index-dir", default="./faissIndex", help="Directory holding the index and metadata")
+    parser.add_argument("--cache-dir", default="./faissIndex/embedding_cache", help="Embedding cache shared with train.py")
+    parser.add_argument("--ctx-id", type=int, default=0, help="InsightFace context: 0 for GPU, -1 for CPU")
+    parser.add_argument("--model-profile", choices=list(PROFILES), default=DEFAULT_PROFILE,
+                        help="Face model profile; use the one the index was built with")
+    parser.add_argument("--model-pack", default="buffalo_l", help="InsightFace model pack; use the one the index was built with")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = commands.add_parser("add", help="Add images of one uid")
+    add_parser.add_argument("uid")
+    add_parser.add_argument("images", nargs="+", help="Image files and/or directories of .jpg files")
+    add_parser.add_argument("--replace", action="store_true", help="Remove the uid's existing vectors first")
+
+    remove_parser = commands.add_parser("remove", help="Remove every vector of one uid")
+    remove_parser.add_argument("uid")
+
+    commands.add_parser("list", help="List enrolled uids and their vector counts")
+    args = parser.parse_args()
+
+    store = FaceIndexStore(args.index_dir)
+
+    if args.command == "list":
+        for uid, count in sorted(store.uids().items()):
+            print(f"{uid}\t{count}")
+        return
+
+    if args.command == "remove":
+        removed = store.remove(args.uid)
+        if not removed:
+            print(f"[ERROR] UID {args.uid} is not enrolled.")
+            return
+        store.save()
+        print(f"[INFO] Removed {removed} vectors for {args.uid}.")
+        return
+
+    image_paths = collect_images(args.images)
+    cache = EmbeddingCache(args.cache_dir, namespace=cache_namespace(args.model_profile, args.model_pack))
+    embeddings, items = embed_images(image_paths, args.ctx_id, cache, args.model_profile, args.model_pack)
+    if not embeddings:
+        print(f"[ERROR] No usable faces found for {args.uid}; index unchanged.")
+        return
+    if args.replace:
+        print(f"[INFO] Removed {store.remove(args.uid)} existing vectors for {args.uid}.")
+    store.add(args.uid, embeddings, items)
+    store.save()
+    print(f"[INFO] Enrolled {len(embeddings)} vectors for {args.uid} ({store.index.ntotal} in index).")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,36 @@
 import os
+import sys
 import cv2
-import matplotlib.pyplot as plt
-from insightface.app import FaceAnalysis
-from pinecone import Pinecone
-from dotenv import load_dotenv
+import faiss
 
-load_dotenv()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from profiles import load_face_model, describe_profile
+from faces import get_faces
+from recognize import search_batch, resolve_top_k
+from prototypes import load_row_uids
+from index_spec import load_params, apply_search_params
+
+# Queries the local FAISS index built by prep/train.py with one image.
 
 query = input("[INPUT] Enter query image path: ")
 
 QUERY_IMAGE_PATH = query
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_REGION = "us-east-1"
-INDEX_NAME = "aiml-da-face-embeds"
+INDEX_PATH = "./faissIndex/face_index_cosine.faiss"
+METADATA_PATH = "./faissIndex/face_metadata.json"
 TOP_K = 5  # Number of top results to return
+MODEL_PROFILE = "accurate"  # See app/profiles.py
+
+if not os.path.exists(INDEX_PATH):
+    print(f"[ERROR] {INDEX_PATH} not found. Build it with: python prep/train.py --dataset <dir>")
+    exit(1)
 
-print("[INFO] Loading face embedding model.")
-app = FaceAnalysis(name="buffalo_l")
-app.prepare(ctx_id=0)  # GPU: 0, CPU: -1
+print(f"[INFO] Loading face embedding model: {describe_profile(MODEL_PROFILE)}.")
+app = load_face_model(MODEL_PROFILE, ctx_id=0)  # GPU: 0, CPU: -1
 print("[INFO] Model loaded.")
 
 def extract_embedding(image_path):
     img = cv2.imread(image_path)
-    faces = app.get(img)
+    faces = get_faces(app, img)
     if not faces:
         raise ValueError("[ERROR] No face detected in query image.")
     return faces[0].embedding, img
@@ -34,21 +42,18 @@ except ValueError as e:
     exit(1)
 print(query_embedding.shape, query_img.shape)
 
-print("[INFO] Connecting to Pinecone.")
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(INDEX_NAME)
+print("[INFO] Loading FAISS index and metadata.")
+index = faiss.read_index(INDEX_PATH)
+apply_search_params(index, load_params(INDEX_PATH))
+row_uids = load_row_uids(METADATA_PATH)
 
-print("[INFO] Querying Pinecone for nearest neighbors.")
-results = index.query(
-    vector=query_embedding.tolist(),
-    top_k=TOP_K,
-    include_metadata=True
-)
+print("[INFO] Querying FAISS for nearest neighbors.")
+scores, indices = search_batch(index, query_embedding[None], TOP_K * 4)  # Extra depth for distinct uids
+matches = resolve_top_k(scores, indices, row_uids, TOP_K)[0]
 
 print("\n[OUTPUT] Top matches:")
-if not results.matches:
-    print("[ERROR ]No matches found.")
+if not matches:
+    print("[ERROR] No matches found.")
 else:
-    for match in results.matches:
-        metadata = match.metadata
-        print(f"[OUTPUT] UID: {metadata['uid']} | Image: {metadata['image_name']} | Score: {match.score:.4f}")
\ No newline at end of file
+    for uid, score in matches:
+        print(f"[OUTPUT] UID: {uid} | Score: {score:.4f}")
@@ -0,0 +1,339 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import cv2
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from train import collect_image_paths, normalize
+from profiles import load_face_model
+from faces import detect_faces
+from recognize import search_batch, resolve_top_k
+from prototypes import load_row_uids
+from metadata_store import labels_of
+from index_spec import load_params, apply_search_params
+
+# Builds a quantized copy of the buffalo_l model pack for CPU-only machines and checks it
+# against the float models before installing it.
+#
+#   python prep/quantize.py --dataset /path/to/train --mode static
+#   python app/app.py --model-pack buffalo_l_int8
+#
+# Modes:
+#   dynamic  INT8 weights, activations quantized at run time (no calibration needed); the
+#            resulting ConvInteger ops are often no faster than float32 on CPU
+#   static   INT8 weights and activations (QDQ, per-channel), calibrated on photos from the
+#            enrollment dataset train.py reads
+#   fp16     float16 weights with float32 inputs/outputs; halves the files, not a CPU speedup
+#
+# The detection and recognition models are quantized; the other files of the pack are
+# copied unchanged so every profile keeps working. The pack is written next to the source
+# pack (<root>/models/<name>) and installed only if, on the verification photos,
+#   - the mean cosine between float and quantized embeddings of the same aligned crops is
+#     at least --min-cosine, and
+#   - top-1 identity accuracy against the FAISS index, with the quantized detector and
+#     recognizer end to end, is at most --max-top1-drop below the float models'.
+# Verification photos come from --holdout, photos that are not in the index. Without it they
+# are drawn from --dataset and scored leave-one-out: each photo's own vectors are excluded
+# from its search, otherwise top-1 would mostly be the photo matching itself.
+# The measured agreement, accuracy and speedups are saved as quantization.json in the pack.
+
+REPORT_NAME = "quantization.json"
+
+# -------------------------------------
+# Calibration data (static mode)
+# -------------------------------------
+def detector_blob(det_model, img, det_size):
+    """Letterbox and normalize img exactly as SCRFD.detect does."""
+    width, height = det_size
+    if img.shape[0] / img.shape[1] > height / width:
+        new_h, new_w = height, int(height * img.shape[1] / img.shape[0])
+    else:
+        new_w, new_h = width, int(width * img.shape[0] / img.shape[1])
+    det_img = np.zeros((height, width, 3), dtype=np.uint8)
+    det_img[:new_h, :new_w] = cv2.resize(img, (new_w, new_h))
+    return cv2.dnn.blobFromImage(det_img, 1.0 / det_model.input_std, det_size,
+                                 (det_model.input_mean,) * 3, swapRB=True)
+
+def recognizer_blob(rec_model, crop):
+    return cv2.dnn.blobFromImage(crop, 1.0 / rec_model.input_std, rec_model.input_size,
+                                 (rec_model.input_mean,) * 3, swapRB=True)
+
+def align(rec_model, img, face):
+    from insightface.utils import face_align
+
+    return face_align.norm_crop(img, landmark=face.kps, image_size=rec_model.input_size[0])
+
+def best_face(facemodel, img):
+    faces = detect_faces(facemodel, img)
+    return max(faces, key=lambda face: face.det_score) if faces else None
+
+def calibration_blobs(facemodel, paths, det_size):
+    """returns: (detector blobs, recognizer blobs) for the calibration photos."""
+    det_model, rec_model = facemodel.models["detection"], facemodel.models["recognition"]
+    det_blobs, rec_blobs = [], []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        det_blobs.append(detector_blob(det_model, img, det_size))
+        face = best_face(facemodel, img)
+        if face is not None:
+            rec_blobs.append(recognizer_blob(rec_model, align(rec_model, img, face)))
+    return det_blobs, rec_blobs
+
+def blob_reader(input_name, blobs):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class BlobReader(CalibrationDataReader):
+        def __init__(self):
+            self.items = iter(blobs)
+
+        def get_next(self):
+            blob = next(self.items, None)
+            return None if blob is None else {input_name: blob}
+
+    return BlobReader()
+
+# -------------------------------------
+# Quantization
+# -------------------------------------
+def quantize_model(src, dst, mode, blobs=None, calibration="minmax"):
+    import onnxruntime as ort
+    from onnxruntime.quantization import (quantize_dynamic, quantize_static, QuantType, QuantFormat,
+                                          CalibrationMethod)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if mode == "fp16":
+        import onnx
+        from onnxconverter_common import float16
+
+        model = float16.convert_float_to_float16(onnx.load(src), keep_io_types=True)
+        onnx.save(model, dst)
+        return
+
+    prepared = dst + ".pre.onnx"
+    try:
+        quant_pre_process(src, prepared, skip_symbolic_shape=True)
+    except Exception as e:
+        print(f"[WARNING] Pre-processing {os.path.basename(src)} failed ({e}); quantizing it as is.")
+        shutil.copyfile(src, prepared)
+    try:
+        if mode == "dynamic":
+            # ConvInteger on the CPU provider only takes unsigned 8-bit weights
+            quantize_dynamic(prepared, dst, weight_type=QuantType.QUInt8)
+        else:
+            input_name = ort.InferenceSession(src, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+            methods = {"minmax": CalibrationMethod.MinMax, "entropy": CalibrationMethod.Entropy,
+                       "percentile": CalibrationMethod.Percentile}
+            quantize_static(prepared, dst, blob_reader(input_name, blobs), quant_format=QuantFormat.QDQ,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                            per_channel=True, calibrate_method=methods[calibration])
+    finally:
+        if os.path.exists(prepared):
+            os.remove(prepared)
+
+# -------------------------------------
+# Accuracy gate and speedup
+# -------------------------------------
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def own_labels(metadata_path):
+    """(uid, image_name) -> FAISS labels of that photo in the index, for leave-one-out scoring."""
+    with open(metadata_path, "r") as f:
+        metadata = json.load(f)
+    labels = {}
+    for label, meta in zip(labels_of(metadata), metadata.values()):
+        labels.setdefault((meta["uid"], meta["image_name"]), []).append(label)
+    return labels
+
+def evaluate(float_model, quant_model, items, faiss_index, row_uids, threshold, exclude=None):
+    """
+    args:
+        items (list): {"uid", "path", "image_name"} dicts of verification photos.
+        exclude (dict): Output of own_labels; each photo's own vectors are left out of its
+            search. None when the photos are not in the index.
+    returns:
+        dict: cosine agreement, top-1 accuracy of both pipelines and per-stage timings.
+    """
+    float_rec, quant_rec = float_model.models["recognition"], quant_model.models["recognition"]
+    cosines, labels, excluded, float_embs, quant_embs = [], [], [], [], []
+    times = {"float_detection": 0.0, "quant_detection": 0.0, "float_recognition": 0.0, "quant_recognition": 0.0}
+    images = crops = 0
+    for item in items:
+        img = cv2.imread(item["path"])
+        if img is None:
+            continue
+        images += 1
+        face, seconds = timed(best_face, float_model, img)
+        times["float_detection"] += seconds
+        quant_face, seconds = timed(best_face, quant_model, img)
+        times["quant_detection"] += seconds
+        if face is None:
+            continue  # Not usable for either pipeline
+
+        crop = align(float_rec, img, face)
+        float_emb, seconds = timed(float_rec.get_feat, crop)
+        times["float_recognition"] += seconds
+        same_crop_emb, seconds = timed(quant_rec.get_feat, crop)
+        times["quant_recognition"] += seconds
+        crops += 1
+        cosines.append(float(normalize(float_emb.ravel()) @ normalize(same_crop_emb.ravel())))
+
+        labels.append(item["uid"])
+        excluded.append(exclude.get((item["uid"], item["image_name"]), []) if exclude else [])
+        float_embs.append(normalize(float_emb.ravel()))
+        if quant_face is None:
+            quant_embs.append(None)
+        else:
+            quant_embs.append(normalize(quant_rec.get_feat(align(quant_rec, img, quant_face)).ravel()))
+
+    def top1_accuracy(embeddings):
+        found = [i for i, emb in enumerate(embeddings) if emb is not None]
+        if not found:
+            return 0.0, [None] * len(embeddings)
+        depth = 4 + max((len(excluded[i]) for i in found), default=0)
+        scores, indices = search_batch(faiss_index, np.array([embeddings[i] for i in found], dtype="float32"), depth)
+        for row, i in enumerate(found):
+            indices[row, np.isin(indices[row], excluded[i])] = -1  # Leave-one-out: skipped like empty results
+        predicted = [None] * len(embeddings)
+        for i, top in zip(found, resolve_top_k(scores, indices, row_uids, 1)):
+            if top and top[0][1] >= threshold:
+                predicted[i] = top[0][0]
+        return float(np.mean([p == uid for p, uid in zip(predicted, labels)])) if labels else 0.0, predicted
+
+    float_acc, float_pred = top1_accuracy(float_embs)
+    quant_acc, quant_pred = top1_accuracy(quant_embs)
+    return {
+        "images": images,
+        "faces": crops,
+        "cosine_mean": float(np.mean(cosines)) if cosines else 0.0,
+        "cosine_min": float(np.min(cosines)) if cosines else 0.0,
+        "top1_float": float_acc,
+        "top1_quantized": quant_acc,
+        "top1_agreement": float(np.mean([f == q for f, q in zip(float_pred, quant_pred)])) if labels else 0.0,
+        "detection_ms": {"float": times["float_detection"] / max(images, 1) * 1000,
+                         "quantized": times["quant_detection"] / max(images, 1) * 1000},
+        "recognition_ms": {"float": times["float_recognition"] / max(crops, 1) * 1000,
+                           "quantized": times["quant_recognition"] / max(crops, 1) * 1000},
+    }
+
+def speedup(timing):
+    return timing["float"] / timing["quantized"] if timing["quantized"] else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the buffalo_l detection and recognition models")
+    parser.add_argument("--dataset", default=os.getenv("FACE_DATASET_DIR"),
+                        help="Enrollment dataset laid out as <uid>/*.jpg (default: $FACE_DATASET_DIR)")
+    parser.add_argument("--mode", choices=["dynamic", "static", "fp16"], default="static")
+    parser.add_argument("--models", nargs="+", choices=["detection", "recognition"], default=["detection", "recognition"])
+    parser.add_argument("--source-pack", default="buffalo_l", help="Float model pack under <root>/models/")
+    parser.add_argument("--output-pack", default=None, help="Quantized pack name (default: <source>_<mode>)")
+    parser.add_argument("--root", default="~/.insightface", help="InsightFace model root")
+    parser.add_argument("--calibration-images", type=int, default=200, help="Photos used to calibrate static mode")
+    parser.add_argument("--calibration", choices=["minmax", "entropy", "percentile"], default="minmax")
+    parser.add_argument("--holdout", default=None,
+                        help="Photos laid out as <uid>/*.jpg that are not in the index, for the accuracy gate "
+                             "(default: --dataset photos, scored leave-one-out)")
+    parser.add_argument("--verify-images", type=int, default=300, help="Photos used for the accuracy gate")
+    parser.add_argument("--det-size", type=int, default=640, help="Detector input size used for calibration")
+    parser.add_argument("--index", default="./faissIndex/face_index_cosine.faiss")
+    parser.add_argument("--metadata", default="./faissIndex/face_metadata.json")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Minimum similarity for a top-1 match")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Minimum mean float/quantized embedding cosine")
+    parser.add_argument("--max-top1-drop", type=float, default=0.01, help="Largest allowed top-1 accuracy loss")
+    parser.add_argument("--keep-failed", action="store_true", help="Install the pack even if the gate fails")
+    args = parser.parse_args()
+
+    if not args.dataset or not os.path.isdir(args.dataset):
+        parser.error("a dataset directory is required (--dataset or $FACE_DATASET_DIR)")
+    models_dir = os.path.join(os.path.expanduser(args.root), "models")
+    source_dir = os.path.join(models_dir, args.source_pack)
+    output_pack = args.output_pack or f"{args.source_pack}_{'int8' if args.mode != 'fp16' else 'fp16'}"
+    output_dir = os.path.join(models_dir, output_pack)
+    staging_pack = output_pack + ".partial"
+    staging_dir = os.path.join(models_dir, staging_pack)
+
+    items = collect_image_paths(args.dataset)
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(items))
+    calibration_items = [items[i] for i in order[:args.calibration_images]]
+    if args.holdout:
+        holdout = collect_image_paths(args.holdout)
+        verify_items = [holdout[i] for i in rng.permutation(len(holdout))[:args.verify_images]]
+    else:
+        verify_items = [items[i] for i in order[args.calibration_images:args.calibration_images + args.verify_images]]
+        if not verify_items:
+            verify_items = calibration_items  # Small dataset: verify on what is there
+            print("[WARNING] Dataset too small for a separate verification set; verifying on the calibration photos.")
+
+    print(f"[INFO] Loading float models from {source_dir}.")
+    det_size = (args.det_size, args.det_size)
+    float_model = load_face_model("accurate", ctx_id=-1, name=args.source_pack, root=args.root)
+    files = {task: float_model.models[task].model_file for task in args.models}
+
+    det_blobs = rec_blobs = None
+    if args.mode == "static":
+        print(f"[INFO] Preparing calibration data from {len(calibration_items)} photos.")
+        det_blobs, rec_blobs = calibration_blobs(float_model, [item["path"] for item in calibration_items], det_size)
+        print(f"[INFO] {len(det_blobs)} detector and {len(rec_blobs)} recognizer calibration inputs.")
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    quantized_names = {os.path.basename(path) for path in files.values()}
+    for name in sorted(os.listdir(source_dir)):
+        if name not in quantized_names and os.path.isfile(os.path.join(source_dir, name)):
+            shutil.copy2(os.path.join(source_dir, name), staging_dir)
+    for task, src in files.items():
+        dst = os.path.join(staging_dir, os.path.basename(src))
+        print(f"[INFO] Quantizing {task} model {os.path.basename(src)} ({args.mode}).")
+        quantize_model(src, dst, args.mode, det_blobs if task == "detection" else rec_blobs, args.calibration)
+        print(f"[INFO]   {os.path.getsize(src) / 1e6:.1f} MB -> {os.path.getsize(dst) / 1e6:.1f} MB")
+
+    verification = "holdout" if args.holdout else "leave-one-out"
+    print(f"[INFO] Verifying on {len(verify_items)} photos ({verification}).")
+    faiss_index = faiss.read_index(args.index)
+    apply_search_params(faiss_index, load_params(args.index))
+    row_uids = load_row_uids(args.metadata)
+    exclude = None if args.holdout else own_labels(args.metadata)
+    quant_model = load_face_model("accurate", ctx_id=-1, name=staging_pack, root=args.root)
+    report = evaluate(float_model, quant_model, verify_items, faiss_index, row_uids, args.threshold, exclude)
+    report.update({"verification": verification, "mode": args.mode, "models": args.models, "source_pack": args.source_pack,
+                   "calibration": args.calibration if args.mode == "static" else None})
+
+    print(f"[INFO] Embedding cosine vs float: mean {report['cosine_mean']:.4f}, min {report['cosine_min']:.4f} "
+          f"({report['faces']} faces).")
+    print(f"[INFO] Top-1 accuracy: float {report['top1_float']:.3f}, quantized {report['top1_quantized']:.3f} "
+          f"(agreement {report['top1_agreement']:.3f}).")
+    for stage in ("detection_ms", "recognition_ms"):
+        timing = report[stage]
+        print(f"[INFO] {stage[:-3].capitalize()}: {timing['float']:.1f} ms -> {timing['quantized']:.1f} ms "
+              f"({speedup(timing):.2f}x).")
+
+    failures = []
+    if report["cosine_mean"] < args.min_cosine:
+        failures.append(f"mean cosine {report['cosine_mean']:.4f} < {args.min_cosine}")
+    if report["top1_quantized"] < report["top1_float"] - args.max_top1_drop:
+        failures.append(f"top-1 accuracy dropped by {report['top1_float'] - report['top1_quantized']:.3f}")
+    report["passed"] = not failures
+    with open(os.path.join(staging_dir, REPORT_NAME), "w") as f:
+        json.dump(report, f, indent=4)
+
+    if failures and not args.keep_failed:
+        print(f"[ERROR] Accuracy gate failed: {'; '.join(failures)}. Pack left in {staging_dir} for inspection.")
+        sys.exit(1)
+    if failures:
+        print(f"[WARNING] Accuracy gate failed ({'; '.join(failures)}); installing anyway (--keep-failed).")
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(staging_dir, output_dir)
+    print(f"[INFO] Installed {output_dir}. Run the app with --model-pack {output_pack}.")
+
+if __name__ == "__main__":
+    main()
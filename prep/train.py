@@ -1,13 +1,50 @@
 import os
+import sys
+import cv2
+import json
+import time
+import hashlib
+import argparse
+import threading
+import faiss
+import numpy as np
 from glob import glob
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from metadata_store import write_compact, compact_prefix
+from prototypes import build_prototype_index, save_prototype_index
+from index_spec import build_index as build_ann_index, save_params
+from profiles import PROFILES, DEFAULT_PROFILE, describe_profile, load_face_model, model_signature
+from faces import detect_faces, embed_faces
+from arcface import GRAPH_OPT_LEVELS, enable_batch_recognition
+from quality import QualityGate
+from utils import prefetch
+
+# Builds the FAISS index used by app/app.py from a dataset laid out as <dataset>/<uid>/*.jpg.
+#
+# Images are read and hashed on a prefetch pool and handed, --batch-size at a time, to a
+# worker pool sharing one FaceAnalysis instance. Each worker detects faces image by image;
+# with --batch-embed the best face of every image in its batch is aligned and embedded in
+# one ArcFace call, otherwise one call per image. Every result is written to an on-disk
+# cache keyed by the image content hash. The cache doubles as the checkpoint: an interrupted
+# build resumes where it stopped, and re-runs only embed new or changed photos.
+
+INDEX_NAME = "face_index_cosine.faiss"
+METADATA_NAME = "face_metadata.json"
+DIMENSION = 512  # ArcFace output
 
-def collect_image_paths(dataset_dir="dataset"):
+# ---------------------------
+# Step 1: Collect image paths
+# ---------------------------
+def collect_image_paths(dataset_dir):
     image_data = []
-    for uid in os.listdir(dataset_dir):
+    for uid in sorted(os.listdir(dataset_dir)):
         person_dir = os.path.join(dataset_dir, uid)
         if not os.path.isdir(person_dir):
             continue
-        for img_path in glob(os.path.join(person_dir, "*.jpg")):
+        for img_path in sorted(glob(os.path.join(person_dir, "*.jpg"))):
             image_data.append({
                 "uid": uid,
                 "path": img_path,
@@ -15,71 +52,301 @@ def collect_image_paths(dataset_dir="dataset"):
             })
     return image_data
 
-image_data_list = collect_image_paths("/content/drive/MyDrive/Datasets/AIML and DA/train")
+# -------------------------------------
+# Step 2: Embedding cache / checkpoint
+# -------------------------------------
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by the SHA-1 of the image file contents.
 
-import cv2
-from insightface.app import FaceAnalysis
+    Each entry is one .npy file; an empty array records that no face was found,
+    so images without faces are not re-processed either. Writes are atomic.
+    namespace separates entries whose result depends on settings other than the
+    image: the model pack and profile, and the quality gate thresholds (see
+    cache_namespace).
+    """
+
+    def __init__(self, cache_dir, namespace=None):
+        self.cache_dir = cache_dir
+        self.suffix = f".{namespace}" if namespace else ""
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + self.suffix + ".npy")
 
-app = FaceAnalysis(name='buffalo_l')  # Loads ArcFace model
-app.prepare(ctx_id=0)  # 0 = GPU; use -1 for CPU
+    def get(self, key):
+        """Return the cached embedding, an empty array for "no face", or None if not cached."""
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            return np.load(path)
+        except (ValueError, OSError):
+            return None  # Truncated by a crash; recompute
 
-def extract_embedding(image_path):
-    img = cv2.imread(image_path)
-    faces = app.get(img)
+    def put(self, key, embedding):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, embedding if embedding is not None else np.empty(0, dtype="float32"))
+        os.replace(tmp_path, path)
+
+def read_file(path):
+    """Return (content hash, raw bytes) of a file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return hashlib.sha1(data).hexdigest(), data
+
+def read_image_bytes(indexed_item):
+    idx, item = indexed_item
+    key, data = read_file(item["path"])
+    return idx, key, data
+
+def cache_namespace(profile=DEFAULT_PROFILE, pack="buffalo_l", gate=None):
+    """EmbeddingCache namespace for embeddings made with this model pack, profile and quality gate."""
+    parts = [model_signature(profile, pack)]
+    if gate is not None:
+        parts.append(gate.signature())
+    return ".".join(parts)
+
+# -------------------------------------
+# Step 3: Face embedding using InsightFace
+# -------------------------------------
+def load_model(ctx_id, profile=DEFAULT_PROFILE, batch_options=None, pack="buffalo_l"):
+    """
+    args:
+        batch_options (dict): enable_batch_recognition() keyword arguments; when given,
+            embed_batch embeds a whole build batch with one ArcFace call.
+        pack (str): InsightFace model pack, e.g. a quantized pack built by prep/quantize.py.
+    """
+    print(f"[INFO] Loading face embedding model {pack}: {describe_profile(profile)}.")
+    app = load_face_model(profile, ctx_id=ctx_id, name=pack)
+    if batch_options is not None:
+        enable_batch_recognition(app, **batch_options)
+    return app
+
+def best_face(app, img, gate=None):
+    """The highest-scoring face of img, or None if there is none or it fails the quality gate."""
+    faces = detect_faces(app, img)
     if len(faces) == 0:
         return None
-    return faces[0].embedding  # 512-d float vector
+    best = max(faces, key=lambda x: x.det_score)
+    if gate is not None and gate.check(img, best) is not None:
+        return None
+    return best
 
-import os
-from pinecone import Pinecone, ServerlessSpec
+def extract_embedding(app, img, gate=None):
+    best = best_face(app, img, gate)
+    if best is None:
+        return None
+    embed_faces(app, img, [best])  # Only the enrolled face is worth an ArcFace pass
+    return best.embedding.astype("float32")
+
+def embed_batch(app, cache, batch, gate=None):
+    """Decode and embed a batch of (index, key, data) images, caching every result."""
+    batch_recognizer = getattr(app, "batch_recognizer", None)
+    if batch_recognizer is not None:
+        return embed_batch_aligned(app, batch_recognizer, cache, batch, gate)
+    results = []
+    for idx, key, data in batch:
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        embedding = extract_embedding(app, img, gate) if img is not None else None
+        cache.put(key, embedding)
+        results.append((idx, embedding))
+    return results
+
+def embed_batch_aligned(app, batch_recognizer, cache, batch, gate=None):
+    """embed_batch with the best face of every image aligned first and embedded in one call."""
+    crops, found = [], {}
+    for idx, key, data in batch:
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        best = best_face(app, img, gate) if img is not None else None
+        if best is not None:
+            found[idx] = len(crops)
+            crops.append(batch_recognizer.align(img, best.kps))
+    embeddings = batch_recognizer.embed_crops(crops)
+
+    results = []
+    for idx, key, _ in batch:
+        embedding = embeddings[found[idx]] if idx in found else None
+        cache.put(key, embedding)
+        results.append((idx, embedding))
+    return results
+
+def compute_embeddings(image_data_list, cache, app_factory, workers=4, batch_size=16, prefetch_depth=64,
+                       progress_every=500, gate=None):
+    """
+    args:
+        gate (QualityGate): Optional; images whose best face fails it are left out like
+            images without a face. Use a cache namespaced by gate.signature().
+    returns:
+        list: One embedding (or None when no face was found) per item of image_data_list.
+    """
+    embeddings = [None] * len(image_data_list)
+    hits = 0
+    done = 0
+    app = None
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as io_pool, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as embed_pool:
+        in_flight = deque()
+        batch = []
+
+        def collect(future):
+            nonlocal done
+            for idx, embedding in future.result():
+                embeddings[idx] = embedding
+                done += 1
+                if done % progress_every == 0:
+                    print(f"[INFO] Embedded {done} new images ({time.time() - start:.1f}s).")
 
-# Replace with your actual key and region
-api_key = "pcsk_55iQ62_GvUCSHpRXAhy566mkXebjbFxSfe68aPWbZH2T93kboKuFLYy9tZwCotgAbbS8iM"
-region = "us-east-1"
+        def submit(batch):
+            nonlocal app
+            if app is None:
+                app = app_factory()  # Only load the model when something is not cached
+            in_flight.append(embed_pool.submit(embed_batch, app, cache, batch, gate))
+            while len(in_flight) > workers * 2:
+                collect(in_flight.popleft())
 
-pc = Pinecone(api_key=api_key)
+        for idx, key, data in prefetch(io_pool, read_image_bytes, enumerate(image_data_list), prefetch_depth):
+            cached = cache.get(key)
+            if cached is not None:
+                embeddings[idx] = cached if cached.size else None
+                hits += 1
+                continue
+            batch.append((idx, key, data))
+            if len(batch) >= batch_size:
+                submit(batch)
+                batch = []
+        if batch:
+            submit(batch)
+        while in_flight:
+            collect(in_flight.popleft())
+
+    print(f"[INFO] Embedding cache hits: {hits}, newly embedded: {done}.")
+    return embeddings
+
+# -------------------------------------
+# Step 4: Build and save FAISS index (Cosine Similarity)
+# -------------------------------------
+def normalize(vec):
+    return vec / np.linalg.norm(vec)
+
+def atomic_write(path, write):
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def build_index(image_data_list, embeddings, spec="flat"):
+    """
+    returns:
+        tuple: (index, metadata_store, params). The index type follows spec (see
+        app/index_spec.py) and always carries stable int64 ids; metadata_store is keyed
+        by that id (as a string), so prep/enroll.py can later add or remove identities
+        without a rebuild. params holds the resolved build and search parameters.
+    """
+    vectors = []
+    metadata_store = {}
+
+    for item, embedding in zip(image_data_list, embeddings):
+        if embedding is None:
+            print(f"[ERROR] No usable face in {item['path']}")
+            continue
 
-# Create index if it doesn't exist
-index_name = "aiml-da-face-embeds"
-if index_name not in pc.list_indexes().names():
-    pc.create_index(
-        name=index_name,
-        dimension=512,
-        metric="cosine",
-        spec=ServerlessSpec(
-            cloud="aws",         # or "gcp"
-            region=region        # must match your Pinecone project region
-        )
-    )
+        vector_id = len(vectors)
+        vectors.append(normalize(embedding))
+        metadata_store[str(vector_id)] = {
+            "uid": item["uid"],
+            "image_name": item["image_name"],
+            "path": item["path"]
+        }
 
-# Connect to the index
-index = pc.Index(index_name)
+    vectors = np.array(vectors, dtype="float32").reshape(-1, DIMENSION)
+    index, params = build_ann_index(spec, vectors, np.arange(len(vectors), dtype="int64"), DIMENSION)
+    return index, metadata_store, params
 
-import uuid
+def save_index(index, metadata_store, output_dir, params=None):
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, INDEX_NAME)
+    atomic_write(index_path, lambda path: faiss.write_index(index, path))
+    if params is not None:
+        save_params(index_path, params)
 
-to_upsert = []
+    def write_metadata(path):
+        with open(path, "w") as f:
+            json.dump(metadata_store, f, indent=4)
+    metadata_path = os.path.join(output_dir, METADATA_NAME)
+    atomic_write(metadata_path, write_metadata)
+    write_compact(metadata_store, compact_prefix(metadata_path))
 
-for item in image_data_list:
-    embedding = extract_embedding(item["path"])
-    if embedding is None:
-        print(f"[ERROR] No face detected in {item['path']}")
-        continue
+def main():
+    parser = argparse.ArgumentParser(description="Build the FAISS face index from an enrollment dataset")
+    parser.add_argument("--dataset", default=os.getenv("FACE_DATASET_DIR"),
+                        help="Dataset directory laid out as <uid>/*.jpg (default: $FACE_DATASET_DIR)")
+    parser.add_argument("--output-dir", default="./faissIndex", help="Where the index and metadata are written")
+    parser.add_argument("--cache-dir", default="./faissIndex/embedding_cache", help="On-disk embedding cache / checkpoint")
+    parser.add_argument("--workers", type=int, default=4, help="Decode and embedding worker threads")
+    parser.add_argument("--batch-size", type=int, default=16, help="Images per embedding batch")
+    parser.add_argument("--ctx-id", type=int, default=0, help="InsightFace context: 0 for GPU, -1 for CPU")
+    parser.add_argument("--model-profile", choices=list(PROFILES), default=DEFAULT_PROFILE,
+                        help="Face model modules, detector size and image downscale (see app/profiles.py)")
+    parser.add_argument("--model-pack", default="buffalo_l",
+                        help="InsightFace model pack, e.g. buffalo_l_int8 built by prep/quantize.py")
+    parser.add_argument("--batch-embed", action="store_true", help="Embed each batch of images with one ArcFace call")
+    parser.add_argument("--ort-intra-threads", type=int, default=0, help="ONNX Runtime intra-op threads for --batch-embed (0 = default)")
+    parser.add_argument("--ort-inter-threads", type=int, default=0, help="ONNX Runtime inter-op threads for --batch-embed (0 = default)")
+    parser.add_argument("--ort-opt-level", choices=list(GRAPH_OPT_LEVELS), default="all",
+                        help="ONNX Runtime graph optimization level for --batch-embed")
+    parser.add_argument("--quality-gate", action="store_true", help="Leave small, low-score, blurred or turned faces out of the index")
+    parser.add_argument("--min-face-size", type=int, default=40, help="Quality gate: minimum shorter box side in pixels")
+    parser.add_argument("--min-det-score", type=float, default=0.6, help="Quality gate: minimum detector score")
+    parser.add_argument("--min-sharpness", type=float, default=40.0, help="Quality gate: minimum Laplacian variance of the face crop")
+    parser.add_argument("--max-yaw", type=float, default=0.5, help="Quality gate: largest yaw ratio from landmarks")
+    parser.add_argument("--max-pitch", type=float, default=0.25, help="Quality gate: largest pitch ratio from landmarks")
+    parser.add_argument("--index-spec", default="flat",
+                        help="Index type and parameters: flat, sq8, hnsw:M=32,efSearch=64, "
+                             "ivf-flat:nlist=1024,nprobe=16 or ivf-pq:nlist=1024,m=64,nprobe=16")
+    parser.add_argument("--prototypes", type=int, default=None, metavar="K",
+                        help="Also build a prototype index with the centroid plus up to K representatives per uid")
+    args = parser.parse_args()
 
-    vector_id = str(uuid.uuid4())
+    if not args.dataset or not os.path.isdir(args.dataset):
+        parser.error("a dataset directory is required (--dataset or $FACE_DATASET_DIR)")
 
-    metadata = {
-        "uid": item["uid"],
-        "image_name": item["image_name"],
-        "path": item["path"]
-    }
+    image_data_list = collect_image_paths(args.dataset)
+    print(f"[INFO] Found {len(image_data_list)} images in {args.dataset}.")
 
-    to_upsert.append((vector_id, embedding.tolist(), metadata))
+    gate = None
+    if args.quality_gate:
+        gate = QualityGate(min_size=args.min_face_size, min_score=args.min_det_score, min_sharpness=args.min_sharpness,
+                           max_yaw=args.max_yaw, max_pitch=args.max_pitch)
+        print(f"[INFO] Quality gate enabled: {gate}")
+    cache = EmbeddingCache(args.cache_dir, namespace=cache_namespace(args.model_profile, args.model_pack, gate))
+    batch_options = None
+    if args.batch_embed:
+        batch_options = {"intra_op_threads": args.ort_intra_threads, "inter_op_threads": args.ort_inter_threads,
+                         "graph_opt": args.ort_opt_level, "max_batch": args.batch_size}
+    embeddings = compute_embeddings(image_data_list, cache,
+                                    lambda: load_model(args.ctx_id, args.model_profile, batch_options, args.model_pack),
+                                    workers=args.workers, batch_size=args.batch_size, gate=gate)
+    if gate is not None and gate.checked:
+        print(f"[INFO] Quality gate (new images only; cached results are reused): {gate.stats()}")
 
-# Batch upsert
-BATCH_SIZE = 100
-print(f"[INFO] Uploading {len(to_upsert)} embeddings to Pinecone...")
+    index, metadata_store, params = build_index(image_data_list, embeddings, args.index_spec)
+    save_index(index, metadata_store, args.output_dir, params)
+    print(f"[INFO] Stored {index.ntotal} face embeddings to FAISS index ({params}).")
 
-for i in range(0, len(to_upsert), BATCH_SIZE):
-    index.upsert(vectors=to_upsert[i:i + BATCH_SIZE])
+    if args.prototypes is not None:
+        groups = {}
+        for item, embedding in zip(image_data_list, embeddings):
+            if embedding is not None:
+                groups.setdefault(item["uid"], []).append(normalize(embedding))
+        groups = {uid: np.array(vectors, dtype="float32") for uid, vectors in groups.items()}
+        prototype_index, prototype_metadata = build_prototype_index(groups, k=args.prototypes)
+        save_prototype_index(prototype_index, prototype_metadata, args.output_dir, k=args.prototypes)
+        print(f"[INFO] Stored {prototype_index.ntotal} prototypes to the prototype index.")
 
-print("[INFO] All embeddings uploaded successfully.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,6 @@ setup(
     install_requires=[
         'opencv-python',
         'insightface',
-        'pinecone-client',   # If you're using Pinecone anywhere
         'numpy',
         'matplotlib',
         'onnxruntime-silicon',  # Optimized for Apple Silicon; replace for other platforms if needed